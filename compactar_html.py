@@ -0,0 +1,153 @@
+"""
+Compacta o HTML já armazenado em html_blobs.
+
+1. Com zstd (pip install zstandard), treina um dicionário por plataforma de
+   repositório (DSpace, Vufind, ...) a partir de amostras do próprio banco.
+   Páginas da mesma plataforma repetem quase todo o markup, então o dicionário
+   reduz bastante o tamanho de cada página.
+2. Recomprime todos os blobs no codec configurado (HTML_COMPRESSION), em
+   blocos com commit por bloco: pode ser interrompido e executado de novo.
+3. Roda VACUUM e informa o espaço economizado.
+
+Rode antes migracao_blobs.py em bancos que ainda guardam HTML inline.
+
+Uso: python compactar_html.py [--forcar]
+     --forcar  recomprime também blobs que já estão no codec atual
+"""
+import sqlite3
+import os
+import sys
+import config
+from models.db.manager import DatabaseManager
+from models.db import blob_store
+from models.db.blob_store import BLOB_TABLES, platform_of, encode, decode, reset_dict_cache, compression_mode
+
+BLOCO = 200
+AMOSTRAS_POR_PLATAFORMA = 1000
+AMOSTRAS_MINIMAS = 20
+TAMANHO_DICIONARIO = 112640  # 110 KB (padrão do zstd)
+
+
+def tamanho_arquivo(conn):
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    return page_count * page_size
+
+
+def tamanho_armazenado(conn):
+    return conn.execute("SELECT COALESCE(SUM(COALESCE(stored_size, size)), 0), COUNT(*) FROM html_blobs").fetchone()
+
+
+def iterar_blobs(conn):
+    """Gera (rowid, hash, url, content, codec) em blocos, paginando por rowid."""
+    referencias = " UNION ALL ".join(
+        f"SELECT html_hash, url FROM {tabela} WHERE html_hash IS NOT NULL" for tabela in BLOB_TABLES
+    )
+    last_rowid = 0
+    while True:
+        rows = conn.execute(f"""
+            SELECT hb.rowid, hb.hash,
+                   (SELECT ref.url FROM ({referencias}) ref WHERE ref.html_hash = hb.hash LIMIT 1),
+                   hb.content, hb.codec
+            FROM html_blobs hb
+            WHERE hb.rowid > ?
+            ORDER BY hb.rowid LIMIT ?
+        """, (last_rowid, BLOCO)).fetchall()
+        if not rows:
+            return
+        yield rows
+        last_rowid = rows[-1][0]
+
+
+def treinar_dicionarios(conn):
+    zstandard = blob_store.zstandard
+    amostras = {}
+    for rows in iterar_blobs(conn):
+        for _rowid, _hash, url, content, codec in rows:
+            plataforma = platform_of(url)
+            lista = amostras.setdefault(plataforma, [])
+            if len(lista) < AMOSTRAS_POR_PLATAFORMA:
+                lista.append(decode(conn, content, codec).encode('utf-8'))
+
+    for plataforma, lista in sorted(amostras.items()):
+        if len(lista) < AMOSTRAS_MINIMAS:
+            print(f"- {plataforma}: {len(lista)} amostras (mínimo {AMOSTRAS_MINIMAS}); sem dicionário.")
+            continue
+        try:
+            dicionario = zstandard.train_dictionary(TAMANHO_DICIONARIO, lista)
+        except zstandard.ZstdError as e:
+            print(f"- {plataforma}: falha ao treinar dicionário ({e}).")
+            continue
+        conn.execute("INSERT INTO zstd_dicts (platform, data, samples) VALUES (?, ?, ?)",
+                     (plataforma, dicionario.as_bytes(), len(lista)))
+        conn.commit()
+        print(f"- {plataforma}: dicionário treinado com {len(lista)} amostras.")
+    reset_dict_cache()
+
+
+def recomprimir(conn, forcar=False):
+    total = conn.execute("SELECT COUNT(*) FROM html_blobs").fetchone()[0]
+    processados = alterados = 0
+    for rows in iterar_blobs(conn):
+        for _rowid, digest, url, content, codec in rows:
+            html = decode(conn, content, codec)
+            payload, novo_codec = encode(conn, html, platform_of(url))
+            if novo_codec == codec and not forcar:
+                continue
+            stored_size = len(payload) if novo_codec else len(html.encode('utf-8'))
+            conn.execute("UPDATE html_blobs SET content = ?, codec = ?, stored_size = ? WHERE hash = ?",
+                         (payload, novo_codec, stored_size, digest))
+            alterados += 1
+        conn.commit()
+        processados += len(rows)
+        print(f"  Recomprimindo: {processados}/{total}", end="\r")
+    print(f"\r- Blobs recomprimidos: {alterados} de {total}.      ")
+
+
+def main():
+    if not os.path.exists(config.DB_NAME):
+        print(f"❌ Banco de dados '{config.DB_NAME}' não encontrado.")
+        return
+
+    # Garante tabelas/colunas de compressão (html_blobs.codec, zstd_dicts)
+    DatabaseManager().close_all()
+
+    forcar = '--forcar' in sys.argv
+    modo = compression_mode()
+    print(f"Compactando HTML em: {config.DB_NAME} (codec: {modo})...")
+
+    conn = sqlite3.connect(config.DB_NAME)
+    try:
+        arquivo_antes = tamanho_arquivo(conn)
+        armazenado_antes, quantidade = tamanho_armazenado(conn)
+        if not quantidade:
+            print("Nenhum HTML em html_blobs. Rode migracao_blobs.py primeiro em bancos antigos.")
+            return
+
+        if modo == 'zstd':
+            print("Treinando dicionários zstd por plataforma...")
+            treinar_dicionarios(conn)
+
+        recomprimir(conn, forcar)
+
+        armazenado_depois, _ = tamanho_armazenado(conn)
+        print("Otimizando banco de dados (VACUUM)...")
+        conn.execute("VACUUM")
+        arquivo_depois = tamanho_arquivo(conn)
+
+        mb = 1048576
+        print("\n" + "=" * 60)
+        print(f"HTML armazenado: {armazenado_antes / mb:.1f} MB -> {armazenado_depois / mb:.1f} MB")
+        print(f"Arquivo do banco: {arquivo_antes / mb:.1f} MB -> {arquivo_depois / mb:.1f} MB "
+              f"(economia de {(arquivo_antes - arquivo_depois) / mb:.1f} MB)")
+        print("=" * 60)
+        print("✅ Compactação concluída com sucesso!")
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"❌ Erro durante a compactação: {e}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,45 @@ REQUEST_TIMEOUT = 30
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 DELAY_BETWEEN_REQUESTS = 1.5
 
+# Pool de navegadores (Selenium)
+DRIVER_POOL_SIZE = 2      # Navegadores headless mantidos abertos
+HEADED_POOL_SIZE = 1      # Navegadores visíveis (fallback de bloqueio)
+DRIVER_MAX_PAGES = 50     # Recicla o navegador após N páginas
+
+# Controle adaptativo por host: o intervalo começa em DELAY_BETWEEN_REQUESTS,
+# diminui com respostas rápidas e aumenta com 429/503, lentidão ou bloqueio
+RATE_MIN_DELAY = 0.25       # Intervalo mínimo entre requisições ao mesmo host (s)
+RATE_MAX_DELAY = 60.0       # Intervalo máximo (s)
+RATE_SLOW_RESPONSE = 8.0    # Resposta mais lenta que isso (s) conta como sobrecarga
+
+# Disjuntor por fonte: abre quando, na janela deslizante de BREAKER_WINDOW s,
+# houver ao menos BREAKER_MIN_REQUESTS requisições e BREAKER_ERROR_RATE de falhas.
+# A pausa começa em BREAKER_COOLDOWN s e dobra a cada reabertura (até o máximo)
+BREAKER_WINDOW = 300
+BREAKER_MIN_REQUESTS = 5
+BREAKER_ERROR_RATE = 0.5
+BREAKER_COOLDOWN = 600
+BREAKER_MAX_COOLDOWN = 21600
+
+# Downloads em lote: quantos hosts distintos são atendidos em paralelo
+MAX_CONCURRENT_DOWNLOADS = 4
+
+# DeepScrap (paginação no BDTD): downloads simultâneos; o intervalo mínimo
+# entre requisições segue DELAY_BETWEEN_REQUESTS
+PAGINATION_CONCURRENCY = 3
+
+# Backend de parsing HTML dos parsers: 'html.parser' (padrão, puro Python),
+# 'lxml' (bem mais rápido, requer pip install lxml) ou 'html5lib'
+HTML_PARSER_BACKEND = "html.parser"
+
+# Reextração offline: processos paralelos (0 = automático, núcleos - 1)
+EXTRACTION_WORKERS = 0
+
+# Compressão do HTML armazenado: 'auto' (zstd se instalado, senão zlib),
+# 'zstd' (pip install zstandard; usa dicionários treinados por plataforma),
+# 'zlib' ou 'none'
+HTML_COMPRESSION = "auto"
+
 # Dados de Negócio Defaults
 DEFAULT_SEARCH_TERMS = [
     "jurimetria", "inteligência artificial", "análise de discurso",
@@ -69,6 +108,22 @@ def load_settings():
             globals()['REQUEST_TIMEOUT'] = data.get('REQUEST_TIMEOUT', REQUEST_TIMEOUT)
             globals()['USER_AGENT'] = data.get('USER_AGENT', USER_AGENT)
             globals()['DELAY_BETWEEN_REQUESTS'] = data.get('DELAY_BETWEEN_REQUESTS', DELAY_BETWEEN_REQUESTS)
+            globals()['DRIVER_POOL_SIZE'] = data.get('DRIVER_POOL_SIZE', DRIVER_POOL_SIZE)
+            globals()['HEADED_POOL_SIZE'] = data.get('HEADED_POOL_SIZE', HEADED_POOL_SIZE)
+            globals()['DRIVER_MAX_PAGES'] = data.get('DRIVER_MAX_PAGES', DRIVER_MAX_PAGES)
+            globals()['RATE_MIN_DELAY'] = data.get('RATE_MIN_DELAY', RATE_MIN_DELAY)
+            globals()['RATE_MAX_DELAY'] = data.get('RATE_MAX_DELAY', RATE_MAX_DELAY)
+            globals()['RATE_SLOW_RESPONSE'] = data.get('RATE_SLOW_RESPONSE', RATE_SLOW_RESPONSE)
+            globals()['BREAKER_WINDOW'] = data.get('BREAKER_WINDOW', BREAKER_WINDOW)
+            globals()['BREAKER_MIN_REQUESTS'] = data.get('BREAKER_MIN_REQUESTS', BREAKER_MIN_REQUESTS)
+            globals()['BREAKER_ERROR_RATE'] = data.get('BREAKER_ERROR_RATE', BREAKER_ERROR_RATE)
+            globals()['BREAKER_COOLDOWN'] = data.get('BREAKER_COOLDOWN', BREAKER_COOLDOWN)
+            globals()['BREAKER_MAX_COOLDOWN'] = data.get('BREAKER_MAX_COOLDOWN', BREAKER_MAX_COOLDOWN)
+            globals()['MAX_CONCURRENT_DOWNLOADS'] = data.get('MAX_CONCURRENT_DOWNLOADS', MAX_CONCURRENT_DOWNLOADS)
+            globals()['PAGINATION_CONCURRENCY'] = data.get('PAGINATION_CONCURRENCY', PAGINATION_CONCURRENCY)
+            globals()['HTML_PARSER_BACKEND'] = data.get('HTML_PARSER_BACKEND', HTML_PARSER_BACKEND)
+            globals()['EXTRACTION_WORKERS'] = data.get('EXTRACTION_WORKERS', EXTRACTION_WORKERS)
+            globals()['HTML_COMPRESSION'] = data.get('HTML_COMPRESSION', HTML_COMPRESSION)
             globals()['THEME_MODE'] = data.get('THEME_MODE', THEME_MODE)
             globals()['DEFAULT_SEARCH_TERMS'] = data.get('DEFAULT_SEARCH_TERMS', DEFAULT_SEARCH_TERMS)
             globals()['DEFAULT_YEARS'] = data.get('DEFAULT_YEARS', DEFAULT_YEARS)
@@ -98,6 +153,22 @@ def save_settings(new_data):
         'REQUEST_TIMEOUT': globals()['REQUEST_TIMEOUT'],
         'USER_AGENT': globals()['USER_AGENT'],
         'DELAY_BETWEEN_REQUESTS': globals()['DELAY_BETWEEN_REQUESTS'],
+        'DRIVER_POOL_SIZE': globals()['DRIVER_POOL_SIZE'],
+        'HEADED_POOL_SIZE': globals()['HEADED_POOL_SIZE'],
+        'DRIVER_MAX_PAGES': globals()['DRIVER_MAX_PAGES'],
+        'RATE_MIN_DELAY': globals()['RATE_MIN_DELAY'],
+        'RATE_MAX_DELAY': globals()['RATE_MAX_DELAY'],
+        'RATE_SLOW_RESPONSE': globals()['RATE_SLOW_RESPONSE'],
+        'BREAKER_WINDOW': globals()['BREAKER_WINDOW'],
+        'BREAKER_MIN_REQUESTS': globals()['BREAKER_MIN_REQUESTS'],
+        'BREAKER_ERROR_RATE': globals()['BREAKER_ERROR_RATE'],
+        'BREAKER_COOLDOWN': globals()['BREAKER_COOLDOWN'],
+        'BREAKER_MAX_COOLDOWN': globals()['BREAKER_MAX_COOLDOWN'],
+        'MAX_CONCURRENT_DOWNLOADS': globals()['MAX_CONCURRENT_DOWNLOADS'],
+        'PAGINATION_CONCURRENCY': globals()['PAGINATION_CONCURRENCY'],
+        'HTML_PARSER_BACKEND': globals()['HTML_PARSER_BACKEND'],
+        'EXTRACTION_WORKERS': globals()['EXTRACTION_WORKERS'],
+        'HTML_COMPRESSION': globals()['HTML_COMPRESSION'],
         'THEME_MODE': globals()['THEME_MODE'],
         'DEFAULT_SEARCH_TERMS': globals()['DEFAULT_SEARCH_TERMS'],
         'DEFAULT_YEARS': globals()['DEFAULT_YEARS'],
@@ -53,6 +53,18 @@ def clean_tables(level):
                 cursor.execute(f"DELETE FROM sqlite_sequence WHERE name='{table}'") # Reseta o ID (AutoIncrement)
                 print(f"   ✓ Tabela '{table}' limpa.")
 
+        # HTMLs (html_blobs) que ficaram sem nenhuma linha de plb/ppb/ppr apontando para eles
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='html_blobs'")
+        if cursor.fetchone():
+            from models.db.blob_store import delete_orphans
+            print(f"   ✓ {delete_orphans(conn)} HTMLs órfãos removidos.")
+
+        # Validadores HTTP (ETag/Last-Modified) cujo HTML não existe mais
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='http_validators'")
+        if cursor.fetchone():
+            cursor.execute("DELETE FROM http_validators WHERE html_hash NOT IN (SELECT hash FROM html_blobs)")
+            print(f"   ✓ {cursor.rowcount} validadores HTTP sem HTML removidos.")
+
         cursor.execute("PRAGMA foreign_keys = ON;")
         conn.commit()
         
@@ -68,6 +80,86 @@ def clean_tables(level):
     finally:
         conn.close()
 
+def dedupe_pesquisas():
+    """
+    Remove pesquisas duplicadas (mesmo title, author, search_term e search_year),
+    que impedem a criação do índice idx_pesquisas_key e deixam a gravação de
+    resultados no caminho lento, registro a registro.
+
+    Fica a pesquisa de menor id de cada grupo. Em ppb/ppr sobra uma linha por
+    grupo (a que tem HTML, se houver), ligada à pesquisa mantida.
+    """
+    conn = connect_db()
+    if not conn: return
+
+    cursor = conn.cursor()
+    try:
+        from models.db.blob_store import has_html, delete_orphans
+
+        # Membros de cada grupo duplicado -> id mantido (NULLs não conflitam no índice único)
+        cursor.execute("""
+            CREATE TEMP TABLE dup_map AS
+            SELECT p.id AS id, g.keep_id AS keep_id
+            FROM pesquisas p
+            JOIN (
+                SELECT title, author, search_term, search_year, MIN(id) AS keep_id
+                FROM pesquisas
+                WHERE title IS NOT NULL AND author IS NOT NULL
+                  AND search_term IS NOT NULL AND search_year IS NOT NULL
+                GROUP BY title, author, search_term, search_year
+                HAVING COUNT(*) > 1
+            ) g ON p.title = g.title AND p.author = g.author
+               AND p.search_term = g.search_term AND p.search_year = g.search_year
+        """)
+        cursor.execute("SELECT COUNT(*) FROM dup_map WHERE id != keep_id")
+        total = cursor.fetchone()[0]
+        if not total:
+            print("Nenhuma pesquisa duplicada encontrada.")
+        else:
+            print(f"Removendo {total} pesquisas duplicadas...")
+
+        for table in ('ppb', 'ppr'):
+            cursor.execute(f"PRAGMA table_info({table})")
+            inline = 'html_content' in [info[1] for info in cursor.fetchall()]
+            # Linha filha mantida por grupo: com HTML primeiro, depois a mais antiga
+            cursor.execute(f"""
+                CREATE TEMP TABLE keep_{table} AS
+                SELECT g.keep_id AS keep_id, (
+                    SELECT t.id FROM {table} t JOIN dup_map d ON t.pesquisa_id = d.id
+                    WHERE d.keep_id = g.keep_id
+                    ORDER BY CASE WHEN {has_html('t', inline)} THEN 0 ELSE 1 END, t.id
+                    LIMIT 1
+                ) AS child_id
+                FROM (SELECT DISTINCT keep_id FROM dup_map) g
+            """)
+            cursor.execute(f"""
+                DELETE FROM {table}
+                WHERE pesquisa_id IN (SELECT id FROM dup_map)
+                  AND id NOT IN (SELECT child_id FROM keep_{table} WHERE child_id IS NOT NULL)
+            """)
+            cursor.execute(f"""
+                UPDATE {table} SET pesquisa_id = (SELECT keep_id FROM dup_map WHERE dup_map.id = {table}.pesquisa_id)
+                WHERE id IN (SELECT child_id FROM keep_{table})
+            """)
+
+        cursor.execute("DELETE FROM pesquisas WHERE id IN (SELECT id FROM dup_map WHERE id != keep_id)")
+        print(f"   ✓ {cursor.rowcount} pesquisas duplicadas removidas.")
+
+        cursor.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_pesquisas_key 
+            ON pesquisas(title, author, search_term, search_year)
+        """)
+        print("   ✓ Índice idx_pesquisas_key criado (gravação em lote habilitada).")
+        print(f"   ✓ {delete_orphans(conn)} HTMLs órfãos removidos.")
+        conn.commit()
+        print("\n✅ Deduplicação concluída com sucesso!")
+
+    except sqlite3.Error as e:
+        print(f"\n❌ Erro ao remover duplicatas: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
 def main():
     while True:
         os.system('cls' if os.name == 'nt' else 'clear')
@@ -81,6 +173,8 @@ def main():
         print("    (Reseta toda a mineração, mantém logs e fontes)")
         print("\n[3] RESET TOTAL (Fábrica)")
         print("    (Apaga absolutamente tudo)")
+        print("\n[4] Remover PESQUISAS DUPLICADAS")
+        print("    (Habilita a gravação em lote de resultados)")
         print("\n[0] Sair")
         print("-" * 40)
         
@@ -91,10 +185,13 @@ def main():
                 print("Saindo...")
                 break
             
-            if choice in ['1', '2', '3']:
+            if choice in ['1', '2', '3', '4']:
                 confirm = input(f"\n⚠️  Tem certeza que deseja executar a opção {choice}? [s/N]: ").lower()
                 if confirm == 's':
-                    clean_tables(int(choice))
+                    if choice == '4':
+                        dedupe_pesquisas()
+                    else:
+                        clean_tables(int(choice))
                     input("\nPressione ENTER para continuar...")
                 else:
                     print("Operação cancelada.")
@@ -0,0 +1,99 @@
+"""
+Move o HTML inline de plb/ppb/ppr para o armazenamento por conteúdo (html_blobs).
+
+Cada html_content legado é gravado uma única vez em html_blobs (chave SHA-256)
+e a linha passa a guardar apenas html_hash, html_size e fetched_at. Roda em
+blocos com commit por bloco: pode ser interrompido e executado de novo.
+Ao final remove blobs órfãos e roda VACUUM para devolver o espaço ao disco.
+
+Uso: python migracao_blobs.py
+"""
+import sqlite3
+import os
+import config
+from models.db.manager import DatabaseManager
+from models.db.blob_store import BLOB_TABLES, put_blob, platform_of, delete_orphans
+
+BLOCO = 200
+# Coluna de data usada para preencher fetched_at das linhas legadas
+COLUNA_DATA = {'plb': 'created_at', 'ppb': 'extracted_at', 'ppr': 'extracted_at'}
+
+
+def migrar_tabela(conn, tabela):
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT COUNT(*) FROM {tabela}
+        WHERE html_content IS NOT NULL AND html_content != ''
+    """)
+    total = cursor.fetchone()[0]
+    if not total:
+        print(f"- {tabela}: nada a migrar.")
+        return 0, 0
+
+    migradas = 0
+    bytes_inline = 0
+    last_id = 0
+    while True:
+        rows = cursor.execute(f"""
+            SELECT id, url, html_content, {COLUNA_DATA[tabela]} FROM {tabela}
+            WHERE id > ? AND html_content IS NOT NULL AND html_content != ''
+            ORDER BY id LIMIT ?
+        """, (last_id, BLOCO)).fetchall()
+        if not rows:
+            break
+
+        for row_id, url, html, data_coleta in rows:
+            html_hash, html_size = put_blob(conn, html, platform_of(url))
+            conn.execute(f"""
+                UPDATE {tabela}
+                SET html_hash = ?, html_size = ?, fetched_at = COALESCE(fetched_at, ?), html_content = NULL
+                WHERE id = ?
+            """, (html_hash, html_size, data_coleta, row_id))
+            bytes_inline += html_size
+        conn.commit()
+
+        migradas += len(rows)
+        last_id = rows[-1][0]
+        print(f"  {tabela}: {migradas}/{total}", end="\r")
+
+    print(f"\r- {tabela}: {migradas} linhas migradas ({bytes_inline / 1048576:.1f} MB de HTML).")
+    return migradas, bytes_inline
+
+
+def migrar_banco():
+    if not os.path.exists(config.DB_NAME):
+        print(f"❌ Banco de dados '{config.DB_NAME}' não encontrado.")
+        return
+
+    # Garante tabela html_blobs e colunas html_hash/html_size/fetched_at
+    DatabaseManager().close_all()
+
+    print(f"Migrando HTML para html_blobs em: {config.DB_NAME}...")
+    conn = sqlite3.connect(config.DB_NAME)
+    try:
+        total_bytes = 0
+        for tabela in BLOB_TABLES:
+            _, bytes_inline = migrar_tabela(conn, tabela)
+            total_bytes += bytes_inline
+
+        removidos = delete_orphans(conn)
+        conn.commit()
+
+        unicos = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM html_blobs").fetchone()
+        print(f"- Blobs órfãos removidos: {removidos}")
+        print(f"- Blobs únicos: {unicos[0]} ({unicos[1] / 1048576:.1f} MB)")
+        if total_bytes:
+            print(f"- HTML inline migrado: {total_bytes / 1048576:.1f} MB (páginas repetidas agora ocupam um único blob)")
+
+        print("Otimizando banco de dados (VACUUM)...")
+        conn.execute("VACUUM")
+        print("✅ Migração concluída com sucesso!")
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"❌ Erro durante a migração: {e}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    migrar_banco()
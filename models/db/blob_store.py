@@ -0,0 +1,219 @@
+"""
+Armazenamento de HTML endereçado por conteúdo.
+
+O HTML baixado (plb, ppb, ppr) não fica mais inline nas tabelas relacionais:
+cada conteúdo é gravado UMA vez em `html_blobs`, com chave SHA-256, e as
+linhas guardam apenas html_hash, html_size e fetched_at. Páginas idênticas
+obtidas em buscas diferentes ocupam espaço uma única vez, e as consultas de
+metadados não passam por páginas de HTML.
+
+O conteúdo é gravado comprimido (config.HTML_COMPRESSION) e a coluna `codec`
+diz como lê-lo de volta:
+- NULL:        texto puro (bancos antigos ou HTML_COMPRESSION = 'none');
+- 'zlib':      zlib (sempre disponível);
+- 'zstd':      zstd sem dicionário;
+- 'zstd:<id>': zstd com o dicionário `zstd_dicts.id`, treinado por plataforma
+               de repositório (ver compactar_html.py).
+"""
+import hashlib
+import threading
+import zlib
+import config
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+BLOB_TABLES = ('plb', 'ppb', 'ppr')
+DEFAULT_PLATFORM = 'generic'
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 9
+
+_lock = threading.Lock()
+_dicts = {}            # id -> ZstdCompressionDict (imutáveis, cache do processo)
+_platform_dicts = {}   # plataforma -> id do dicionário mais recente (ou None)
+_warned = set()
+
+
+def content_hash(html):
+    """Retorna (sha256_hex, tamanho_em_bytes) do HTML em UTF-8."""
+    data = html.encode('utf-8')
+    return hashlib.sha256(data).hexdigest(), len(data)
+
+
+def compression_mode():
+    """Codec efetivo para novas gravações: 'zstd', 'zlib' ou 'none'."""
+    mode = getattr(config, 'HTML_COMPRESSION', 'auto')
+    if mode == 'auto':
+        return 'zstd' if zstandard else 'zlib'
+    if mode == 'zstd' and zstandard is None:
+        if 'zstd' not in _warned:
+            print("Aviso: HTML_COMPRESSION='zstd' mas o pacote 'zstandard' não está instalado. Usando zlib.")
+            _warned.add('zstd')
+        return 'zlib'
+    if mode not in ('zstd', 'zlib', 'none'):
+        return 'zlib'
+    return mode
+
+
+def platform_of(url):
+    """Plataforma do repositório (nome do parser mapeado ao domínio) para escolher o dicionário."""
+    if not url:
+        return DEFAULT_PLATFORM
+    try:
+        from services.parser_factory import ParserFactory
+        parser_class = ParserFactory().get_parser_class(url)
+        return parser_class.__name__ if parser_class else DEFAULT_PLATFORM
+    except Exception:
+        return DEFAULT_PLATFORM
+
+
+def _load_dict(conn, dict_id):
+    with _lock:
+        cached = _dicts.get(dict_id)
+    if cached is not None:
+        return cached
+    row = conn.execute("SELECT data FROM zstd_dicts WHERE id = ?", (dict_id,)).fetchone()
+    if row is None:
+        raise ValueError(f"Dicionário zstd {dict_id} não encontrado no banco.")
+    zdict = zstandard.ZstdCompressionDict(row[0])
+    with _lock:
+        _dicts[dict_id] = zdict
+    return zdict
+
+
+def _dict_for_platform(conn, platform):
+    with _lock:
+        if platform in _platform_dicts:
+            return _platform_dicts[platform]
+    try:
+        row = conn.execute(
+            "SELECT id FROM zstd_dicts WHERE platform = ? ORDER BY id DESC LIMIT 1", (platform,)
+        ).fetchone()
+    except Exception:
+        row = None
+    dict_id = row[0] if row else None
+    with _lock:
+        _platform_dicts[platform] = dict_id
+    return dict_id
+
+
+def reset_dict_cache():
+    """Esquece os dicionários memorizados (após treinar novos)."""
+    with _lock:
+        _dicts.clear()
+        _platform_dicts.clear()
+
+
+def encode(conn, html, platform=None):
+    """Comprime o HTML no codec configurado. Retorna (payload, codec)."""
+    mode = compression_mode()
+    if mode == 'none':
+        return html, None
+
+    data = html.encode('utf-8')
+    if mode == 'zstd':
+        dict_id = _dict_for_platform(conn, platform or DEFAULT_PLATFORM)
+        if dict_id is not None:
+            compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=_load_dict(conn, dict_id))
+            return compressor.compress(data), f"zstd:{dict_id}"
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data), 'zstd'
+    return zlib.compress(data, ZLIB_LEVEL), 'zlib'
+
+
+def decode(conn, payload, codec):
+    """Descomprime o conteúdo de um blob de acordo com o codec gravado."""
+    if payload is None or not codec:
+        return payload
+    if codec == 'zlib':
+        return zlib.decompress(payload).decode('utf-8')
+    if codec.startswith('zstd'):
+        if zstandard is None:
+            raise RuntimeError("HTML armazenado com zstd: instale o pacote 'zstandard'.")
+        _, _, dict_id = codec.partition(':')
+        if dict_id:
+            decompressor = zstandard.ZstdDecompressor(dict_data=_load_dict(conn, int(dict_id)))
+        else:
+            decompressor = zstandard.ZstdDecompressor()
+        return decompressor.decompress(payload).decode('utf-8')
+    raise ValueError(f"Codec de HTML desconhecido: {codec}")
+
+
+def put_blob(conn, html, platform=None):
+    """
+    Grava o HTML (se ainda não existir) na conexão/transação informada.
+    Retorna (hash, tamanho) ou (None, None) para conteúdo vazio.
+    """
+    if not html:
+        return None, None
+    digest, size = content_hash(html)
+    exists = conn.execute("SELECT 1 FROM html_blobs WHERE hash = ?", (digest,)).fetchone()
+    if not exists:
+        payload, codec = encode(conn, html, platform)
+        stored_size = len(payload) if codec else size
+        conn.execute(
+            "INSERT OR IGNORE INTO html_blobs (hash, content, size, stored_size, codec) VALUES (?, ?, ?, ?, ?)",
+            (digest, payload, size, stored_size, codec)
+        )
+    return digest, size
+
+
+def put_validators(conn, url, validators, html_hash):
+    """
+    Registra ETag/Last-Modified da resposta (FetchResult.validators) para o
+    HTML já gravado com put_blob, na mesma transação: o validador só passa a
+    valer se o conteúdo correspondente foi salvo.
+    """
+    if not validators or not html_hash:
+        return
+    etag, last_modified = validators
+    conn.execute("""
+        INSERT INTO http_validators (url, etag, last_modified, html_hash) VALUES (?, ?, ?, ?)
+        ON CONFLICT(url) DO UPDATE SET 
+            etag = excluded.etag, last_modified = excluded.last_modified,
+            html_hash = excluded.html_hash, updated_at = CURRENT_TIMESTAMP
+    """, (url, etag, last_modified, html_hash))
+
+
+def html_columns(alias, blob_alias):
+    """
+    Três colunas SQL que read_html() transforma no HTML da linha: o blob
+    referenciado (conteúdo + codec) e o html_content inline legado.
+    Use com: LEFT JOIN html_blobs {blob_alias} ON {blob_alias}.hash = {alias}.html_hash
+    """
+    return f"{blob_alias}.content, {blob_alias}.codec, {alias}.html_content"
+
+
+def read_html(conn, content, codec, inline):
+    """HTML de uma linha a partir das colunas de html_columns()."""
+    if content is not None:
+        return decode(conn, content, codec)
+    return inline
+
+
+def has_html(alias, inline=True):
+    """
+    Condição SQL 'a linha tem HTML' sem ler o conteúdo (exceto legado inline).
+    `inline=False` para tabelas sem a coluna html_content.
+    """
+    if not inline:
+        return f"({alias}.html_hash IS NOT NULL)"
+    return (f"({alias}.html_hash IS NOT NULL OR "
+            f"({alias}.html_content IS NOT NULL AND {alias}.html_content != ''))")
+
+
+def html_size(alias, inline=True):
+    """Tamanho em bytes do HTML da linha (html_size ou, no legado, o html_content inline)."""
+    if not inline:
+        return f"COALESCE({alias}.html_size, 0)"
+    return f"COALESCE({alias}.html_size, length(CAST({alias}.html_content AS BLOB)), 0)"
+
+
+def delete_orphans(conn):
+    """Remove blobs que nenhuma linha de plb/ppb/ppr referencia mais. Retorna a quantidade."""
+    referenced = " UNION ".join(
+        f"SELECT html_hash FROM {table} WHERE html_hash IS NOT NULL" for table in BLOB_TABLES
+    )
+    cursor = conn.execute(f"DELETE FROM html_blobs WHERE hash NOT IN ({referenced})")
+    return cursor.rowcount
@@ -1,5 +1,18 @@
 import sqlite3
+import threading
+from contextlib import contextmanager
 import config
+from models.db.blob_store import has_html, html_size
+
+# PRAGMAs aplicados UMA vez por conexão (e não a cada chamada de repositório)
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",     # seguro com WAL; fsync só no checkpoint
+    "PRAGMA cache_size=-32000",      # ~32 MB de cache de páginas
+    "PRAGMA mmap_size=268435456",    # 256 MB mapeados em memória
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
 
 class DatabaseManager:
     _instance = None
@@ -12,20 +25,89 @@ class DatabaseManager:
 
     def _initialize(self):
         self.db_name = config.DB_NAME
+        self._local = threading.local()
+        self._readers = []               # [(thread, conexão)] para fechar no fim
+        self._readers_lock = threading.Lock()
+        self._writer_conn = None
+        self._writer_lock = threading.RLock()
         self._init_schema()
         self._run_migrations()
 
+    def _connect(self):
+        conn = sqlite3.connect(self.db_name, check_same_thread=False)
+        for pragma in _PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
     def get_connection(self):
-        """Retorna uma nova conexão com o banco."""
-        return sqlite3.connect(self.db_name, check_same_thread=False)
+        """
+        Retorna a conexão de LEITURA da thread atual (criada e configurada uma
+        única vez por thread). Pode ser usada em `with` como antes: o bloco só
+        controla a transação, a conexão continua aberta para a próxima chamada.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._readers_lock:
+                self._prune_readers()
+                self._readers.append((threading.current_thread(), conn))
+        return conn
+
+    def _prune_readers(self):
+        """Fecha conexões de threads que já terminaram (ex.: pools recriados)."""
+        alive = []
+        for thread, conn in self._readers:
+            if thread.is_alive():
+                alive.append((thread, conn))
+            else:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+        self._readers = alive
+
+    @contextmanager
+    def writer(self):
+        """
+        Conexão ÚNICA de escrita, serializada por lock entre as threads.
+        Faz commit ao sair do bloco (rollback em caso de exceção), evitando
+        disputas de SQLITE_BUSY entre escritores concorrentes.
+        """
+        with self._writer_lock:
+            if self._writer_conn is None:
+                self._writer_conn = self._connect()
+            conn = self._writer_conn
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    def close_all(self):
+        """Fecha todas as conexões abertas (chamado ao encerrar a aplicação)."""
+        with self._readers_lock:
+            for _thread, conn in self._readers:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._readers = []
+        self._local = threading.local()
+        with self._writer_lock:
+            if self._writer_conn is not None:
+                self._writer_conn.close()
+                self._writer_conn = None
 
     def clear_all_tables(self):
         """Limpa todas as tabelas (Zera o banco)."""
-        with self.get_connection() as conn:
+        with self.writer() as conn:
             cursor = conn.cursor()
             cursor.execute("PRAGMA foreign_keys = OFF;")
             
-            tables = ['ppb', 'ppr', 'pesquisas', 'plb', 'logs', 'sources']
+            tables = ['ppb', 'ppr', 'pesquisas', 'plb', 'logs', 'sources', 'html_blobs', 'pesquisas_deleted',
+                      'crawl_jobs', 'http_validators']
             for table in tables:
                 cursor.execute(f"DELETE FROM {table}")
                 cursor.execute(f"DELETE FROM sqlite_sequence WHERE name='{table}'")
@@ -35,8 +117,7 @@ class DatabaseManager:
 
     def _init_schema(self):
         """Cria as tabelas se não existirem (para novos bancos)."""
-        with self.get_connection() as conn:
-            conn.execute("PRAGMA journal_mode=WAL;")
+        with self.writer() as conn:
             cursor = conn.cursor()
             
             # Tabela PLB (Páginas de Lista de Busca - Histórico)
@@ -118,6 +199,84 @@ class DatabaseManager:
                 )
             """)
             
+            # Cache de Content-Type por URL (evita baixar de novo um PDF já identificado)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS content_types (
+                    pattern TEXT PRIMARY KEY,
+                    content_type TEXT,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # Validadores HTTP por URL (ETag/Last-Modified) para requisições condicionais
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS http_validators (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    html_hash TEXT,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # Fila persistente de downloads em lote (ver JobRepository)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS crawl_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    root TEXT,
+                    payload TEXT,
+                    priority INTEGER DEFAULT 0,
+                    status TEXT DEFAULT 'pending',
+                    attempts INTEGER DEFAULT 0,
+                    lease_until REAL,
+                    last_error TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE (kind, url)
+                )
+            """)
+            
+            # Blobs de HTML endereçados por SHA-256 (ver models/db/blob_store.py)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS html_blobs (
+                    hash TEXT PRIMARY KEY,
+                    content BLOB,
+                    size INTEGER,
+                    stored_size INTEGER,
+                    codec TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # Dicionários zstd treinados por plataforma de repositório
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS zstd_dicts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    platform TEXT NOT NULL,
+                    data BLOB NOT NULL,
+                    samples INTEGER,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # Feed de mudanças da grade de resultados: contador global de versões
+            # e registro das pesquisas apagadas (ver ResultsRepository.get_changes_since)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS change_seq (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    version INTEGER NOT NULL
+                )
+            """)
+            cursor.execute("INSERT OR IGNORE INTO change_seq (id, version) VALUES (1, 0)")
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS pesquisas_deleted (
+                    pesquisa_id INTEGER,
+                    row_version INTEGER
+                )
+            """)
+            
             conn.commit()
             
             # Cria índices para melhorar performance
@@ -132,6 +291,22 @@ class DatabaseManager:
         #cursor.execute("CREATE INDEX IF NOT EXISTS idx_pesquisas_status ON pesquisas(status)")
         #cursor.execute("CREATE INDEX IF NOT EXISTS idx_pesquisas_plb_id ON pesquisas(plb_id)")
         
+        # Ordenação da grade de resultados (get_all)
+        try:
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_pesquisas_extracted_at ON pesquisas(extracted_at DESC)")
+        except sqlite3.Error:
+            pass
+        
+        # Feed de mudanças (linhas alteradas desde uma versão)
+        try:
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_pesquisas_row_version ON pesquisas(row_version)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_pesquisas_deleted_version ON pesquisas_deleted(row_version)")
+        except sqlite3.Error:
+            pass
+        
+        # Fila de downloads: seleção dos jobs disponíveis por tipo
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_crawl_jobs_claim ON crawl_jobs(kind, status, priority DESC, id)")
+        
         # Índices para tabela 'ppr'
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_ppr_pesquisa_id ON ppr(pesquisa_id)")
         
@@ -141,11 +316,18 @@ class DatabaseManager:
         # Índices para tabela 'plb'
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_plb_url ON plb(url)")
         
+        # Índices para referências de blob (limpeza de órfãos)
+        for table in ('plb', 'ppb', 'ppr'):
+            try:
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_html_hash ON {table}(html_hash)")
+            except sqlite3.Error:
+                pass  # coluna criada na migração; _create_indexes roda de novo depois dela
+        
         conn.commit()
 
     def _run_migrations(self):
         """Roda scripts de migração para atualizar bancos existentes sem perder dados."""
-        with self.get_connection() as conn:
+        with self.writer() as conn:
             cursor = conn.cursor()
             
             # Verifica colunas na tabela 'pesquisas'
@@ -171,7 +353,188 @@ class DatabaseManager:
             if 'extracted_at' not in cols_ppr:
                 cursor.execute("ALTER TABLE ppr ADD COLUMN extracted_at TIMESTAMP")
             
+            # Para tabela SOURCES: intervalo de cortesia específico por fonte (segundos)
+            cursor.execute("PRAGMA table_info(sources)")
+            cols_sources = [info[1] for info in cursor.fetchall()]
+            if 'delay' not in cols_sources:
+                cursor.execute("ALTER TABLE sources ADD COLUMN delay REAL")
+            
+            # Disjuntor por fonte (ver services/circuit_breaker.py). O status 0/1
+            # continua sendo mantido: 0 enquanto o circuito está aberto.
+            breaker_cols = {
+                'breaker_state': "TEXT DEFAULT 'closed'", 'win_start': "REAL",
+                'win_ok': "INTEGER DEFAULT 0", 'win_fail': "INTEGER DEFAULT 0",
+                'prev_ok': "INTEGER DEFAULT 0", 'prev_fail': "INTEGER DEFAULT 0",
+                'open_until': "REAL", 'trips': "INTEGER DEFAULT 0", 'probe_until': "REAL",
+            }
+            if 'breaker_state' not in cols_sources:
+                for col, decl in breaker_cols.items():
+                    if col not in cols_sources:
+                        cursor.execute(f"ALTER TABLE sources ADD COLUMN {col} {decl}")
+                # Fontes desativadas no modelo antigo: circuito aberto com pausa já
+                # vencida, testadas de novo automaticamente no próximo lote
+                if 'status' in cols_sources:
+                    cursor.execute("UPDATE sources SET breaker_state = 'open', open_until = 0, trips = 1 WHERE status = 0")
+            
+            # Para PLB/PPB/PPR: referência ao blob de HTML (o html_content inline vira legado)
+            for table in ('plb', 'ppb', 'ppr'):
+                cursor.execute(f"PRAGMA table_info({table})")
+                cols = [info[1] for info in cursor.fetchall()]
+                if 'html_hash' not in cols:
+                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN html_hash TEXT")
+                if 'html_size' not in cols:
+                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN html_size INTEGER")
+                if 'fetched_at' not in cols:
+                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN fetched_at TIMESTAMP")
+            
+            # Para PESQUISAS: status/tamanho do HTML materializados (mantidos por triggers)
+            cursor.execute("PRAGMA table_info(pesquisas)")
+            cols_pesq = [info[1] for info in cursor.fetchall()]
+            backfill = False
+            for col in ('has_ppb', 'has_ppr', 'ppb_size', 'ppr_size'):
+                if col not in cols_pesq:
+                    cursor.execute(f"ALTER TABLE pesquisas ADD COLUMN {col} INTEGER DEFAULT 0")
+                    backfill = True
+            if backfill:
+                self._backfill_content_status(cursor)
+            if 'row_version' not in cols_pesq:
+                cursor.execute("ALTER TABLE pesquisas ADD COLUMN row_version INTEGER DEFAULT 0")
+            
+            # Migrações de dados (uma única vez), numeradas em PRAGMA user_version
+            user_version = cursor.execute("PRAGMA user_version").fetchone()[0]
+            if user_version < 1:
+                # CONTENT_TYPES: a chave passou de padrão generalizado (host/#/#) para
+                # a URL exata; os padrões antigos nunca mais casam e são descartados
+                cursor.execute("DELETE FROM content_types WHERE pattern NOT LIKE 'http%'")
+                cursor.execute("PRAGMA user_version = 1")
+            
+            # Para HTML_BLOBS: compressão (codec NULL = texto puro)
+            cursor.execute("PRAGMA table_info(html_blobs)")
+            cols_blobs = [info[1] for info in cursor.fetchall()]
+            if 'stored_size' not in cols_blobs:
+                cursor.execute("ALTER TABLE html_blobs ADD COLUMN stored_size INTEGER")
+            if 'codec' not in cols_blobs:
+                cursor.execute("ALTER TABLE html_blobs ADD COLUMN codec TEXT")
+            
             conn.commit()
             
             # Aplica índices em bancos existentes durante a migração
-            self._create_indexes(conn)
\ No newline at end of file
+            self._create_indexes(conn)
+            self._create_unique_key(conn)
+            self._create_triggers(conn)
+
+    def _create_unique_key(self, conn):
+        """
+        Chave de deduplicação de 'pesquisas' (habilita o INSERT em lote com
+        ON CONFLICT em save_pesquisas). Bancos antigos com duplicatas continuam
+        no caminho registro a registro até elas serem removidas
+        (limpar_banco.py, opção 4).
+        """
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_pesquisas_key 
+                ON pesquisas(title, author, search_term, search_year)
+            """)
+        except sqlite3.IntegrityError:
+            print("Aviso: pesquisas duplicadas impedem o índice idx_pesquisas_key (gravação em lote "
+                  "desativada). Rode 'python limpar_banco.py' e escolha a opção 4 para removê-las.")
+        except sqlite3.Error:
+            pass  # esquema sem as colunas da chave
+        conn.commit()
+
+    def _table_columns(self, cursor, table):
+        cursor.execute(f"PRAGMA table_info({table})")
+        return [info[1] for info in cursor.fetchall()]
+
+    @staticmethod
+    def _content_status_sql(table, inline, pesquisa_id):
+        """
+        SET de has_{table}/{table}_size recalculados a partir de TODAS as linhas
+        da tabela satélite da pesquisa `pesquisa_id` (expressão SQL).
+        """
+        rows = f"FROM {table} t WHERE t.pesquisa_id = {pesquisa_id} AND {has_html('t', inline)}"
+        return f"""
+            has_{table} = EXISTS (SELECT 1 {rows}),
+            {table}_size = COALESCE((SELECT SUM({html_size('t', inline)}) {rows}), 0)
+        """
+
+    def _backfill_content_status(self, cursor):
+        """Preenche has_ppb/has_ppr/ppb_size/ppr_size de bancos existentes (uma única vez)."""
+        for table in ('ppb', 'ppr'):
+            cols = self._table_columns(cursor, table)
+            if 'pesquisa_id' not in cols:
+                continue
+            # Bancos novos não têm o html_content inline em todas as tabelas
+            inline = 'html_content' in cols
+            cursor.execute(f"UPDATE pesquisas SET {self._content_status_sql(table, inline, 'pesquisas.id')}")
+
+    def _create_triggers(self, conn):
+        """
+        Mantém em 'pesquisas' o status (has_ppb/has_ppr) e o tamanho do HTML das
+        tabelas satélite, para a grade de resultados não precisar de JOIN.
+        Os valores são recalculados sobre todas as linhas da pesquisa (como no
+        backfill), e não copiados da linha alterada.
+        """
+        cursor = conn.cursor()
+        for table in ('ppb', 'ppr'):
+            inline = 'html_content' in self._table_columns(cursor, table)
+            watched = "html_hash, html_size, html_content, pesquisa_id" if inline else "html_hash, html_size, pesquisa_id"
+            new_status = f"UPDATE pesquisas SET {self._content_status_sql(table, inline, 'NEW.pesquisa_id')} WHERE id = NEW.pesquisa_id;"
+            old_status = f"UPDATE pesquisas SET {self._content_status_sql(table, inline, 'OLD.pesquisa_id')} WHERE id = OLD.pesquisa_id"
+            try:
+                # Recriados a cada abertura: bancos antigos tinham a versão que copiava a linha NEW
+                for event in ('insert', 'update', 'delete'):
+                    cursor.execute(f"DROP TRIGGER IF EXISTS trg_{table}_status_{event}")
+                cursor.execute(f"""
+                    CREATE TRIGGER trg_{table}_status_insert
+                    AFTER INSERT ON {table}
+                    BEGIN {new_status} END
+                """)
+                cursor.execute(f"""
+                    CREATE TRIGGER trg_{table}_status_update
+                    AFTER UPDATE OF {watched} ON {table}
+                    BEGIN
+                        {new_status}
+                        {old_status} AND OLD.pesquisa_id IS NOT NEW.pesquisa_id;
+                    END
+                """)
+                cursor.execute(f"""
+                    CREATE TRIGGER trg_{table}_status_delete
+                    AFTER DELETE ON {table}
+                    BEGIN {old_status}; END
+                """)
+            except sqlite3.Error as e:
+                print(f"Aviso: triggers de status de '{table}' não criados: {e}")
+        
+        # Versão de linha: toda inserção/alteração em 'pesquisas' recebe o próximo
+        # número de change_seq (inclusive as feitas pelos triggers acima)
+        bump = """
+            UPDATE change_seq SET version = version + 1 WHERE id = 1;
+            UPDATE pesquisas SET row_version = (SELECT version FROM change_seq WHERE id = 1)
+            WHERE id = NEW.id;
+        """
+        try:
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_pesquisas_version_insert
+                AFTER INSERT ON pesquisas
+                BEGIN {bump} END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_pesquisas_version_update
+                AFTER UPDATE ON pesquisas
+                WHEN NEW.row_version IS OLD.row_version
+                BEGIN {bump} END
+            """)
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_pesquisas_version_delete
+                AFTER DELETE ON pesquisas
+                BEGIN
+                    UPDATE change_seq SET version = version + 1 WHERE id = 1;
+                    INSERT INTO pesquisas_deleted (pesquisa_id, row_version)
+                    VALUES (OLD.id, (SELECT version FROM change_seq WHERE id = 1));
+                END
+            """)
+        except sqlite3.Error as e:
+            print(f"Aviso: triggers de versão de 'pesquisas' não criados: {e}")
+        conn.commit()
\ No newline at end of file
@@ -1,5 +1,5 @@
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
+from parsers.parsed_document import make_soup
 
 class VufindParser:
     """
@@ -9,7 +9,7 @@ class VufindParser:
     
     def extract(self, html_content, base_url):
         """Método padrão chamado pelo HistoryViewModel."""
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = make_soup(html_content)
         return self.parse(soup, base_url)
 
     def parse(self, soup, base_url):
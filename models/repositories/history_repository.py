@@ -1,5 +1,7 @@
 from .base_repository import BaseRepository
+from models.db.blob_store import put_blob, put_validators, platform_of, html_columns, read_html
 import sqlite3
+import json
 
 class HistoryRepository(BaseRepository):
     def get_all(self):
@@ -20,26 +22,34 @@ class HistoryRepository(BaseRepository):
     def get_by_id(self, plb_id):
         with self.db.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id, url, html_content, search_term, search_year 
-                FROM plb WHERE id = ?
+            cursor.execute(f"""
+                SELECT t.id, t.url, t.search_term, t.search_year, {html_columns('t', 'hb')} 
+                FROM plb t
+                LEFT JOIN html_blobs hb ON hb.hash = t.html_hash
+                WHERE t.id = ?
             """, (plb_id,))
-            return cursor.fetchone()
+            row = cursor.fetchone()
+            if not row:
+                return None
+            # Mesmo formato de antes: (id, url, html, search_term, search_year)
+            return (row[0], row[1], read_html(conn, *row[4:]), row[2], row[3])
 
-    def save(self, url, html_content, term=None, year=None):
+    def save(self, url, html_content, term=None, year=None, validators=None):
         try:
-            with self.db.get_connection() as conn:
+            with self.db.writer() as conn:
                 cursor = conn.cursor()
+                html_hash, html_size = put_blob(conn, html_content, platform_of(url))
                 cursor.execute("""
-                    INSERT INTO plb (url, html_content, search_term, search_year) 
-                    VALUES (?, ?, ?, ?)
-                """, (url, html_content, term, year))
+                    INSERT INTO plb (url, html_hash, html_size, fetched_at, search_term, search_year) 
+                    VALUES (?, ?, ?, CURRENT_TIMESTAMP, ?, ?)
+                """, (url, html_hash, html_size, term, year))
+                put_validators(conn, url, validators, html_hash)
                 conn.commit()
         except sqlite3.Error as e:
             raise Exception(f"Erro ao salvar PLB: {e}")
 
     def delete(self, plb_id):
-        with self.db.get_connection() as conn:
+        with self.db.writer() as conn:
             conn.execute("DELETE FROM plb WHERE id = ?", (plb_id,))
             conn.commit()
 
@@ -52,6 +62,24 @@ class HistoryRepository(BaseRepository):
         except sqlite3.Error:
             return False
 
+    def get_existing_urls(self, urls):
+        """
+        Retorna o subconjunto de `urls` que já existe na tabela plb.
+        Usa uma única consulta (lista enviada como JSON) em vez de uma por URL.
+        """
+        if not urls:
+            return set()
+        try:
+            with self.db.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT url FROM plb 
+                    WHERE url IN (SELECT value FROM json_each(?))
+                """, (json.dumps(list(urls)),))
+                return {row[0] for row in cursor.fetchall()}
+        except sqlite3.Error:
+            return set()
+
     def get_existing_searches(self):
         """
         Retorna lista única de (termo, ano) já pesquisados.
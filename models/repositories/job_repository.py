@@ -0,0 +1,192 @@
+from .base_repository import BaseRepository
+from services.host_scheduler import HostScheduler
+import json
+import time
+
+class JobRepository(BaseRepository):
+    """
+    Fila persistente de downloads em lote (tabela crawl_jobs).
+
+    Cada job é uma URL de um tipo (`kind`: 'ppr' nos downloads de repositório,
+    'plb' no DeepScrap) com status pending -> leased -> done/failed.
+    Os trabalhadores reservam jobs com claim() (UPDATE ... RETURNING atômico),
+    que grava um prazo de reserva (lease_until); reservas vencidas voltam a
+    ser distribuídas. Assim um lote interrompido (Parar, janela fechada ou
+    queda do programa) continua de onde parou, sem consultar de novo as
+    pendências nem baixar o que já foi concluído.
+
+    Em jobs pendentes, lease_until guarda o horário da próxima tentativa
+    (falhas são repetidas até MAX_ATTEMPTS vezes, com RETRY_DELAY de espera;
+    jobs de fontes em pausa são adiados com defer()).
+
+    Jobs entregues à fila de desafios (navegador visível, ver ChallengeLane)
+    passam para o status 'challenge': claim() não os distribui de novo,
+    mesmo que a espera na fila lenta ultrapasse o prazo da reserva.
+    """
+
+    LEASE_SECONDS = 1800
+    MAX_ATTEMPTS = 3
+    RETRY_DELAY = 300
+
+    def enqueue(self, kind, jobs, priority=0):
+        """
+        Adiciona `jobs` [(url, payload_dict)] à fila. URLs já concluídas ou
+        falhas voltam a ficar pendentes; as reservadas não mudam.
+        """
+        rows = [(kind, url, HostScheduler.root_of(url), json.dumps(payload or {}), priority)
+                for url, payload in jobs]
+        if not rows:
+            return
+        with self.db.writer() as conn:
+            conn.executemany("""
+                INSERT INTO crawl_jobs (kind, url, root, payload, priority) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(kind, url) DO UPDATE SET
+                    payload = excluded.payload, priority = excluded.priority,
+                    status = 'pending', attempts = 0, lease_until = NULL, last_error = NULL,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE crawl_jobs.status NOT IN ('leased', 'challenge')
+            """, rows)
+            conn.commit()
+
+    def claim(self, kind, limit, lease_seconds=None, skip_roots=()):
+        """
+        Reserva até `limit` jobs disponíveis, alternando entre hosts (um de cada
+        raiz por vez) para manter o paralelismo do HostScheduler. Raízes em
+        `skip_roots` ficam de fora (ex: fila de desafios já cheia para o host).
+        Retorna [{id, url, payload, attempts}].
+        """
+        now = time.time()
+        lease_until = now + (lease_seconds or self.LEASE_SECONDS)
+        with self.db.writer() as conn:
+            rows = conn.execute("""
+                UPDATE crawl_jobs
+                SET status = 'leased', lease_until = ?, attempts = attempts + 1,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id IN (
+                    SELECT id FROM (
+                        SELECT id, priority,
+                               ROW_NUMBER() OVER (PARTITION BY root ORDER BY priority DESC, id) AS turn
+                        FROM crawl_jobs
+                        WHERE kind = ? AND (
+                            (status = 'pending' AND (lease_until IS NULL OR lease_until <= ?))
+                            OR (status = 'leased' AND lease_until <= ?)
+                        )
+                        AND root NOT IN (SELECT value FROM json_each(?))
+                    )
+                    ORDER BY turn, priority DESC, id
+                    LIMIT ?
+                )
+                RETURNING id, url, payload, attempts
+            """, (lease_until, kind, now, now, json.dumps(list(skip_roots)), limit)).fetchall()
+            conn.commit()
+        jobs = [{'id': row[0], 'url': row[1], 'payload': json.loads(row[2] or '{}'), 'attempts': row[3]}
+                for row in rows]
+        jobs.sort(key=lambda job: job['id'])
+        return jobs
+
+    def complete(self, job_id):
+        with self.db.writer() as conn:
+            conn.execute("""
+                UPDATE crawl_jobs SET status = 'done', lease_until = NULL, last_error = NULL,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (job_id,))
+            conn.commit()
+
+    def fail(self, job_id, error):
+        """Registra a falha; o job volta à fila (após RETRY_DELAY) até esgotar as tentativas."""
+        with self.db.writer() as conn:
+            conn.execute("""
+                UPDATE crawl_jobs
+                SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                    lease_until = CASE WHEN attempts >= ? THEN NULL ELSE ? END,
+                    last_error = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (self.MAX_ATTEMPTS, self.MAX_ATTEMPTS, time.time() + self.RETRY_DELAY,
+                  str(error)[:500], job_id))
+            conn.commit()
+
+    def defer(self, job_id, until, reason):
+        """Adia o job sem contar tentativa (ex: fonte em pausa pelo disjuntor até `until`)."""
+        with self.db.writer() as conn:
+            conn.execute("""
+                UPDATE crawl_jobs SET status = 'pending', lease_until = ?, last_error = ?,
+                    attempts = MAX(attempts - 1, 0), updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (until, reason, job_id))
+            conn.commit()
+
+    def to_challenge(self, job_id, lease_seconds=None):
+        """Marca o job como entregue à fila de desafios (fora do alcance de claim())."""
+        with self.db.writer() as conn:
+            conn.execute("""
+                UPDATE crawl_jobs SET status = 'challenge', lease_until = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND status = 'leased'
+            """, (time.time() + (lease_seconds or self.LEASE_SECONDS), job_id))
+            conn.commit()
+
+    def renew(self, job_ids, lease_seconds=None):
+        """Prorroga a reserva dos jobs ainda em andamento (reservados ou na fila de desafios)."""
+        if not job_ids:
+            return
+        with self.db.writer() as conn:
+            conn.execute("""
+                UPDATE crawl_jobs SET lease_until = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE status IN ('leased', 'challenge') AND id IN (SELECT value FROM json_each(?))
+            """, (time.time() + (lease_seconds or self.LEASE_SECONDS), json.dumps(list(job_ids))))
+            conn.commit()
+
+    def release(self, job_ids):
+        """Devolve à fila os jobs reservados que não chegaram a ser processados (ex: Parar)."""
+        if not job_ids:
+            return
+        with self.db.writer() as conn:
+            conn.execute("""
+                UPDATE crawl_jobs SET status = 'pending', lease_until = NULL,
+                    attempts = MAX(attempts - 1, 0), updated_at = CURRENT_TIMESTAMP
+                WHERE status IN ('leased', 'challenge') AND id IN (SELECT value FROM json_each(?))
+            """, (json.dumps(list(job_ids)),))
+            conn.commit()
+
+    def recover(self):
+        """
+        Na abertura do programa: libera as reservas deixadas por uma execução
+        anterior (o programa usa uma única instância por banco). Retorna quantas.
+        """
+        try:
+            with self.db.writer() as conn:
+                cursor = conn.execute("""
+                    UPDATE crawl_jobs SET status = 'pending', lease_until = NULL,
+                        attempts = MAX(attempts - 1, 0), updated_at = CURRENT_TIMESTAMP
+                    WHERE status IN ('leased', 'challenge')
+                """)
+                conn.commit()
+                return cursor.rowcount
+        except Exception as e:
+            print(f"Erro ao recuperar fila de downloads: {e}")
+            return 0
+
+    def next_due(self, kind):
+        """Horário (epoch) da próxima tentativa agendada entre os pendentes, ou None."""
+        try:
+            with self.db.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT MIN(lease_until) FROM crawl_jobs 
+                    WHERE kind = ? AND status = 'pending' AND lease_until IS NOT NULL
+                """, (kind,))
+                return cursor.fetchone()[0]
+        except:
+            return None
+
+    def count_open(self, kind):
+        """Jobs ainda por fazer (pendentes, reservados ou na fila de desafios)."""
+        try:
+            with self.db.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT COUNT(*) FROM crawl_jobs WHERE kind = ? AND status IN ('pending', 'leased', 'challenge')
+                """, (kind,))
+                return cursor.fetchone()[0]
+        except:
+            return 0
@@ -1,25 +1,141 @@
 from .base_repository import BaseRepository
+from models.db.blob_store import put_blob, put_validators, platform_of, html_columns, read_html, has_html
 import sqlite3
 
 class ResultsRepository(BaseRepository):
     def get_all(self):
+        """
+        Linhas da grade de resultados. has_ppb/has_ppr (e ppb_size/ppr_size) são
+        colunas de 'pesquisas' mantidas por triggers: nenhum JOIN, nenhum HTML lido.
+        """
         with self.db.get_connection() as conn:
             cursor = conn.cursor()
-            # Left Join para verificar existência de conteúdo HTML
-            cursor.execute("""
-                SELECT p.*,
-                       CASE WHEN b.html_content IS NOT NULL AND b.html_content != '' THEN 1 ELSE 0 END as has_ppb,
-                       CASE WHEN r.html_content IS NOT NULL AND r.html_content != '' THEN 1 ELSE 0 END as has_ppr
-                FROM pesquisas p
-                LEFT JOIN ppb b ON b.pesquisa_id = p.id
-                LEFT JOIN ppr r ON r.pesquisa_id = p.id
-                ORDER BY p.extracted_at DESC
-            """)
+            cursor.execute("SELECT p.* FROM pesquisas p ORDER BY p.extracted_at DESC")
             cols = [description[0] for description in cursor.description]
             return [dict(zip(cols, row)) for row in cursor.fetchall()]
 
-    def save_pesquisas(self, data, term=None, year=None):
+    def get_current_version(self):
+        """Versão atual do feed de mudanças (consulte ANTES de get_all)."""
         with self.db.get_connection() as conn:
+            row = conn.execute("SELECT version FROM change_seq WHERE id = 1").fetchone()
+            return row[0] if row else 0
+
+    def get_changes_since(self, version):
+        """
+        Feed de mudanças da grade de resultados.
+        Retorna (nova_versão, linhas_alteradas, ids_apagados): as linhas (mesmo
+        formato de get_all) inseridas/alteradas com row_version > `version` e os
+        ids de pesquisas apagadas desde então.
+        """
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        # Mesmo snapshot para as duas consultas (nenhuma versão intermediária se perde).
+        # A conexão de leitura é compartilhada pela thread: a transação sempre é fechada.
+        cursor.execute("BEGIN")
+        try:
+            cursor.execute("""
+                SELECT p.* FROM pesquisas p 
+                WHERE p.row_version > ? 
+                ORDER BY p.row_version
+            """, (version,))
+            cols = [description[0] for description in cursor.description]
+            rows = [dict(zip(cols, row)) for row in cursor.fetchall()]
+
+            cursor.execute("""
+                SELECT pesquisa_id, row_version FROM pesquisas_deleted 
+                WHERE row_version > ?
+            """, (version,))
+            deleted = cursor.fetchall()
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+
+        new_version = max([version] + [row['row_version'] for row in rows] + [v for _, v in deleted])
+        return new_version, rows, [pid for pid, _ in deleted]
+
+    def prune_deleted(self, version):
+        """
+        Remove os registros de exclusão já aplicados pela grade (row_version <=
+        `version`, a versão consumida por ela). Uma nova abertura recarrega
+        tudo com get_all, então os antigos não são mais necessários.
+        """
+        try:
+            with self.db.writer() as conn:
+                conn.execute("DELETE FROM pesquisas_deleted WHERE row_version <= ?", (version,))
+                conn.commit()
+        except Exception as e:
+            print(f"Erro ao limpar registros de exclusão: {e}")
+
+    # Linhas por INSERT multi-VALUES (9 parâmetros cada; bem abaixo do limite do SQLite)
+    BULK_CHUNK = 500
+
+    def _has_unique_key(self):
+        """Verifica (uma vez) se o índice único de deduplicação existe."""
+        if getattr(self, '_unique_key', None) is None:
+            with self.db.get_connection() as conn:
+                row = conn.execute("""
+                    SELECT 1 FROM sqlite_master 
+                    WHERE type = 'index' AND name = 'idx_pesquisas_key'
+                """).fetchone()
+            self._unique_key = row is not None
+            if not self._unique_key:
+                print("Aviso: índice idx_pesquisas_key ausente (duplicatas no banco?). "
+                      "Usando gravação registro a registro.")
+        return self._unique_key
+
+    def save_pesquisas(self, data, term=None, year=None):
+        """
+        Grava os resultados de uma PLB e cria as linhas filhas ppb/ppr.
+        Retorna quantos registros NOVOS foram inseridos.
+
+        Caminho em lote: INSERT multi-VALUES ... ON CONFLICT DO NOTHING RETURNING,
+        apoiado no índice único (title, author, search_term, search_year), e um
+        executemany para as filhas. Tudo numa única transação.
+        """
+        if not data:
+            return 0
+        if not self._has_unique_key():
+            return self._save_pesquisas_legacy(data, term, year)
+
+        # Deduplica o próprio lote pela chave; mantém a primeira ocorrência
+        items = {}
+        for item in data:
+            items.setdefault((item.get('title'), item.get('author')), item)
+        items = list(items.values())
+
+        saved_count = 0
+        with self.db.writer() as conn:
+            for start in range(0, len(items), self.BULK_CHUNK):
+                chunk = items[start:start + self.BULK_CHUNK]
+                params = []
+                for item in chunk:
+                    params.extend((
+                        item.get('title'), item.get('author'), item.get('ppb_link'), item.get('ppr_link'),
+                        '-', 'Pendente', '-',
+                        term, year
+                    ))
+                placeholders = ", ".join(["(?, ?, ?, ?, ?, ?, ?, ?, ?)"] * len(chunk))
+                inserted = conn.execute(f"""
+                    INSERT INTO pesquisas (
+                        title, author, ppb_link, ppr_link, 
+                        univ_sigla, univ_nome, programa,
+                        search_term, search_year
+                    ) VALUES {placeholders}
+                    ON CONFLICT DO NOTHING
+                    RETURNING id, ppb_link, ppr_link
+                """, params).fetchall()
+
+                if inserted:
+                    conn.executemany("INSERT OR IGNORE INTO ppb (pesquisa_id, url) VALUES (?, ?)",
+                                     [(pid, ppb) for pid, ppb, _ in inserted])
+                    conn.executemany("INSERT OR IGNORE INTO ppr (pesquisa_id, url) VALUES (?, ?)",
+                                     [(pid, ppr) for pid, _, ppr in inserted])
+                saved_count += len(inserted)
+        return saved_count
+
+    def _save_pesquisas_legacy(self, data, term=None, year=None):
+        """Caminho registro a registro (bancos sem o índice único idx_pesquisas_key)."""
+        with self.db.writer() as conn:
             cursor = conn.cursor()
             saved_count = 0
             for item in data:
@@ -65,60 +181,110 @@ class ResultsRepository(BaseRepository):
             cursor.execute("""
                 SELECT p.id, p.ppr_link 
                 FROM pesquisas p
-                LEFT JOIN ppr r ON r.pesquisa_id = p.id
                 WHERE p.ppr_link IS NOT NULL AND p.ppr_link != '' 
-                  AND (r.html_content IS NULL OR r.html_content = '')
+                  AND p.has_ppr = 0
             """)
             return cursor.fetchall()
 
-    def save_content(self, url, html, doc_type):
+    def save_content(self, url, html, doc_type, validators=None):
+        """Grava o HTML da URL e, na mesma transação, seus validadores HTTP (FetchResult.validators)."""
         table = "ppb" if doc_type == 'buscador' else "ppr"
-        with self.db.get_connection() as conn:
+        with self.db.writer() as conn:
+            html_hash, html_size = put_blob(conn, html, platform_of(url))
             conn.execute(f"""
                 UPDATE {table} 
-                SET html_content = ?, extracted_at = CURRENT_TIMESTAMP
+                SET html_hash = ?, html_size = ?, html_content = NULL,
+                    fetched_at = CURRENT_TIMESTAMP, extracted_at = CURRENT_TIMESTAMP
                 WHERE url = ?
-            """, (html, url))
+            """, (html_hash, html_size, url))
+            put_validators(conn, url, validators, html_hash)
+            conn.commit()
+
+    def link_content(self, url, html_hash, doc_type):
+        """
+        Resposta 304 (não modificado): aponta a linha para o blob já armazenado,
+        sem regravar o HTML. Só escreve se a linha perdeu a referência (ex: após
+        clear_html_content). Retorna quantas linhas mudaram.
+        """
+        table = "ppb" if doc_type == 'buscador' else "ppr"
+        with self.db.writer() as conn:
+            cursor = conn.execute(f"""
+                UPDATE {table} 
+                SET html_hash = ?, html_size = (SELECT size FROM html_blobs WHERE hash = ?),
+                    html_content = NULL, fetched_at = CURRENT_TIMESTAMP
+                WHERE url = ? AND html_hash IS NOT ?
+            """, (html_hash, html_hash, url, html_hash))
             conn.commit()
+            return cursor.rowcount
 
     def get_extracted_html(self, title, author, doc_type='ppb'):
         table = "ppb" if doc_type == 'ppb' else "ppr"
         with self.db.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(f"""
-                SELECT t.html_content 
+                SELECT {html_columns('t', 'hb')} 
                 FROM {table} t
                 JOIN pesquisas p ON t.pesquisa_id = p.id
+                LEFT JOIN html_blobs hb ON hb.hash = t.html_hash
                 WHERE p.title=? AND p.author=?
             """, (title, author))
             res = cursor.fetchone()
-            return res[0] if res else None
+            return read_html(conn, *res) if res else None
 
     def get_ppr_data(self, title, author):
-        """Retorna (url, html) do PPR para extração correta baseada no domínio."""
+        """Retorna (pesquisa_id, url, html) do PPR para extração correta baseada no domínio."""
         with self.db.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT t.url, t.html_content 
+            cursor.execute(f"""
+                SELECT p.id, t.url, {html_columns('t', 'hb')} 
                 FROM ppr t
                 JOIN pesquisas p ON t.pesquisa_id = p.id
+                LEFT JOIN html_blobs hb ON hb.hash = t.html_hash
                 WHERE p.title=? AND p.author=?
             """, (title, author))
-            return cursor.fetchone()
+            res = cursor.fetchone()
+            return (res[0], res[1], read_html(conn, *res[2:])) if res else None
 
     def get_all_ppr_with_html(self):
-        with self.db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT p.title, p.author, r.url, r.html_content 
-                FROM ppr r
-                JOIN pesquisas p ON r.pesquisa_id = p.id
-                WHERE r.html_content IS NOT NULL AND r.html_content != ''
-            """)
-            return cursor.fetchall()
+        return list(self.iter_all_ppr_with_html())
+
+    def iter_all_ppr_with_html(self, chunk_size=200):
+        """Versão em fluxo de get_all_ppr_with_html (paginada por ppr.id)."""
+        for _pid, title, author, url, html in self._iter_ppr_html("", chunk_size):
+            yield title, author, url, html
+
+    def _iter_ppr_html(self, extra_filter, chunk_size):
+        """
+        Percorre os PPRs com HTML em blocos de `chunk_size`, usando paginação por
+        chave (r.id > último id) em vez de OFFSET ou fetchall(). Apenas um bloco
+        de HTML fica em memória por vez. Gera (pesquisa_id, title, author, url, html).
+        """
+        last_id = 0
+        while True:
+            with self.db.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                    SELECT r.id, p.id, p.title, p.author, r.url, {html_columns('r', 'hb')} 
+                    FROM ppr r
+                    JOIN pesquisas p ON r.pesquisa_id = p.id
+                    LEFT JOIN html_blobs hb ON hb.hash = r.html_hash
+                    WHERE r.id > ?
+                      AND {has_html('r')}
+                      {extra_filter}
+                    ORDER BY r.id
+                    LIMIT ?
+                """, (last_id, chunk_size))
+                # Descomprime o bloco ainda com a conexão (dicionários zstd vêm do banco)
+                rows = [row[:5] + (read_html(conn, *row[5:]),) for row in cursor.fetchall()]
+
+            if not rows:
+                return
+            for row in rows:
+                yield row[1:]
+            last_id = rows[-1][0]
 
     def update_univ_data(self, title, author, sigla, nome, programa):
-        with self.db.get_connection() as conn:
+        with self.db.writer() as conn:
             conn.execute("""
                 UPDATE pesquisas 
                 SET univ_sigla = ?, univ_nome = ?, programa = ?
@@ -126,25 +292,56 @@ class ResultsRepository(BaseRepository):
             """, (sigla, nome, programa, title, author))
             conn.commit()
             
+    def update_univ_data_batch(self, rows, chunk_size=500):
+        """
+        Aplica várias atualizações de universidade pela chave primária.
+        rows: iterável de (pesquisa_id, sigla, nome, programa).
+        Cada bloco de `chunk_size` linhas vira um único executemany numa única
+        transação (um fsync por bloco, não por registro).
+        """
+        rows = list(rows)
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            with self.db.writer() as conn:
+                conn.executemany("""
+                    UPDATE pesquisas 
+                    SET univ_sigla = ?, univ_nome = ?, programa = ?
+                    WHERE id = ?
+                """, [(sigla, nome, programa, pid) for pid, sigla, nome, programa in chunk])
+                conn.commit()
+        return len(rows)
+
+    # Registros com HTML (PPR) cuja sigla ainda não foi identificada ('-' ou 'DSpace')
+    _REPROCESS_FILTER = "AND (p.univ_sigla = '-' OR p.univ_sigla = 'DSpace' OR p.univ_sigla IS NULL)"
+
     def get_ppr_for_reprocessing(self):
         """
         Busca registros que têm HTML (PPR) mas a sigla ainda não foi 
-        identificada corretamente ('-' ou 'DSpace').
+        identificada corretamente ('-' ou 'DSpace'). Retorna (pesquisa_id, url, html).
+        Prefira iter_ppr_for_reprocessing em acervos grandes.
         """
         try:
-            with self.db.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT p.title, p.author, p.ppr_link, r.html_content 
-                    FROM ppr r
-                    JOIN pesquisas p ON r.pesquisa_id = p.id
-                    WHERE r.html_content IS NOT NULL AND r.html_content != ''
-                    AND (p.univ_sigla = '-' OR p.univ_sigla = 'DSpace' OR p.univ_sigla IS NULL)
-                """)
-                return cursor.fetchall()
+            return list(self.iter_ppr_for_reprocessing())
         except Exception as e:
             print(f"Erro ao buscar registros para reprocessamento: {e}")
             return []
+
+    def iter_ppr_for_reprocessing(self, chunk_size=200):
+        """Versão em fluxo de get_ppr_for_reprocessing: memória limitada a um bloco."""
+        for pid, _title, _author, url, html in self._iter_ppr_html(self._REPROCESS_FILTER, chunk_size):
+            yield pid, url, html
+
+    def count_ppr_for_reprocessing(self):
+        """Quantidade de registros pendentes de reprocessamento (pelo status materializado)."""
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT COUNT(*) 
+                FROM pesquisas p
+                WHERE p.has_ppr = 1
+                {self._REPROCESS_FILTER}
+            """)
+            return cursor.fetchone()[0]
         
     def clear_html_content(self, title, author, target_type):
         """
@@ -155,7 +352,7 @@ class ResultsRepository(BaseRepository):
         table = "ppb" if target_type == 'ppb' else "ppr"
         
         try:
-            with self.db.get_connection() as conn:
+            with self.db.writer() as conn:
                 # 1. Encontra o ID da pesquisa
                 cursor = conn.cursor()
                 cursor.execute("SELECT id FROM pesquisas WHERE title = ? AND author = ?", (title, author))
@@ -164,7 +361,10 @@ class ResultsRepository(BaseRepository):
                 if row:
                     pesquisa_id = row[0]
                     # 2. Atualiza a tabela satélite correspondente usando o ID encontrado
-                    conn.execute(f"UPDATE {table} SET html_content = NULL WHERE pesquisa_id = ?", (pesquisa_id,))
+                    conn.execute(f"""
+                        UPDATE {table} SET html_content = NULL, html_hash = NULL, html_size = NULL 
+                        WHERE pesquisa_id = ?
+                    """, (pesquisa_id,))
                     conn.commit()
                     return True
                 return False
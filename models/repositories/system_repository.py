@@ -1,46 +1,108 @@
 from .base_repository import BaseRepository
+from models.db.blob_store import decode
+from services.circuit_breaker import CircuitBreaker, CLOSED, OPEN, new_state
 import sqlite3
+import time
+import config
+
+BREAKER_COLUMNS = ('breaker_state', 'win_start', 'win_ok', 'win_fail', 'prev_ok', 'prev_fail',
+                   'open_until', 'trips', 'probe_until')
 
 class SystemRepository(BaseRepository):
+    def __init__(self, db_manager):
+        super().__init__(db_manager)
+        self.breaker = CircuitBreaker(
+            window=getattr(config, 'BREAKER_WINDOW', 300),
+            min_requests=getattr(config, 'BREAKER_MIN_REQUESTS', 5),
+            error_rate=getattr(config, 'BREAKER_ERROR_RATE', 0.5),
+            cooldown=getattr(config, 'BREAKER_COOLDOWN', 600),
+            max_cooldown=getattr(config, 'BREAKER_MAX_COOLDOWN', 21600),
+        )
+
     def log_event(self, message):
         """Salva log no banco."""
         try:
-            with self.db.get_connection() as conn:
+            with self.db.writer() as conn:
                 conn.execute("INSERT INTO logs (message) VALUES (?)", (message,))
                 conn.commit()
         except Exception as e:
             print(f"Erro ao salvar log: {e}")
 
+    @staticmethod
+    def _root_of(url):
+        from urllib.parse import urlparse
+        parsed = urlparse(url)
+        # Padronização: Sempre usa scheme + netloc (https://site.com)
+        return f"{parsed.scheme}://{parsed.netloc}"
+
+    def _load_breaker(self, conn, root_url):
+        row = conn.execute(f"SELECT {', '.join(BREAKER_COLUMNS)} FROM sources WHERE root_url = ?",
+                           (root_url,)).fetchone()
+        state = new_state()
+        if row:
+            state.update({col: value for col, value in zip(BREAKER_COLUMNS, row) if value is not None})
+        return state
+
+    def _save_breaker(self, conn, root_url, state):
+        values = [state[col] for col in BREAKER_COLUMNS]
+        status = 0 if state['breaker_state'] == OPEN else 1
+        conn.execute(f"""
+            INSERT INTO sources (root_url, status, {', '.join(BREAKER_COLUMNS)}) 
+            VALUES (?, ?, {', '.join('?' for _ in BREAKER_COLUMNS)})
+            ON CONFLICT(root_url) DO UPDATE SET status = excluded.status,
+                {', '.join(f'{col} = excluded.{col}' for col in BREAKER_COLUMNS)}
+        """, (root_url, status, *values))
+
     def update_source_status(self, root_url, status):
-        """Atualiza status da fonte (1=Ativo, 0=Inativo/Erro)."""
+        """Registra sucesso (True) ou falha (False) de uma requisição no disjuntor da fonte."""
         try:
-            with self.db.get_connection() as conn:
-                conn.execute("""
-                    INSERT INTO sources (root_url, status) VALUES (?, ?)
-                    ON CONFLICT(root_url) DO UPDATE SET status = excluded.status
-                """, (root_url, 1 if status else 0))
+            with self.db.writer() as conn:
+                state = self._load_breaker(conn, root_url)
+                previous = state['breaker_state']
+                self.breaker.record(state, bool(status), time.time())
+                self._save_breaker(conn, root_url, state)
                 conn.commit()
+            if state['breaker_state'] != previous:
+                print(f"Disjuntor {root_url}: {previous} -> {state['breaker_state']}")
         except Exception as e:
             print(f"Erro ao atualizar source: {e}")
 
     def is_source_allowed(self, url):
-        """Verifica se a URL raiz está marcada como ativa (1)."""
-        from urllib.parse import urlparse
+        """
+        Consulta o disjuntor da fonte: fechado libera; aberto bloqueia até o fim
+        da pausa, quando passa a meio-aberto e libera uma requisição de teste.
+        """
         try:
-            parsed = urlparse(url)
-            # Padronização: Sempre usa scheme + netloc (https://site.com)
-            root = f"{parsed.scheme}://{parsed.netloc}"
-            
+            root = self._root_of(url)
             with self.db.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("SELECT status FROM sources WHERE root_url = ?", (root,))
+                cursor.execute("SELECT breaker_state, open_until FROM sources WHERE root_url = ?", (root,))
                 res = cursor.fetchone()
-                # Se não existe, assume permitido (1). Se existe, retorna status.
-                if res is None: return True
-                return res[0] == 1
+            # Se não existe ou está fechado, permitido
+            if res is None or res[0] in (None, CLOSED):
+                return True
+            if res[0] == OPEN and time.time() < (res[1] or 0):
+                return False
+
+            # Transição (sonda): relida e gravada sob o lock de escrita
+            with self.db.writer() as conn:
+                state = self._load_breaker(conn, root)
+                allowed, changed = self.breaker.allow(state, time.time())
+                if changed:
+                    self._save_breaker(conn, root, state)
+                    conn.commit()
+            return allowed
         except:
             return True
 
+    def get_source_retry_at(self, url):
+        """Horário (epoch) em que a fonte volta a aceitar requisições, ou None."""
+        try:
+            with self.db.get_connection() as conn:
+                return self.breaker.retry_at(self._load_breaker(conn, self._root_of(url)))
+        except:
+            return None
+
     def get_sources(self):
         """Retorna dicionário {url: status} de todas as fontes."""
         try:
@@ -51,10 +113,86 @@ class SystemRepository(BaseRepository):
         except:
             return {}
 
-    def reset_blocked_sources(self):
-        """Remove todas as fontes que estão marcadas como desativadas (status = 0)."""
+    def get_source_delays(self):
+        """Retorna {root_url: delay} das fontes com intervalo de cortesia próprio."""
+        try:
+            with self.db.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT root_url, delay FROM sources WHERE delay IS NOT NULL")
+                return {row[0]: row[1] for row in cursor.fetchall()}
+        except:
+            return {}
+
+    def save_source_delays(self, delays):
+        """Grava {root_url: delay} aprendidos pelo controle de taxa, em uma transação."""
+        try:
+            with self.db.writer() as conn:
+                conn.executemany("""
+                    INSERT INTO sources (root_url, status, delay) VALUES (?, 1, ?)
+                    ON CONFLICT(root_url) DO UPDATE SET delay = excluded.delay
+                """, list(delays.items()))
+                conn.commit()
+        except Exception as e:
+            print(f"Erro ao salvar intervalos das fontes: {e}")
+
+    def get_content_types(self, max_age_days=None):
+        """Retorna {url: content_type} aprendidos em downloads anteriores (nos últimos `max_age_days`)."""
+        try:
+            with self.db.get_connection() as conn:
+                cursor = conn.cursor()
+                if max_age_days:
+                    cursor.execute("SELECT pattern, content_type FROM content_types WHERE updated_at >= datetime('now', ?)",
+                                   (f"-{int(max_age_days)} days",))
+                else:
+                    cursor.execute("SELECT pattern, content_type FROM content_types")
+                return {row[0]: row[1] for row in cursor.fetchall()}
+        except:
+            return {}
+
+    def save_content_type(self, pattern, content_type):
+        """Registra (ou atualiza) o Content-Type observado para uma URL."""
+        try:
+            with self.db.writer() as conn:
+                conn.execute("""
+                    INSERT INTO content_types (pattern, content_type) VALUES (?, ?)
+                    ON CONFLICT(pattern) DO UPDATE SET 
+                        content_type = excluded.content_type, updated_at = CURRENT_TIMESTAMP
+                """, (pattern, content_type))
+                conn.commit()
+        except Exception as e:
+            print(f"Erro ao salvar content-type: {e}")
+
+    def get_http_validator(self, url):
+        """
+        Retorna (etag, last_modified, html_hash) da última resposta da URL, ou None.
+        Só vale se o HTML correspondente ainda estiver em html_blobs.
+        """
+        try:
+            with self.db.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT v.etag, v.last_modified, v.html_hash FROM http_validators v
+                    JOIN html_blobs hb ON hb.hash = v.html_hash
+                    WHERE v.url = ?
+                """, (url,))
+                return cursor.fetchone()
+        except:
+            return None
+
+    def get_blob_html(self, html_hash):
+        """HTML armazenado em html_blobs pelo hash (ou None)."""
         try:
             with self.db.get_connection() as conn:
+                row = conn.execute("SELECT content, codec FROM html_blobs WHERE hash = ?", (html_hash,)).fetchone()
+                return decode(conn, *row) if row else None
+        except Exception as e:
+            print(f"Erro ao ler HTML armazenado: {e}")
+            return None
+
+    def reset_blocked_sources(self):
+        """Remove todas as fontes que estão marcadas como desativadas (status = 0, circuito aberto)."""
+        try:
+            with self.db.writer() as conn:
                 conn.execute("DELETE FROM sources WHERE status = 0")
                 conn.commit()
             return True
@@ -63,7 +201,7 @@ class SystemRepository(BaseRepository):
             return False
 
     def get_disabled_sources(self):
-        """Retorna lista de URLs raízes que estão desativadas (status = 0)."""
+        """Retorna lista de URLs raízes que estão desativadas (status = 0, circuito aberto)."""
         try:
             with self.db.get_connection() as conn:
                 cursor = conn.cursor()
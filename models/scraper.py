@@ -1,21 +1,108 @@
 import requests
 import random
 import os
+import re
 import time
+import threading
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
 from selenium import webdriver
 from selenium.webdriver.edge.service import Service
 from selenium.webdriver.edge.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 import config 
+from services.driver_pool import DriverPool
+from services.host_scheduler import HostScheduler
+from services.rate_controller import RateController
+
+# Camadas de coleta (da mais barata para a mais cara)
+TIER_HTTP = "http"
+TIER_BROWSER = "browser"
+TIER_CHALLENGE = "challenge"  # só responde no navegador visível (WAF/captcha)
+
+# Idade máxima (dias) de um PDF no cache de Content-Type: depois disso a URL
+# volta a ser baixada e a resposta real confirma (ou corrige) o tipo
+CONTENT_TYPE_TTL_DAYS = 30
+
+
+class FetchResult:
+    """HTML obtido por fetch() e os sinais da resposta usados no controle de taxa."""
+
+    def __init__(self, url):
+        self.url = url
+        self.html = None
+        self.status = None        # status HTTP da camada HTTP (None no navegador)
+        self.elapsed = None       # segundos até a resposta HTTP
+        self.blocked = False      # WAF/captcha detectado em alguma camada
+        self.error = False        # falha de rede/navegador
+        self.retry_after = None   # segundos pedidos pelo servidor (429/503)
+        self.requested = False    # houve acesso à rede (PDF pelo cache não conta)
+        self.not_modified = False # 304: o HTML armazenado (html_hash) continua válido
+        self.html_hash = None
+        self.validators = None    # (etag, last_modified): gravados junto com o HTML (save_content)
+        self.needs_challenge = False  # bloqueado: deve ir para a fila lenta (fetch_challenge)
+        self.js_only = False      # casca JavaScript sem conteúdo na camada HTTP
+        self.tier = None          # última camada usada (TIER_*)
+
 
 class ScraperModel:
-    def __init__(self):
+    def __init__(self, system_repo=None):
+        self.sys_repo = system_repo
         self.timeout = getattr(config, 'REQUEST_TIMEOUT', 60) # Timeout maior para Selenium
         self.delay = getattr(config, 'DELAY_BETWEEN_REQUESTS', 1.0)
         
         # Caminho para o driver na raiz do projeto
         self.driver_path = os.path.join(os.getcwd(), "msedgedriver.exe")
 
+        # Pools de navegadores reaproveitáveis (evita abrir um Edge por URL)
+        max_pages = getattr(config, 'DRIVER_MAX_PAGES', 50)
+        self.headless_pool = DriverPool(
+            lambda: self._iniciar_driver(headless=True),
+            max_size=getattr(config, 'DRIVER_POOL_SIZE', 2),
+            max_pages=max_pages, name="headless"
+        )
+        # Pool pequeno de navegadores visíveis, usado apenas quando há bloqueio.
+        # Mantém os cookies: a liberação do desafio (ex: cf_clearance) vale para as próximas páginas
+        self.headed_pool = DriverPool(
+            lambda: self._iniciar_driver(headless=False),
+            max_size=getattr(config, 'HEADED_POOL_SIZE', 1),
+            max_pages=max_pages, name="headed", clear_cookies=False
+        )
+
+        # Sessão HTTP compartilhada (keep-alive, gzip e reuso de conexão por host)
+        self.session = self._criar_sessao()
+
+        # Memória da camada que funcionou por domínio: {netloc: TIER_*}
+        self._tier_por_host = {}
+        self._tier_lock = threading.Lock()
+        self._factory = None
+
+        # Cache de Content-Type por URL (persistido em content_types)
+        self._content_types = None
+        self._content_types_lock = threading.Lock()
+
+        # Intervalo adaptativo por host (aprendido e persistido em sources.delay)
+        self.rate = RateController(
+            default_delay=self.delay,
+            min_delay=getattr(config, 'RATE_MIN_DELAY', 0.25),
+            max_delay=getattr(config, 'RATE_MAX_DELAY', 60.0),
+            slow_response=getattr(config, 'RATE_SLOW_RESPONSE', 8.0),
+            saved=self.sys_repo.get_source_delays() if self.sys_repo else {}
+        )
+
+    def _criar_sessao(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=0)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({
+            'User-Agent': getattr(config, 'USER_AGENT', ''),
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'pt-BR,pt;q=0.9,en;q=0.8',
+            'Accept-Encoding': 'gzip, deflate',
+        })
+        return session
+
     def _iniciar_driver(self, headless=True):
         """Configura e inicia uma instância do Edge Driver com opção de visibilidade."""
         if not os.path.exists(self.driver_path):
@@ -58,81 +145,338 @@ class ScraperModel:
     def _verificar_bloqueio(self, driver):
         """Verifica sinais comuns de WAF, Captcha ou bloqueios de IP."""
         try:
-            page_source = driver.page_source.lower()
-            title = driver.title.lower()
-            
-            termos_bloqueio = [
-                "just a moment", "attention required", "security check", 
-                "cloudflare", "human verification", "access denied", 
-                "403 forbidden", "pardon our interruption", "too many requests"
-            ]
-
-            # Verifica título e conteúdo
-            for termo in termos_bloqueio:
-                if termo in title or (len(page_source) < 5000 and termo in page_source):
-                    return True
-            return False
+            return self._html_bloqueado(driver.page_source, driver.title)
         except:
             return False
 
+    def _html_bloqueado(self, html, title=""):
+        """Mesma heurística de bloqueio, aplicada sobre HTML/título já obtidos."""
+        page_source = (html or "").lower()
+        title = (title or "").lower()
+        
+        termos_bloqueio = [
+            "just a moment", "attention required", "security check", 
+            "cloudflare", "human verification", "access denied", 
+            "403 forbidden", "pardon our interruption", "too many requests"
+        ]
+
+        # Verifica título e conteúdo
+        for termo in termos_bloqueio:
+            if termo in title or (len(page_source) < 5000 and termo in page_source):
+                return True
+        return False
+
     def _is_pdf(self, url):
         """
-        Verifica se a URL aponta para um arquivo PDF.
-        Tenta primeiro pelo cabeçalho HTTP (Content-Type) e depois pela extensão.
+        Verifica se a URL aponta para um arquivo PDF SEM acessar a rede.
+        Usa a extensão e o cache de Content-Type aprendido nos downloads anteriores
+        (o cabeçalho real é capturado durante o próprio download).
         """
-        try:
-            # Verifica pela extensão da URL primeiro (mais rápido)
-            if url.lower().endswith('.pdf'):
-                return True
+        # Verifica pela extensão da URL primeiro (mais rápido)
+        if url.lower().split('?')[0].endswith('.pdf'):
+            return True
 
-            # Faz uma requisição HEAD (apenas cabeçalhos) para verificar o Content-Type
-            # Timeout curto para não atrasar o processo
-            response = requests.head(url, allow_redirects=True, timeout=5)
-            content_type = response.headers.get('Content-Type', '').lower()
-            
-            if 'application/pdf' in content_type:
-                return True
-                
-        except Exception:
-            # Se a requisição falhar (ex: bloqueio), confia apenas na extensão
-            pass
-            
-        return False
+        content_type = self._cached_content_types().get(self._chave_url(url), '')
+        return 'application/pdf' in content_type
+
+    def _chave_url(self, url):
+        """
+        Chave do cache de Content-Type: a própria URL (sem fragmento). Um PDF em
+        /handle/123/4 não diz nada sobre /handle/123/5, então não há generalização.
+        """
+        parsed = urlparse(url)
+        key = f"{parsed.scheme}://{parsed.netloc.lower()}{parsed.path}"
+        return f"{key}?{parsed.query}" if parsed.query else key
+
+    def _cached_content_types(self):
+        with self._content_types_lock:
+            if self._content_types is None:
+                self._content_types = (self.sys_repo.get_content_types(CONTENT_TYPE_TTL_DAYS)
+                                       if self.sys_repo else {})
+            return self._content_types
+
+    def _registrar_content_type(self, url, content_type):
+        """
+        Guarda a decisão (pdf/html) para a URL; só grava se mudou. Apenas PDFs
+        entram no cache, e uma resposta HTML real corrige uma entrada PDF antiga.
+        """
+        kind = 'application/pdf' if 'application/pdf' in content_type else 'text/html'
+        key = self._chave_url(url)
+        cache = self._cached_content_types()
+        with self._content_types_lock:
+            if cache.get(key, 'text/html') == kind:
+                return
+            cache[key] = kind
+        if self.sys_repo:
+            self.sys_repo.save_content_type(key, kind)
 
     def fetch_html(self, url):
         """
-        Tenta obter o HTML. 
+        Retorna apenas o HTML de fetch() (ou None). Em 304, devolve o HTML já
+        armazenado; quem puder evitar a regravação deve usar fetch().
+        """
+        result = self.fetch(url)
+        if result.not_modified:
+            return self.stored_html(result)
+        return result.html
+
+    def stored_html(self, result):
+        """HTML armazenado referente a uma resposta 304."""
+        if result.html_hash and self.sys_repo:
+            return self.sys_repo.get_blob_html(result.html_hash)
+        return None
+
+    def fetch(self, url, challenge=True):
+        """
+        Tenta obter o HTML e retorna um FetchResult.
         1. Verifica se é PDF (se for, ignora).
-        2. Tenta modo Headless (rápido).
-        3. Se bloqueado, reinicia em modo Headed (simulação manual).
+        2. Tenta HTTP direto (requests), exceto em hosts que já exigiram navegador.
+        3. Se bloqueado ou dependente de JS, usa o modo Headless do pool.
+        4. Se bloqueado, repete em modo Headed (simulação manual) pelo pool visível.
+           Com `challenge=False` esse passo lento não é feito aqui: o resultado
+           volta com needs_challenge=True para a fila lenta (fetch_challenge).
+        O resultado alimenta o controle de taxa do host (self.rate).
         """
+        result = FetchResult(url)
+
         # --- VERIFICAÇÃO DE PDF ---
         if self._is_pdf(url):
             print(f"📄 URL identificada como PDF. Ignorando scrap: {url}")
-            return None
+            return result
+
+        host = urlparse(url).netloc.lower()
+        try:
+            tier = self._tier_inicial(url, host)
+
+            # --- Host que já exigiu o navegador visível: direto para a camada lenta ---
+            if tier == TIER_CHALLENGE:
+                if not challenge:
+                    result.needs_challenge = True
+                    return result
+                result.requested = True
+                result.html = self._fetch_headed(url, result)
+                return result
+
+            # --- CAMADA 1: HTTP simples (sem navegador) ---
+            if tier == TIER_HTTP:
+                html, escalar = self._fetch_http(url, result)
+                if not escalar:
+                    if html or result.not_modified:
+                        self._registrar_tier(host, TIER_HTTP)
+                    result.html = html
+                    return result
+
+            # --- CAMADA 2: Navegador (Selenium) ---
+            # O host só fica preso ao navegador se a camada HTTP foi bloqueada ou
+            # recebeu uma página dependente de JS (não por erro de rede ou 5xx)
+            aprender = tier != TIER_HTTP or result.blocked or result.js_only
+            result.html = self._fetch_browser(url, result, challenge)
+            if result.html and (aprender or result.tier == TIER_CHALLENGE):
+                self._registrar_tier(host, result.tier)
+            return result
+        finally:
+            if result.requested:
+                self.rate.record(HostScheduler.root_of(url), status=result.status, elapsed=result.elapsed,
+                                 blocked=result.blocked, error=result.error and not result.html,
+                                 retry_after=result.retry_after)
+
+    def fetch_challenge(self, url):
+        """
+        Camada lenta, usada pela fila de desafios (ChallengeLane): acesso pelo
+        navegador visível, com espera para desafios WAF/captcha.
+        """
+        result = FetchResult(url)
+        result.requested = True
+        try:
+            result.html = self._fetch_headed(url, result)
+            if result.html:
+                self._registrar_tier(urlparse(url).netloc.lower(), TIER_CHALLENGE)
+            return result
+        finally:
+            self.rate.record(HostScheduler.root_of(url), blocked=result.blocked,
+                             error=result.error and not result.html)
+
+    def save_rates(self):
+        """Persiste em sources.delay os intervalos aprendidos desde a última gravação."""
+        changes = self.rate.pop_changes()
+        if changes and self.sys_repo:
+            self.sys_repo.save_source_delays(changes)
+
+    def _tier_inicial(self, url, host):
+        """Decide por qual camada começar: a já aprendida para o host ou HTTP."""
+        with self._tier_lock:
+            tier = self._tier_por_host.get(host)
+        if tier:
+            return tier
+        if self._host_requer_js(url):
+            return TIER_BROWSER
+        return TIER_HTTP
+
+    def _registrar_tier(self, host, tier):
+        with self._tier_lock:
+            self._tier_por_host[host] = tier
 
-        driver = None
+    def _host_requer_js(self, url):
+        """Hosts mapeados para parsers DSpace 7+/Angular dependem de JavaScript."""
+        try:
+            if self._factory is None:
+                from services.parser_factory import ParserFactory
+                self._factory = ParserFactory()
+            from parsers.dspace_angular import DSpaceAngularParser
+            parser_class = self._factory.get_parser_class(url)
+            return bool(parser_class) and issubclass(parser_class, DSpaceAngularParser)
+        except Exception:
+            return False
+
+    def _pagina_requer_js(self, html):
+        """Casca Angular sem conteúdo renderizado no servidor (sem metadados)."""
+        lower = html.lower()
+        casca_angular = "<ds-app" in lower or "<ds-root" in lower
+        return casca_angular and "citation_" not in lower and 'name="dc.' not in lower
+
+    def _fetch_http(self, url, result):
+        """
+        Tenta baixar via requests.Session, registrando status/tempo em `result`.
+        Retorna (html, escalar): `escalar=True` indica que o navegador é necessário
+        (bloqueio, 403/5xx, falha de rede ou página dependente de JavaScript).
+        Os demais erros HTTP (404, 410, 429...) voltam direto, sem navegador.
+        """
+        result.requested = True
+        result.tier = TIER_HTTP
+        validator = self.sys_repo.get_http_validator(url) if self.sys_repo else None
+        headers = {}
+        if validator:
+            etag, last_modified, _ = validator
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        started = time.monotonic()
+        try:
+            print(f"🌐 Tentando acesso HTTP direto: {url}")
+            # stream=True: lê os cabeçalhos antes de decidir baixar o corpo (evita baixar PDFs)
+            response = self.session.get(url, timeout=self.timeout, allow_redirects=True, stream=True,
+                                        headers=headers)
+        except requests.RequestException as e:
+            result.error = True
+            print(f"⚠️ Falha HTTP ({e.__class__.__name__}). Escalando para o navegador...")
+            return None, True
+
+        result.status = response.status_code
+        result.elapsed = time.monotonic() - started
+        result.retry_after = self._retry_after(response)
+
+        if response.status_code == 304 and validator:
+            response.close()
+            result.not_modified = True
+            result.html_hash = validator[2]
+            print(f"♻️ Página não modificada (304): {url}")
+            return None, False
+
+        content_type = response.headers.get('Content-Type', '').lower()
+        if response.status_code == 200 and content_type:
+            self._registrar_content_type(url, content_type)
+        if 'application/pdf' in content_type:
+            response.close()
+            print(f"📄 URL identificada como PDF. Ignorando scrap: {url}")
+            return None, False
+
+        if response.status_code == 403 or response.status_code >= 500:
+            # 403 costuma ser WAF; 5xx pode ser desafio (ex: Cloudflare responde 503)
+            if response.status_code == 403 or self._html_bloqueado(response.text, self._titulo(response.text)):
+                result.blocked = True
+            print(f"⚠️ HTTP {response.status_code}. Escalando para o navegador...")
+            return None, True
+
+        if response.status_code != 200:
+            # 404/410/429...: o navegador receberia a mesma resposta
+            response.close()
+            print(f"⚠️ HTTP {response.status_code}: {url}")
+            return None, False
+
+        # requests assume ISO-8859-1 quando o servidor não informa o charset
+        if 'charset' not in content_type:
+            response.encoding = response.apparent_encoding
+        html = response.text
+
+        if self._html_bloqueado(html, self._titulo(html)):
+            result.blocked = True
+            print("⚠️ Bloqueio detectado na camada HTTP. Escalando para o navegador...")
+            return None, True
+
+        if self._pagina_requer_js(html):
+            result.js_only = True
+            print("⚙️ Página depende de JavaScript. Escalando para o navegador...")
+            return None, True
+
+        self._registrar_validadores(response, result)
+        return html, False
+
+    def _registrar_validadores(self, response, result):
+        """
+        Guarda ETag/Last-Modified da resposta para a próxima requisição condicional.
+        Só vão para o banco junto com o HTML (save_content/save), na mesma transação.
+        """
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified:
+            result.validators = (etag, last_modified)
+
+    @staticmethod
+    def _titulo(html):
+        match = re.search(r'<title[^>]*>(.*?)</title>', html, re.IGNORECASE | re.DOTALL)
+        return match.group(1) if match else ""
+
+    @staticmethod
+    def _retry_after(response):
+        """Segundos do cabeçalho Retry-After (apenas o formato numérico)."""
+        value = response.headers.get('Retry-After', '').strip()
+        return float(value) if value.isdigit() else None
+
+    def _fetch_browser(self, url, result, challenge=True):
+        """
+        Coleta via Selenium: headless primeiro e, se bloqueado, modo visível
+        (ou, com `challenge=False`, marca o resultado para a fila lenta).
+        """
+        result.requested = True
+        result.tier = TIER_BROWSER
         try:
             # --- TENTATIVA 1: Modo Automático/Silencioso ---
-            driver = self._iniciar_driver(headless=True)
-            print(f"🤖 Tentando acesso automático: {url}")
-            driver.get(url)
-
-            # Aguarda carregamento básico
-            try:
-                WebDriverWait(driver, 10).until(
-                    lambda d: d.execute_script('return document.readyState') == 'complete'
-                )
-            except:
-                pass
-
-            # Verifica se foi bloqueado
-            if self._verificar_bloqueio(driver):
-                print("⚠️ Bloqueio detectado! Alternando para modo Simulação Manual...")
-                driver.quit() # Fecha o navegador headless
-                
-                # --- TENTATIVA 2: Modo Simulação Manual ---
-                driver = self._iniciar_driver(headless=False)
+            with self.headless_pool.borrow() as driver:
+                print(f"🤖 Tentando acesso automático: {url}")
+                driver.get(url)
+                self._aguardar_carregamento(driver)
+
+                # PDF aberto no visualizador do navegador: nada a extrair
+                if self._documento_pdf(driver, url):
+                    print(f"📄 URL identificada como PDF. Ignorando scrap: {url}")
+                    return None
+
+                # Verifica se foi bloqueado
+                if not self._verificar_bloqueio(driver):
+                    return driver.page_source
+
+            result.blocked = True
+            if not challenge:
+                print(f"⚠️ Bloqueio detectado! Enviando para a fila de desafios: {url}")
+                result.needs_challenge = True
+                return None
+
+            print("⚠️ Bloqueio detectado! Alternando para modo Simulação Manual...")
+
+        except Exception as e:
+            result.error = True
+            print(f"❌ Erro no Selenium: {e}")
+            return None
+
+        return self._fetch_headed(url, result)
+
+    def _fetch_headed(self, url, result):
+        """Modo Simulação Manual: navegador visível, com espera para desafios (Cloudflare Turnstile/JS)."""
+        result.tier = TIER_CHALLENGE
+        try:
+            with self.headed_pool.borrow() as driver:
                 print(f"👤 Tentando acesso manual (burlas ativas): {url}")
                 driver.get(url)
                 
@@ -148,17 +492,35 @@ class ScraperModel:
                 except:
                     print("⚠️ Tempo limite aguardando resolução do desafio visual.")
 
-            # Captura o HTML final
-            html_content = driver.page_source
-            return html_content
+                # Captura o HTML final
+                return driver.page_source
 
         except Exception as e:
+            result.error = True
             print(f"❌ Erro no Selenium: {e}")
             return None
-            
-        finally:
-            if driver:
-                try:
-                    driver.quit()
-                except:
-                    pass
+
+    def _documento_pdf(self, driver, url):
+        """Lê o Content-Type da resposta final carregada no navegador (sem HEAD extra)."""
+        try:
+            content_type = (driver.execute_script("return document.contentType") or "").lower()
+        except Exception:
+            return False
+        if content_type:
+            self._registrar_content_type(url, content_type)
+        return 'application/pdf' in content_type
+
+    def _aguardar_carregamento(self, driver):
+        """Aguarda o document.readyState completo (timeout curto)."""
+        try:
+            WebDriverWait(driver, 10).until(
+                lambda d: d.execute_script('return document.readyState') == 'complete'
+            )
+        except:
+            pass
+
+    def close(self):
+        """Encerra os navegadores mantidos nos pools e grava os intervalos aprendidos."""
+        self.save_rates()
+        self.headless_pool.shutdown()
+        self.headed_pool.shutdown()
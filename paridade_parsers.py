@@ -0,0 +1,99 @@
+"""
+Verificação de paridade dos backends de parsing HTML.
+
+Roda TODOS os parsers sobre os HTMLs de repositório (PPR) já armazenados no
+banco, uma vez para cada backend instalado, e compara o resultado com o do
+backend padrão ('html.parser'). Use antes de trocar HTML_PARSER_BACKEND.
+
+Uso: python paridade_parsers.py [limite_de_registros]
+"""
+import sqlite3
+import os
+import sys
+import time
+import config
+from models.db.blob_store import html_columns, read_html, has_html
+from services.parser_factory import ParserFactory
+from parsers.parsed_document import ParsedDocument, BACKENDS, DEFAULT_BACKEND, backend_available
+
+CAMPOS = ('sigla', 'universidade', 'programa', 'link_pdf')
+
+
+def carregar_registros(limite=None):
+    db_path = config.DB_NAME
+    if not os.path.exists(db_path):
+        print(f"❌ Banco de dados '{db_path}' não encontrado.")
+        return []
+
+    conn = sqlite3.connect(db_path)
+    try:
+        sql = f"""
+            SELECT r.url, {html_columns('r', 'hb')} FROM ppr r
+            LEFT JOIN html_blobs hb ON hb.hash = r.html_hash
+            WHERE {has_html('r')}
+            ORDER BY r.id
+        """
+        if limite:
+            sql += f" LIMIT {int(limite)}"
+        return [(url, read_html(conn, *colunas)) for url, *colunas in conn.execute(sql)]
+    finally:
+        conn.close()
+
+
+def extrair(factory, url, html, backend):
+    doc = ParsedDocument(html, url, backend=backend)
+    parser = factory.get_parser(url, html_content=doc)
+    if not parser:
+        return None, None
+    data = parser.extract(doc, url) or {}
+    return parser.__class__.__name__, {k: data.get(k) for k in CAMPOS}
+
+
+def main():
+    limite = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    registros = carregar_registros(limite)
+    if not registros:
+        print("Nenhum HTML de repositório armazenado para comparar.")
+        return
+
+    backends = [b for b in BACKENDS if backend_available(b)]
+    print(f"Registros: {len(registros)} | Backends: {', '.join(backends)}\n")
+
+    factory = ParserFactory()
+    tempos = {b: 0.0 for b in backends}
+    divergencias = {b: 0 for b in backends if b != DEFAULT_BACKEND}
+    erros = {b: 0 for b in backends}
+
+    for url, html in registros:
+        resultados = {}
+        for backend in backends:
+            inicio = time.perf_counter()
+            try:
+                resultados[backend] = extrair(factory, url, html, backend)
+            except Exception as e:
+                resultados[backend] = (None, f"ERRO: {e}")
+                erros[backend] += 1
+            tempos[backend] += time.perf_counter() - inicio
+
+        base = resultados.get(DEFAULT_BACKEND)
+        for backend in divergencias:
+            if resultados[backend] != base:
+                divergencias[backend] += 1
+                print(f"⚠️  [{backend}] {url}")
+                print(f"    {DEFAULT_BACKEND}: {base}")
+                print(f"    {backend}: {resultados[backend]}")
+
+    print("\n" + "=" * 60)
+    for backend in backends:
+        media = tempos[backend] / len(registros) * 1000
+        linha = f"{backend.ljust(12)} total {tempos[backend]:.2f}s | {media:.1f} ms/registro | erros {erros[backend]}"
+        if backend in divergencias:
+            linha += f" | divergências {divergencias[backend]}"
+            if tempos[backend]:
+                linha += f" | {tempos[DEFAULT_BACKEND] / tempos[backend]:.1f}x"
+        print(linha)
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
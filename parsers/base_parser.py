@@ -1,10 +1,14 @@
 import requests
-from bs4 import BeautifulSoup
+from parsers.parsed_document import make_soup
 
 class BaseParser:
     """
     Classe base que define o comportamento padrão para todos os parsers.
     """
+
+    # A ParserFactory reaproveita instâncias; parsers que alteram atributos
+    # durante a extração devem definir stateless = False.
+    stateless = True
     
     def __init__(self, sigla="-", universidade="Desconhecida"):
         self.sigla = sigla
@@ -54,6 +58,13 @@ class BaseParser:
         """
         raise NotImplementedError("Os parsers filhos devem implementar o método extract_pure_soup")
 
+    def _get_soup(self, html_content):
+        """
+        Soup do conteúdo recebido. Se for um ParsedDocument (criado uma vez por
+        registro), reaproveita a árvore já construída na detecção do parser.
+        """
+        return make_soup(html_content)
+
     def _get_default_data(self, url):
         return {
             'sigla': self.sigla,
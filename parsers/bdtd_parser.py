@@ -1,5 +1,4 @@
 import re
-from bs4 import BeautifulSoup
 from parsers.base_parser import BaseParser
 
 class BDTDParser(BaseParser):
@@ -13,7 +12,7 @@ class BDTDParser(BaseParser):
     # ---------------------------------------------------------------------
 
     def extract_pure_soup(self, html_content, url, on_progress=None):
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = self._get_soup(html_content)
         data = {'sigla': '-', 'universidade': '-', 'programa': '-', 'link_pdf': '-'}
 
         # Localiza a Sigla (ex: UDF) e Universidade (ex: Centro Univ. Distrito Federal)
@@ -1,6 +1,5 @@
 import json
 import re
-from bs4 import BeautifulSoup
 from parsers.base_parser import BaseParser
 from urllib.parse import urljoin
 
@@ -12,7 +11,7 @@ class CefetMgParser(BaseParser):
         return self.extract_pure_soup(html_content, base_url, on_progress)
 
     def extract_pure_soup(self, html_content, url, on_progress=None):
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = self._get_soup(html_content)
         
         data = {
             'sigla': self.sigla,
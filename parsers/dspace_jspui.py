@@ -1,5 +1,4 @@
 import re
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 from parsers.base_parser import BaseParser
 
@@ -16,7 +15,7 @@ class DSpaceJSPUIParser(BaseParser):
         return self.extract_pure_soup(html_content, base_url, on_progress)
 
     def extract_pure_soup(self, html_content, url, on_progress=None):
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = self._get_soup(html_content)
         
         data = {
             'sigla': getattr(self, 'sigla', '-'), # Usa getattr para evitar erro se não definido
@@ -1,5 +1,4 @@
 import re
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 from parsers.base_parser import BaseParser
 
@@ -8,7 +7,7 @@ class ENAPParser(BaseParser):
         super().__init__(sigla="ENAP", universidade="Escola Nacional de Administração Pública")
 
     def extract_pure_soup(self, html_content, url, on_progress=None):
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = self._get_soup(html_content)
         data = {'sigla': self.sigla, 'universidade': self.universidade, 'programa': '-', 'link_pdf': '-'}
 
         if on_progress: on_progress("ENAP: Extraindo metadados...")
@@ -1,5 +1,4 @@
 import re
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 from parsers.base_parser import BaseParser
 
@@ -13,7 +12,7 @@ class FDVParser(BaseParser):
         Extrai dados do repositório da FDV (DSpace 5.7).
         Baseado no padrão de citação: "... - Programa de Pós-Graduação em [NOME], ..."
         """
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = self._get_soup(html_content)
         
         data = {
             'sigla': self.sigla,
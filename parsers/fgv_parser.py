@@ -1,6 +1,9 @@
 from parsers.dspace_angular import DSpaceAngularParser
 
 class FGVParser(DSpaceAngularParser):
+    # Altera sigla/universidade conforme o contexto da página (EBAPE)
+    stateless = False
+
     def __init__(self):
         super().__init__(
             sigla="FGV", 
@@ -1,5 +1,4 @@
 import re
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 from parsers.base_parser import BaseParser
 
@@ -12,7 +11,7 @@ class GenericParser(BaseParser):
         Parser Genérico Otimizado.
         Tenta múltiplas estratégias baseadas em padrões comuns de repositórios (DSpace, EPrints, etc).
         """
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = self._get_soup(html_content)
         
         data = {
             'sigla': self.sigla,
@@ -0,0 +1,108 @@
+from bs4 import BeautifulSoup
+import config
+
+# Backends de parsing suportados. Todos expõem a mesma API do BeautifulSoup
+# (find/select/find_next_sibling...), então os parsers não mudam; só muda o
+# construtor da árvore. 'lxml' é opcional (pip install lxml).
+BACKENDS = ('html.parser', 'lxml', 'html5lib')
+DEFAULT_BACKEND = 'html.parser'
+
+_backend = None
+_warned = set()
+
+
+def backend_available(name):
+    if name == 'html.parser':
+        return True
+    try:
+        __import__(name)
+        return True
+    except ImportError:
+        return False
+
+
+def set_backend(name):
+    """Define o backend usado por make_soup/ParsedDocument (com fallback seguro)."""
+    global _backend
+    if name not in BACKENDS:
+        print(f"Aviso: backend HTML '{name}' desconhecido. Usando '{DEFAULT_BACKEND}'.")
+        name = DEFAULT_BACKEND
+    elif not backend_available(name):
+        if name not in _warned:
+            print(f"Aviso: backend HTML '{name}' não instalado. Usando '{DEFAULT_BACKEND}'.")
+            _warned.add(name)
+        name = DEFAULT_BACKEND
+    _backend = name
+    return name
+
+
+def get_backend():
+    if _backend is None:
+        set_backend(getattr(config, 'HTML_PARSER_BACKEND', DEFAULT_BACKEND))
+    return _backend
+
+
+class ParsedDocument:
+    """
+    HTML de um registro analisado UMA única vez.
+
+    É criado por registro e repassado para a detecção da ParserFactory e para
+    o parser escolhido, que reaproveitam o mesmo soup em vez de refazer o parse.
+    Todos os artefatos são calculados sob demanda e memorizados:
+    - soup:  árvore BeautifulSoup;
+    - lower: HTML em minúsculas (busca de marcadores);
+    - meta:  índice {name: [content, ...]} das meta tags (nome como no HTML).
+    """
+
+    __slots__ = ('html', 'url', 'backend', '_soup', '_lower', '_meta')
+
+    def __init__(self, html, url=None, backend=None):
+        self.html = html or ""
+        self.url = url
+        self.backend = backend
+        self._soup = None
+        self._lower = None
+        self._meta = None
+
+    @classmethod
+    def wrap(cls, html_or_doc, url=None):
+        """Aceita tanto HTML cru quanto um ParsedDocument já existente."""
+        if isinstance(html_or_doc, cls):
+            return html_or_doc
+        return cls(html_or_doc, url)
+
+    @property
+    def soup(self):
+        if self._soup is None:
+            self._soup = make_soup(self.html, self.backend)
+        return self._soup
+
+    @property
+    def lower(self):
+        if self._lower is None:
+            self._lower = self.html.lower()
+        return self._lower
+
+    @property
+    def meta(self):
+        if self._meta is None:
+            index = {}
+            for tag in self.soup.find_all('meta'):
+                name = tag.get('name')
+                if name:
+                    index.setdefault(name, []).append(tag.get('content', ''))
+            self._meta = index
+        return self._meta
+
+    def __bool__(self):
+        return bool(self.html)
+
+    def __str__(self):
+        return self.html
+
+
+def make_soup(html_or_doc, backend=None):
+    """Retorna o soup do documento (reaproveitado) ou faz o parse do HTML cru."""
+    if isinstance(html_or_doc, ParsedDocument):
+        return html_or_doc.soup
+    return BeautifulSoup(html_or_doc, backend or get_backend())
@@ -1,5 +1,4 @@
 import re
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 from parsers.base_parser import BaseParser
 
@@ -12,7 +11,7 @@ class PUCGOIASParser(BaseParser):
         Extrai dados do repositório da PUC Goiás (DSpace 4.2).
         Prioriza breadcrumbs e meta tags DC.publisher.program.
         """
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = self._get_soup(html_content)
         
         data = {
             'sigla': self.sigla,
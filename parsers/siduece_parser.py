@@ -1,5 +1,4 @@
 import re
-from bs4 import BeautifulSoup
 from parsers.base_parser import BaseParser
 from urllib.parse import urljoin
 
@@ -11,7 +10,7 @@ class SidUeceParser(BaseParser):
         return self.extract_pure_soup(html_content, base_url, on_progress)
 
     def extract_pure_soup(self, html_content, url, on_progress=None):
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = self._get_soup(html_content)
         
         data = {
             'sigla': self.sigla,
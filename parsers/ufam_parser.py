@@ -1,5 +1,4 @@
 import re
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 from parsers.base_parser import BaseParser
 
@@ -12,7 +11,7 @@ class UFAMParser(BaseParser):
         Extrai dados do repositório da UFAM (Interface VuFind/TEDE).
         Foca nas tabelas de metadados (th/td) para encontrar o Programa.
         """
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = self._get_soup(html_content)
         
         data = {
             'sigla': self.sigla,
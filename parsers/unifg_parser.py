@@ -1,5 +1,4 @@
 import re
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 from parsers.base_parser import BaseParser
 
@@ -13,7 +12,7 @@ class UNIFGParser(BaseParser):
         Extrai dados do repositório da UNIFG (DSpace 9.1 - Rede Ânima).
         Otimizado para capturar Programa via Breadcrumbs e PDF via Meta Tags/Links UUID.
         """
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = self._get_soup(html_content)
         
         data = {
             'sigla': self.sigla,
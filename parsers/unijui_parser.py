@@ -1,6 +1,5 @@
 import json
 import re
-from bs4 import BeautifulSoup
 from parsers.base_parser import BaseParser
 from urllib.parse import urljoin
 
@@ -9,7 +8,7 @@ class UnijuiParser(BaseParser):
         super().__init__(sigla="UNIJUÍ", universidade="Universidade Regional do Noroeste do Estado do Rio Grande do Sul")
 
     def extract(self, html_content, base_url, on_progress=None):
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = self._get_soup(html_content)
         data = {
             'sigla': self.sigla,
             'universidade': self.universidade,
@@ -0,0 +1,110 @@
+import queue
+import threading
+import time
+
+
+class ChallengeLane:
+    """
+    Fila lenta para páginas bloqueadas (WAF/captcha/Cloudflare).
+
+    O download no navegador visível espera de 5 a 30 s por página; feito na
+    mesma thread do lote, um único host protegido travaria todos os outros.
+    Aqui esses itens são processados por poucas threads próprias (`workers`,
+    normalmente HEADED_POOL_SIZE) enquanto a fila rápida continua.
+
+    - `fetch(url)`: download pelo navegador visível; retorna o resultado.
+    - `on_done(item, result, error)`: chamado na thread da fila lenta.
+    - `url_of(item)`: URL do item.
+    - `key_of(item)`: agrupamento para pending(key) (ex: raiz do host).
+    - `on_start(item)`: chamado antes do download (ex: prorrogar a reserva).
+    """
+
+    def __init__(self, fetch, on_done, url_of, workers=1, should_stop=lambda: False,
+                 key_of=lambda item: None, on_start=None):
+        self.fetch = fetch
+        self.on_done = on_done
+        self.url_of = url_of
+        self.key_of = key_of
+        self.on_start = on_start
+        self.workers = max(1, int(workers))
+        self.should_stop = should_stop
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._pending = {}  # chave -> itens enfileirados ou em processamento
+
+    def submit(self, item):
+        key = self.key_of(item)
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + 1
+            if len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f"challenge-{len(self._threads)}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+        self._queue.put(item)
+
+    def pending(self, key=None):
+        """Itens ainda na fila lenta (todos, ou só os da chave `key`)."""
+        with self._lock:
+            if key is None:
+                return sum(self._pending.values())
+            return self._pending.get(key, 0)
+
+    def crowded(self, limit):
+        """Chaves com pelo menos `limit` itens na fila lenta."""
+        with self._lock:
+            return [key for key, count in self._pending.items() if count >= limit]
+
+    def join(self):
+        """
+        Aguarda a fila lenta esvaziar (ou a interrupção) e encerra as threads.
+        Retorna os itens que não chegaram a ser processados.
+        """
+        while self.pending() and not self.should_stop():
+            time.sleep(0.2)
+
+        # Encerra as threads (a que estiver no meio de um download termina antes)
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                leftover.append(item)
+        with self._lock:
+            self._pending = {}
+        return leftover
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self.should_stop():
+                # Interrompido: devolve o item para join() reportar como pendente
+                self._queue.put(item)
+                return
+            result, error = None, None
+            try:
+                if self.on_start:
+                    self.on_start(item)
+                result = self.fetch(self.url_of(item))
+            except Exception as e:
+                error = e
+            try:
+                self.on_done(item, result, error)
+            except Exception as e:
+                print(f"Erro na fila de desafios ({self.url_of(item)}): {e}")
+            finally:
+                key = self.key_of(item)
+                with self._lock:
+                    self._pending[key] -= 1
+                    if not self._pending[key]:
+                        del self._pending[key]
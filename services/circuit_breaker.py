@@ -0,0 +1,113 @@
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def new_state():
+    """Estado inicial de uma fonte (mesmas chaves das colunas em sources)."""
+    return {
+        'breaker_state': CLOSED, 'win_start': None, 'win_ok': 0, 'win_fail': 0,
+        'prev_ok': 0, 'prev_fail': 0, 'open_until': None, 'trips': 0, 'probe_until': None,
+    }
+
+
+class CircuitBreaker:
+    """
+    Disjuntor por fonte (raiz da URL), no lugar do antigo status 0/1.
+
+    - closed: requisições liberadas. Sucessos e falhas são contados numa janela
+      deslizante de `window` segundos (janela atual + anterior ponderada pelo
+      tempo restante). Com pelo menos `min_requests` e taxa de erro >=
+      `error_rate`, o circuito abre.
+    - open: fonte em pausa até open_until. A pausa começa em `cooldown` e
+      dobra a cada abertura consecutiva, até `max_cooldown`. Respostas de
+      requisições que ainda estavam em andamento na abertura são ignoradas.
+    - half_open: vencida a pausa, UMA requisição de teste é liberada (outras
+      aguardam até `probe_timeout`). Sucesso fecha o circuito; falha reabre.
+
+    Os métodos recebem e alteram o dicionário de estado (ver new_state());
+    a persistência fica com o SystemRepository.
+    """
+
+    def __init__(self, window=300, min_requests=5, error_rate=0.5,
+                 cooldown=600, max_cooldown=21600, probe_timeout=300):
+        self.window = float(window)
+        self.min_requests = int(min_requests)
+        self.error_rate = float(error_rate)
+        self.cooldown = float(cooldown)
+        self.max_cooldown = float(max_cooldown)
+        self.probe_timeout = float(probe_timeout)
+
+    def allow(self, state, now=None):
+        """Retorna (permitido, estado_mudou). Pode passar de open para half_open."""
+        now = time.time() if now is None else now
+        current = state['breaker_state']
+        if current == CLOSED:
+            return True, False
+        if current == OPEN:
+            if now < (state['open_until'] or 0):
+                return False, False
+            state['breaker_state'] = HALF_OPEN
+            state['probe_until'] = now + self.probe_timeout
+            return True, True
+        # half_open: libera nova sonda apenas se a anterior não respondeu a tempo
+        if now >= (state['probe_until'] or 0):
+            state['probe_until'] = now + self.probe_timeout
+            return True, True
+        return False, False
+
+    def record(self, state, success, now=None):
+        """Registra o resultado de uma requisição e aplica a transição de estado."""
+        now = time.time() if now is None else now
+        current = state['breaker_state']
+
+        if current == OPEN:
+            # Resposta atrasada de uma requisição feita antes da abertura: não
+            # fecha o circuito antes da pausa nem reabre (dobrando a pausa)
+            return state
+        if current == HALF_OPEN:
+            # Resultado da sonda
+            if success:
+                state.update(new_state())
+            else:
+                self._trip(state, now)
+            return state
+
+        self._roll(state, now)
+        state['win_ok' if success else 'win_fail'] += 1
+        ok, fail = self._counts(state, now)
+        if ok + fail >= self.min_requests and fail / (ok + fail) >= self.error_rate:
+            self._trip(state, now)
+        elif success:
+            state['trips'] = 0
+        return state
+
+    def retry_at(self, state):
+        """Quando a fonte volta a aceitar requisições (None se liberada)."""
+        if state['breaker_state'] == OPEN:
+            return state['open_until']
+        if state['breaker_state'] == HALF_OPEN:
+            return state['probe_until']
+        return None
+
+    def _trip(self, state, now):
+        pause = min(self.max_cooldown, self.cooldown * (2 ** (state['trips'] or 0)))
+        state.update(breaker_state=OPEN, open_until=now + pause, probe_until=None,
+                     trips=(state['trips'] or 0) + 1,
+                     win_start=None, win_ok=0, win_fail=0, prev_ok=0, prev_fail=0)
+
+    def _roll(self, state, now):
+        """Avança a janela deslizante (a atual vira a anterior a cada `window` s)."""
+        start = state['win_start']
+        if start is None or now - start >= 2 * self.window:
+            state.update(win_start=now, win_ok=0, win_fail=0, prev_ok=0, prev_fail=0)
+        elif now - start >= self.window:
+            state.update(win_start=start + self.window, prev_ok=state['win_ok'],
+                         prev_fail=state['win_fail'], win_ok=0, win_fail=0)
+
+    def _counts(self, state, now):
+        weight = max(0.0, 1.0 - (now - state['win_start']) / self.window)
+        return (state['win_ok'] + state['prev_ok'] * weight,
+                state['win_fail'] + state['prev_fail'] * weight)
@@ -0,0 +1,72 @@
+from functools import lru_cache
+
+
+class DomainRouter:
+    """
+    Roteamento compilado de domínio -> nome do parser.
+
+    As entradas do parsers_config.json são compiladas uma única vez em:
+    - um dicionário de hosts exatos ("repositorio.ufop.br");
+    - uma trie de sufixos por rótulos invertidos (".ufop.br" -> br -> ufop);
+    - uma lista ordenada de chaves para busca por substring (legado).
+
+    Precedência determinística: host exato > sufixo mais longo > substring
+    mais longa (empate resolvido por ordem alfabética). O resultado de cada
+    netloc é memorizado em um cache LRU.
+    """
+
+    _TERMINAL = "__parser__"
+
+    def __init__(self, mappings, cache_size=4096):
+        self._exact = {}
+        self._trie = {}
+        self._substrings = []
+
+        for key, parser_name in mappings.items():
+            key = key.strip().lower()
+            if not key:
+                continue
+            if key.startswith('.'):
+                self._insert_suffix(key, parser_name)
+            else:
+                self._exact[key] = parser_name
+                self._substrings.append((key, parser_name))
+
+        self._substrings.sort(key=lambda kv: (-len(kv[0]), kv[0]))
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def _insert_suffix(self, suffix, parser_name):
+        node = self._trie
+        for label in reversed(suffix.strip('.').split('.')):
+            node = node.setdefault(label, {})
+        node[self._TERMINAL] = parser_name
+
+    def _resolve(self, netloc):
+        """Retorna o nome do parser para o netloc (sem porta) ou None."""
+        domain = (netloc or "").lower().split(':')[0]
+        if not domain:
+            return None
+
+        # 1. Host exato
+        if domain in self._exact:
+            return self._exact[domain]
+
+        # 2. Sufixo mais longo: percorre a trie do TLD para a esquerda.
+        #    ".ufop.br" exige ao menos um rótulo antes (mesma regra do endswith).
+        labels = domain.split('.')
+        node = self._trie
+        best = None
+        for depth, label in enumerate(reversed(labels), start=1):
+            node = node.get(label)
+            if node is None:
+                break
+            if self._TERMINAL in node and depth < len(labels):
+                best = node[self._TERMINAL]
+        if best:
+            return best
+
+        # 3. Substring (compatibilidade com mapeamentos antigos)
+        for key, parser_name in self._substrings:
+            if key in domain:
+                return parser_name
+        return None
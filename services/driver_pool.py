@@ -0,0 +1,145 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class DriverPool:
+    """
+    Pool limitado de instâncias de WebDriver reaproveitáveis.
+
+    Os drivers são criados sob demanda (até `max_size`) pela função `factory`
+    e devolvidos ao pool após o uso. Antes de cada empréstimo o driver passa
+    por uma verificação de saúde; após `max_pages` páginas ele é reciclado
+    (encerrado e substituído) para evitar vazamento de memória do navegador.
+
+    Com `clear_cookies` (padrão) os cookies são apagados a cada devolução. Pools
+    que dependem da sessão entre páginas (ex: liberação do Cloudflare obtida no
+    navegador visível) usam clear_cookies=False.
+    """
+
+    def __init__(self, factory, max_size=2, max_pages=50, name="pool", clear_cookies=True):
+        self.factory = factory
+        self.max_size = max(1, int(max_size))
+        self.max_pages = max(1, int(max_pages))
+        self.name = name
+        self.clear_cookies = clear_cookies
+
+        self._idle = []  # pilha (LIFO): reaproveita o driver mais "quente"
+        self._cond = threading.Condition()  # protege _idle, _created, _uses e _closed
+        self._created = 0
+        self._uses = {}  # id(driver) -> páginas servidas
+        self._closed = False
+
+    @contextmanager
+    def borrow(self, timeout=None):
+        """
+        Empresta um driver do pool. Uso:
+            with pool.borrow() as driver:
+                driver.get(url)
+        Se ocorrer exceção durante o uso, o driver é descartado (pode estar corrompido).
+        """
+        driver = self._acquire(timeout)
+        broken = False
+        try:
+            yield driver
+        except Exception:
+            broken = True
+            raise
+        finally:
+            self._release(driver, discard=broken)
+
+    def _acquire(self, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError(f"Pool '{self.name}' já foi encerrado.")
+                    # 1. Reaproveita um driver ocioso
+                    if self._idle:
+                        driver, create = self._idle.pop(), False
+                        break
+                    # 2. Cria um novo se ainda houver vaga
+                    if self._created < self.max_size:
+                        self._created += 1
+                        driver, create = None, True
+                        break
+                    # 3. Pool cheio: aguarda devolução ou descarte (notify em _release/_destroy)
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError(f"Nenhum driver disponível no pool '{self.name}'.")
+                    self._cond.wait(remaining)
+
+            if create:
+                try:
+                    driver = self.factory()
+                except Exception:
+                    with self._cond:
+                        self._created -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._uses[id(driver)] = 0
+                return driver
+
+            # Verificação de saúde fora do lock (pode demorar)
+            if self._is_healthy(driver):
+                return driver
+            self._destroy(driver)
+
+    def _release(self, driver, discard=False):
+        with self._cond:
+            uses = self._uses.get(id(driver), 0) + 1
+            self._uses[id(driver)] = uses
+            recycle = discard or self._closed or uses >= self.max_pages
+
+        if recycle:
+            self._destroy(driver)
+            return
+
+        if self.clear_cookies:
+            try:
+                # Limpa estado da navegação anterior antes de devolver
+                driver.delete_all_cookies()
+            except Exception:
+                self._destroy(driver)
+                return
+
+        with self._cond:
+            if self._closed:
+                closed = True
+            else:
+                closed = False
+                self._idle.append(driver)
+                self._cond.notify()
+        if closed:
+            self._destroy(driver)
+
+    def _is_healthy(self, driver):
+        """Verifica se a sessão do navegador ainda responde."""
+        try:
+            driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def _destroy(self, driver):
+        with self._cond:
+            self._uses.pop(id(driver), None)
+            self._created -= 1
+            # Libera uma vaga: acorda quem espera para criar um driver novo
+            self._cond.notify()
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def shutdown(self):
+        """Encerra todos os drivers ociosos e impede novos empréstimos."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for driver in idle:
+            self._destroy(driver)
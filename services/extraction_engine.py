@@ -0,0 +1,113 @@
+"""
+Motor de reextração offline em múltiplos processos.
+
+O parsing com BeautifulSoup é CPU-bound e fica preso ao GIL numa única
+thread. Aqui os registros (chave, url, html) são enviados em lotes para um
+pool de processos; cada processo usa a sua própria ParserFactory e devolve
+apenas os campos extraídos. O consumidor (uma única thread escritora) recebe
+os resultados em fluxo, na ordem em que ficam prontos.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+CAMPOS = ('sigla', 'universidade', 'programa')
+
+
+def _init_worker(backend):
+    """Inicializa o processo filho com o mesmo backend HTML do processo principal."""
+    from parsers.parsed_document import set_backend
+    set_backend(backend)
+
+
+def _extrair_registro(key, url, html):
+    from services.parser_factory import ParserFactory
+    from parsers.parsed_document import ParsedDocument
+
+    try:
+        doc = ParsedDocument(html, url)
+        parser = ParserFactory().get_parser(url, html_content=doc)
+        if not parser:
+            return key, None, None
+        data = parser.extract(doc, url) or {}
+        return key, {k: data.get(k) for k in CAMPOS}, None
+    except Exception as e:
+        return key, None, str(e)
+
+
+def _extrair_lote(works):
+    """Executado no processo filho: processa um lote de (key, url, html)."""
+    return [_extrair_registro(key, url, html) for key, url, html in works]
+
+
+class ExtractionEngine:
+    """
+    Distribui a extração entre processos e entrega os resultados em fluxo.
+
+    - `workers`: número de processos (0 = automático: núcleos - 1).
+    - `batch_size`: registros por tarefa enviada a um processo.
+    - `inline_threshold`: abaixo dessa quantidade conhecida de registros, extrai
+      na própria thread (abrir processos custa mais que o trabalho).
+    """
+
+    def __init__(self, workers=0, batch_size=16, inline_threshold=8):
+        workers = int(workers or 0)
+        if workers <= 0:
+            workers = max(1, (os.cpu_count() or 2) - 1)
+        self.workers = workers
+        self.batch_size = max(1, int(batch_size))
+        self.inline_threshold = inline_threshold
+
+    def process(self, works, should_stop=lambda: False, total=None):
+        """
+        Gera (key, data, erro) para cada item de `works` (iterável de (key, url, html)).
+        `data` é None quando nenhum parser se aplica ou houve erro.
+        """
+        if total is None and hasattr(works, '__len__'):
+            total = len(works)
+
+        if self.workers == 1 or (total is not None and total <= self.inline_threshold):
+            for key, url, html in works:
+                if should_stop():
+                    return
+                yield _extrair_registro(key, url, html)
+            return
+
+        yield from self._process_parallel(iter(works), should_stop)
+
+    def _process_parallel(self, works, should_stop):
+        from parsers.parsed_document import get_backend
+
+        # Limita os lotes em voo: a memória não cresce com o tamanho do acervo
+        max_in_flight = self.workers * 2
+        pending = set()
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(get_backend(),)) as executor:
+            exhausted = False
+            while True:
+                while not exhausted and len(pending) < max_in_flight and not should_stop():
+                    batch = self._next_batch(works)
+                    if not batch:
+                        exhausted = True
+                        break
+                    pending.add(executor.submit(_extrair_lote, batch))
+
+                if not pending:
+                    return
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+
+                if should_stop():
+                    for future in pending:
+                        future.cancel()
+                    return
+
+    def _next_batch(self, works):
+        batch = []
+        for item in works:
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                break
+        return batch
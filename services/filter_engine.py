@@ -0,0 +1,157 @@
+"""
+Filtro em memória, indexado, para a grade de resultados.
+
+Cada campo filtrável é normalizado UMA vez na carga (minúsculas, sem acentos)
+e indexado por trigramas: a consulta intersecta as listas de postagens dos
+trigramas do termo e só confirma (`termo in texto`) os candidatos. Termos com
+menos de 3 caracteres fazem varredura simples nas colunas já normalizadas.
+
+Não há remoção física no índice: postagens antigas viram candidatos que a
+confirmação descarta, então atualizações e exclusões são O(tamanho do texto).
+"""
+import threading
+import unicodedata
+from array import array
+
+NGRAM = 3
+
+
+def fold(text):
+    """Minúsculas e sem acentos ('Ciência' -> 'ciencia')."""
+    if not text:
+        return ""
+    text = unicodedata.normalize('NFKD', str(text).lower())
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def matches(fields, item, terms, predicate=None):
+    """Aplica a um único item os mesmos critérios de FilterEngine.query()."""
+    for name, term in terms.items():
+        term = fold(term).strip()
+        if term and term not in fold(fields[name](item)):
+            return False
+    return predicate(item) if predicate else True
+
+
+def _ngrams(text):
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+class FilterEngine:
+    """
+    - `fields`: {nome: função(item) -> texto} dos campos filtráveis.
+    - `key_fn`: chave única do item (ex.: pesquisa_id).
+
+    O resultado de query() preserva a ordem da carga; itens novos recebidos
+    por update() aparecem antes de todos (mais recentes primeiro).
+    Os métodos são protegidos por lock: a consulta pode rodar fora da thread do Tk.
+    """
+
+    def __init__(self, fields, key_fn):
+        self.fields = fields
+        self.key_fn = key_fn
+        self._lock = threading.Lock()
+        self._items = []        # slot -> item (None se removido)
+        self._rank = []         # slot -> posição na ordem de exibição
+        self._slots = {}        # chave -> slot
+        self._folded = {name: [] for name in fields}
+        self._index = {name: {} for name in fields}
+        self._front = 0         # próxima posição "antes de todos"
+        self._ordered = None    # cache dos slots vivos em ordem de exibição
+
+    def build(self, items):
+        with self._lock:
+            for item in items:
+                self._append(item, len(self._items))
+            self._ordered = None
+        return self
+
+    def update(self, item):
+        """Reindexa um item alterado ou insere um novo antes de todos."""
+        with self._lock:
+            if self.key_fn(item) in self._slots:
+                self._reindex(item)
+            else:
+                self._front -= 1
+                self._append(item, self._front)
+                self._ordered = None
+
+    def remove(self, key):
+        with self._lock:
+            slot = self._slots.pop(key, None)
+            if slot is not None:
+                self._items[slot] = None
+                self._ordered = None
+
+    def query(self, terms, predicate=None):
+        """
+        `terms`: {campo: texto}; vazios são ignorados. `predicate(item)` é um
+        filtro extra (ex.: status do HTML). Retorna a lista de itens na ordem
+        de exibição.
+        """
+        terms = {name: fold(text).strip() for name, text in terms.items()}
+        terms = {name: text for name, text in terms.items() if text}
+
+        with self._lock:
+            candidates = None
+            # 1. Interseção das postagens de trigramas (termos com 3+ caracteres)
+            for name, term in terms.items():
+                if len(term) < NGRAM:
+                    continue
+                postings = sorted((self._index[name].get(gram, ()) for gram in _ngrams(term)), key=len)
+                found = set(postings[0])
+                for posting in postings[1:]:
+                    if not found:
+                        break
+                    found.intersection_update(posting)
+                candidates = found if candidates is None else candidates & found
+
+            slots = self._ordered_slots() if candidates is None else \
+                sorted(candidates, key=self._rank.__getitem__)
+
+            # 2. Confirmação no texto normalizado (elimina falsos positivos e
+            #    postagens antigas) e varredura dos termos curtos
+            result = []
+            for slot in slots:
+                item = self._items[slot]
+                if item is None:
+                    continue
+                if all(term in self._folded[name][slot] for name, term in terms.items()):
+                    if predicate is None or predicate(item):
+                        result.append(item)
+            return result
+
+    # --- Internos (chamados com o lock) ---
+    def _append(self, item, rank):
+        slot = len(self._items)
+        self._items.append(item)
+        self._rank.append(rank)
+        self._slots[self.key_fn(item)] = slot
+        for name, getter in self.fields.items():
+            text = fold(getter(item))
+            self._folded[name].append(text)
+            self._add_postings(name, text, slot)
+
+    def _reindex(self, item):
+        slot = self._slots[self.key_fn(item)]
+        self._items[slot] = item
+        for name, getter in self.fields.items():
+            text = fold(getter(item))
+            if text != self._folded[name][slot]:
+                self._folded[name][slot] = text
+                self._add_postings(name, text, slot)
+
+    def _add_postings(self, name, text, slot):
+        index = self._index[name]
+        for gram in _ngrams(text):
+            posting = index.get(gram)
+            if posting is None:
+                index[gram] = posting = array('I')
+            posting.append(slot)
+
+    def _ordered_slots(self):
+        if self._ordered is None:
+            alive = [slot for slot, item in enumerate(self._items) if item is not None]
+            alive.sort(key=self._rank.__getitem__)
+            self._ordered = alive
+        return self._ordered
@@ -0,0 +1,114 @@
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from urllib.parse import urlparse
+
+
+class HostScheduler:
+    """
+    Executa tarefas de download em paralelo entre hosts distintos, mantendo
+    as requisições a um MESMO host em série e espaçadas por um atraso de
+    cortesia (politeness delay).
+
+    - `max_workers` limita a concorrência global (quantos hosts ao mesmo tempo).
+    - `default_delay` é o intervalo padrão entre requisições a um mesmo host.
+    - `host_delays` permite sobrescrever o intervalo por raiz (scheme://netloc).
+    - `rate` (RateController), se informado, substitui os intervalos fixos: a
+      espera é recalculada após cada requisição, conforme a resposta do host.
+    """
+
+    def __init__(self, max_workers=4, default_delay=1.5, host_delays=None, rate=None):
+        self.max_workers = max(1, int(max_workers))
+        self.default_delay = max(0.0, float(default_delay))
+        self.host_delays = host_delays or {}
+        self.rate = rate
+        self._ready_at = {}  # raiz -> instante (monotonic) liberado para a próxima requisição
+
+    @staticmethod
+    def root_of(url):
+        """Raiz no mesmo formato usado pela tabela sources (https://site.com)."""
+        try:
+            parsed = urlparse(url)
+            return f"{parsed.scheme}://{parsed.netloc}"
+        except Exception:
+            return ""
+
+    def delay_for(self, root):
+        if self.rate is not None:
+            return self.rate.pause(root)
+        delay = self.host_delays.get(root)
+        return self.default_delay if delay is None else max(0.0, float(delay))
+
+    def run(self, items, url_of, worker, should_stop=lambda: False, refill=None):
+        """
+        Processa `items` agrupados por host.
+
+        Args:
+            items: lista de itens arbitrários (ex: tuplas (id, url)).
+            url_of: função que extrai a URL de um item.
+            worker: função chamada para cada item. Se retornar False, indica que
+                    nenhuma requisição foi feita (ex: fonte bloqueada) e o atraso
+                    de cortesia é dispensado.
+            should_stop: função consultada entre itens para interrupção.
+            refill: opcional, para consumir uma fila contínua. Chamada com as
+                    raízes ocupadas (em andamento ou aguardando worker) sempre que
+                    um worker fica ocioso; retorna novos itens, inclusive da raiz
+                    que acabou de esvaziar. Com todos os workers parados, [] encerra.
+        """
+        queues = OrderedDict()
+
+        def enqueue(new_items):
+            for item in new_items:
+                queues.setdefault(self.root_of(url_of(item)), []).append(item)
+
+        enqueue(items)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="host") as executor:
+            while True:
+                if should_stop():
+                    queues.clear()
+                # Hosts com mais itens primeiro: reduz o tempo total do lote
+                waiting = sorted(queues, key=lambda root: len(queues[root]), reverse=True)
+                for root in waiting[:self.max_workers - len(running)]:
+                    running[root] = executor.submit(self._drain_host, root, queues.pop(root), worker, should_stop)
+
+                if refill is not None and len(running) < self.max_workers and not should_stop():
+                    new_items = refill(set(running) | set(queues))
+                    if new_items:
+                        enqueue(new_items)
+                        continue
+                if not running:
+                    break
+                done, _ = wait(running.values(), return_when=FIRST_COMPLETED)
+                for root in [root for root, future in running.items() if future in done]:
+                    running.pop(root).result()
+
+    def _drain_host(self, root, host_items, worker, should_stop):
+        # Mesmo host de novo logo após esvaziar (refill): respeita a cortesia pendente
+        self._sleep(self._ready_at.get(root, 0.0) - time.monotonic(), should_stop)
+        for position, item in enumerate(host_items):
+            if should_stop():
+                return
+
+            try:
+                fetched = worker(item)
+            except Exception as e:
+                print(f"Erro inesperado no agendador ({root}): {e}")
+                fetched = True
+
+            if fetched is False:
+                continue
+            if position == len(host_items) - 1:
+                # Último item: não segura o worker; a espera vale para o próximo lote do host
+                self._ready_at[root] = time.monotonic() + self.delay_for(root)
+            else:
+                self._sleep(self.delay_for(root), should_stop)
+
+    def _sleep(self, seconds, should_stop):
+        """Espera em pequenos passos para responder rápido ao botão Parar."""
+        deadline = time.monotonic() + seconds
+        while not should_stop():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(min(0.2, remaining))
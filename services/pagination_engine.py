@@ -0,0 +1,203 @@
+import asyncio
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from services.host_scheduler import HostScheduler
+
+
+class _AsyncRateLimiter:
+    """Garante um intervalo mínimo entre o INÍCIO de duas requisições."""
+
+    def __init__(self, min_interval):
+        self.min_interval = max(0.0, float(min_interval))
+        self._lock = asyncio.Lock()
+        self._next_slot = 0.0
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            if now < self._next_slot:
+                await asyncio.sleep(self._next_slot - now)
+                now = time.monotonic()
+            self._next_slot = now + self.min_interval
+
+
+class _AdaptiveRateLimiter:
+    """Espaça as requisições pelo intervalo adaptativo do host (RateController)."""
+
+    def __init__(self, rate):
+        self.rate = rate
+
+    async def wait(self, url):
+        delay = self.rate.reserve(HostScheduler.root_of(url))
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class PaginationEngine:
+    """
+    Motor assíncrono do DeepScrap.
+
+    1. Monta de uma vez a fronteira de URLs (páginas 2..N) de todas as PLBs selecionadas.
+    2. Remove, com UMA consulta, as URLs que já existem na tabela plb.
+    3. Baixa com concorrência limitada e taxa controlada contra o BDTD
+       (adaptativa por host quando `rate` é informado, senão `min_interval` fixo).
+
+    O scraper é síncrono (Selenium/requests), então cada download roda num pool
+    de threads; o asyncio coordena concorrência, limite de taxa e interrupção.
+
+    Com `jobs` (JobRepository), a fronteira vai para a fila persistente e é
+    consumida em rodadas de CLAIM_SIZE páginas reservadas: um DeepScrap
+    interrompido continua depois com run_queue().
+    """
+
+    CLAIM_SIZE = 50
+
+    def __init__(self, scraper, history_repo, concurrency=3, min_interval=1.0,
+                 on_log=None, on_result=None, should_stop=None, rate=None,
+                 jobs=None, job_kind='plb'):
+        self.scraper = scraper
+        self.history_repo = history_repo
+        self.concurrency = max(1, int(concurrency))
+        self.min_interval = min_interval
+        self.rate = rate
+        self.jobs = jobs
+        self.job_kind = job_kind
+        self.on_log = on_log or (lambda msg, color="white": print(msg))
+        self.on_result = on_result or (lambda url, ok: None)
+        self.should_stop = should_stop or (lambda: False)
+
+    @staticmethod
+    def build_page_url(base_url, page):
+        if "page=" in base_url:
+            return re.sub(r'page=\d+', f'page={page}', base_url)
+        separator = "&" if "?" in base_url else "?"
+        return f"{base_url}{separator}page={page}"
+
+    def build_frontier(self, searches):
+        """
+        Args:
+            searches: lista de (base_url, max_page, term, year).
+        Returns:
+            Lista de dicts {url, page, max_page, term, year} ainda não baixados.
+        """
+        frontier = []
+        seen = set()
+        for base_url, max_page, term, year in searches:
+            for page in range(2, max_page + 1):
+                url = self.build_page_url(base_url, page)
+                if url in seen:
+                    continue
+                seen.add(url)
+                frontier.append({'url': url, 'page': page, 'max_page': max_page,
+                                 'term': term, 'year': year})
+
+        existing = self.history_repo.get_existing_urls([job['url'] for job in frontier])
+        return [job for job in frontier if job['url'] not in existing]
+
+    def run(self, searches):
+        """Executa o DeepScrap completo. Retorna a quantidade de páginas salvas."""
+        frontier = self.build_frontier(searches)
+        if self.jobs is not None:
+            self.jobs.enqueue(self.job_kind, [
+                (job['url'], {key: value for key, value in job.items() if key != 'url'})
+                for job in frontier
+            ])
+            return self.run_queue()
+
+        if not frontier:
+            self.on_log("Nenhuma página nova para baixar.", "yellow")
+            return 0
+
+        self.on_log(f"DeepScrap: {len(frontier)} páginas novas na fila.", "yellow")
+        return asyncio.run(self._run_async(frontier))
+
+    def run_queue(self):
+        """Consome as páginas pendentes da fila persistente. Retorna quantas foram salvas."""
+        total = self.jobs.count_open(self.job_kind)
+        if not total:
+            self.on_log("Nenhuma página nova para baixar.", "yellow")
+            return 0
+
+        self.on_log(f"DeepScrap: {total} páginas na fila.", "yellow")
+        state = {'done': 0, 'saved': 0}
+        while not self.should_stop():
+            claimed = self.jobs.claim(self.job_kind, self.CLAIM_SIZE)
+            if not claimed:
+                break
+            frontier = [dict(job['payload'], url=job['url'], job_id=job['id']) for job in claimed]
+            try:
+                asyncio.run(self._run_async(frontier, state, total))
+            finally:
+                # Páginas reservadas que não chegaram a rodar (Parar) voltam para a fila
+                self.jobs.release([job['id'] for job in claimed])
+        return state['saved']
+
+    async def _run_async(self, frontier, state=None, total=None):
+        if self.rate is not None:
+            limiter = _AdaptiveRateLimiter(self.rate)
+            wait_turn = limiter.wait
+        else:
+            limiter = _AsyncRateLimiter(self.min_interval)
+            wait_turn = lambda url: limiter.wait()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        loop = asyncio.get_running_loop()
+        total = total or len(frontier)
+        state = state if state is not None else {'done': 0, 'saved': 0}
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="deepscrap") as executor:
+
+            async def process(job):
+                async with semaphore:
+                    if self.should_stop():
+                        return
+                    await wait_turn(job['url'])
+                    if self.should_stop():
+                        return
+
+                    state['done'] += 1
+                    # Log, gravação e fechamento do job tocam o banco: rodam na thread do download
+                    if await loop.run_in_executor(executor, self._process_job, job, state['done'], total):
+                        state['saved'] += 1
+
+            await asyncio.gather(*(process(job) for job in frontier))
+
+        return state['saved']
+
+    def _process_job(self, job, position, total):
+        """Baixa, grava e fecha o job (numa thread do pool). Retorna True se salvou."""
+        self.on_log(f"[{position}/{total}] Baixando pág {job['page']}/{job['max_page']} ({job['term']})...", "white")
+        try:
+            saved = self._fetch_and_save(job)
+        except Exception as e:
+            if self.should_stop():
+                # Interrompido: o job continua reservado e volta à fila em run_queue()
+                return False
+            self.on_log(f"Erro pág {job['page']}: {e}", "red")
+            self.on_result(job['url'], False)
+            self._finish_job(job, e)
+            return False
+        if not saved:
+            if self.should_stop():
+                # O scraper devolve falhas do navegador/pool fechado como HTML vazio
+                return False
+            self.on_result(job['url'], False)
+        self._finish_job(job, None if saved else "HTML vazio")
+        return saved
+
+    def _finish_job(self, job, error):
+        if self.jobs is None or 'job_id' not in job:
+            return
+        if error is None:
+            self.jobs.complete(job['job_id'])
+        else:
+            self.jobs.fail(job['job_id'], error)
+
+    def _fetch_and_save(self, job):
+        result = self.scraper.fetch(job['url'])
+        html = self.scraper.stored_html(result) if result.not_modified else result.html
+        if not html:
+            return False
+        self.history_repo.save(job['url'], html, job['term'], job['year'], result.validators)
+        self.on_result(job['url'], True)
+        return True
@@ -1,121 +1,104 @@
+import importlib
 import json
 import os
+import threading
+import time
 
-from models.parsers.vufind_parser import VufindParser
-
-from parsers.generic_parser import GenericParser
-from parsers.dspace_jspui import DSpaceJSPUIParser
-from parsers.dspace_angular import DSpaceAngularParser
-from parsers.bdtd_parser import BDTDParser
-
-# Importe APENAS os parsers que possuem lógica customizada complexa
-from parsers.usp_parser import USPParser
-from parsers.ucs_parser import UcsParser 
-from parsers.uepg_parser import UEPGParser
-from parsers.unicap_parser import UnicapParser
-from parsers.ufpa_parser import UFPAParser
-from parsers.unisa_parser import UnisaParser
-from parsers.uniceub_parser import UniceubParser
-from parsers.ufmt_parser import UfmtParser
-from parsers.unifor_parser import UniforParser
-from parsers.unisinos_parser import UnisinosParser
-from parsers.ufop_parser import UfopParser
-from parsers.uff_parser import UFFParser
-from parsers.fei_parser import FeiParser
-from parsers.ufrn_parser import UfrnParser
-from parsers.cefetmg_parser import CefetMgParser
-from parsers.upf_parser import UpfParser
-from parsers.sucupira_parser import SucupiraParser
-from parsers.udesc_parser import UdescParser
-from parsers.siduece_parser import SidUeceParser
-from parsers.fecap_parser import FecapParser
-from parsers.utfpr_parser import UTFPRParser
-from parsers.uninove_parser import UninoveParser
-from parsers.ucb_parser import UcbParser
-from parsers.ufsm_parser import UfsmParser
-from parsers.ufcg_parser import UFCGParser
-from parsers.enap_parser import ENAPParser
-from parsers.idp_parser import IDPParser
-from parsers.ufpel_parser import UfpelParser
-from parsers.ufu_parser import UfuParser
-from parsers.ufam_parser import UFAMParser
-from parsers.ufrpe_parser import UfrpeParser
-from parsers.espm_parser import EspmParser
-from parsers.uepb_parser import UepbParser
-from parsers.ufpb_parser import UfpbParser
-from parsers.ueg_parser import UegParser
-from parsers.ufjf_parser import UfjfParser
-from parsers.unifei_parser import UnifeiParser
-from parsers.unicesumar_parser import UnicesumarParser
-from parsers.uftm_parser import UftmParser
-from parsers.ufrrj_parser import UFRRJParser
-from parsers.pucsp_parser import PucSpParser
-from parsers.ufersa_parser import UFERSAParser
-from parsers.unijui_parser import UnijuiParser
-from parsers.ufg_parser import UfgParser
-from parsers.pucrio_parser import PUCRioParser
+from services.domain_router import DomainRouter
+from parsers.parsed_document import ParsedDocument
+
+# Registro de parsers disponíveis: nome usado no JSON -> (módulo, classe).
+# Os módulos só são importados no primeiro uso de cada parser.
+PARSER_REGISTRY = {
+    'GenericParser': ('parsers.generic_parser', 'GenericParser'),
+    'PucRioParser': ('parsers.pucrio_parser', 'PUCRioParser'),
+    'UfgParser': ('parsers.ufg_parser', 'UfgParser'),
+    'UnijuiParser': ('parsers.unijui_parser', 'UnijuiParser'),
+    'UfersaParser': ('parsers.ufersa_parser', 'UFERSAParser'),
+    'PucSpParser': ('parsers.pucsp_parser', 'PucSpParser'),
+    'UfrrjParser': ('parsers.ufrrj_parser', 'UFRRJParser'),
+    'UftmParser': ('parsers.uftm_parser', 'UftmParser'),
+    'UnicesumarParser': ('parsers.unicesumar_parser', 'UnicesumarParser'),
+    'UnifeiParser': ('parsers.unifei_parser', 'UnifeiParser'),
+    'UfjfParser': ('parsers.ufjf_parser', 'UfjfParser'),
+    'UegParser': ('parsers.ueg_parser', 'UegParser'),
+    'UfpbParser': ('parsers.ufpb_parser', 'UfpbParser'),
+    'UepbParser': ('parsers.uepb_parser', 'UepbParser'),
+    'EspmParser': ('parsers.espm_parser', 'EspmParser'),
+    'UfrpeParser': ('parsers.ufrpe_parser', 'UfrpeParser'),
+    'UfamParser': ('parsers.ufam_parser', 'UFAMParser'),
+    'UfuParser': ('parsers.ufu_parser', 'UfuParser'),
+    'UfpelParser': ('parsers.ufpel_parser', 'UfpelParser'),
+    'IdpParser': ('parsers.idp_parser', 'IDPParser'),
+    'EnapParser': ('parsers.enap_parser', 'ENAPParser'),
+    'UfcgParser': ('parsers.ufcg_parser', 'UFCGParser'),
+    'UfsmParser': ('parsers.ufsm_parser', 'UfsmParser'),
+    'UcbParser': ('parsers.ucb_parser', 'UcbParser'),
+    'UninoveParser': ('parsers.uninove_parser', 'UninoveParser'),
+    'VufindParser': ('models.parsers.vufind_parser', 'VufindParser'),
+    'BDTDParser': ('parsers.bdtd_parser', 'BDTDParser'),
+    'DSpaceJSPUIParser': ('parsers.dspace_jspui', 'DSpaceJSPUIParser'),
+    'DSpaceAngularParser': ('parsers.dspace_angular', 'DSpaceAngularParser'),
+    'USPParser': ('parsers.usp_parser', 'USPParser'),
+    'UcsParser': ('parsers.ucs_parser', 'UcsParser'),
+    'UEPGParser': ('parsers.uepg_parser', 'UEPGParser'),
+    'UnicapParser': ('parsers.unicap_parser', 'UnicapParser'),
+    'UFPAParser': ('parsers.ufpa_parser', 'UFPAParser'),
+    'UnisaParser': ('parsers.unisa_parser', 'UnisaParser'),
+    'UniceubParser': ('parsers.uniceub_parser', 'UniceubParser'),
+    'UfmtParser': ('parsers.ufmt_parser', 'UfmtParser'),
+    'UniforParser': ('parsers.unifor_parser', 'UniforParser'),
+    'UnisinosParser': ('parsers.unisinos_parser', 'UnisinosParser'),
+    'UfopParser': ('parsers.ufop_parser', 'UfopParser'),
+    'UFFParser': ('parsers.uff_parser', 'UFFParser'),
+    'FeiParser': ('parsers.fei_parser', 'FeiParser'),
+    'UfrnParser': ('parsers.ufrn_parser', 'UfrnParser'),
+    'CefetMgParser': ('parsers.cefetmg_parser', 'CefetMgParser'),
+    'UpfParser': ('parsers.upf_parser', 'UpfParser'),
+    'SucupiraParser': ('parsers.sucupira_parser', 'SucupiraParser'),
+    'UdescParser': ('parsers.udesc_parser', 'UdescParser'),
+    'SidUeceParser': ('parsers.siduece_parser', 'SidUeceParser'),
+    'FecapParser': ('parsers.fecap_parser', 'FecapParser'),
+    'UtfprParser': ('parsers.utfpr_parser', 'UTFPRParser'),
+}
 
 class ParserFactory:
-    def __init__(self, config_filename="parsers_config.json"):
-        self._default = GenericParser()
+    """
+    Fábrica única (singleton) de parsers.
+    - Importa cada classe de parser apenas quando ela é usada pela primeira vez.
+    - Lê o parsers_config.json uma vez e só o recarrega se o arquivo mudar (mtime).
+    - Roteia domínios por uma trie de sufixos compilada (ver DomainRouter).
+    - Reaproveita as instâncias dos parsers, que não guardam estado entre extrações.
+    """
+    _instance_singleton = None
+    _singleton_lock = threading.Lock()
+
+    CONFIG_CHECK_INTERVAL = 2.0  # segundos entre verificações de mtime
+
+    def __new__(cls, config_filename="parsers_config.json"):
+        with cls._singleton_lock:
+            if cls._instance_singleton is None:
+                instance = super(ParserFactory, cls).__new__(cls)
+                instance._initialize(config_filename)
+                cls._instance_singleton = instance
+        return cls._instance_singleton
+
+    def _initialize(self, config_filename):
         self.config_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), config_filename)
-        
-        # Mapa de classes disponíveis (String -> Classe Real)
-        # Isso permite instanciar a classe baseada no nome que está no JSON
-        self.available_parsers = {
-            'PucRioParser': PUCRioParser,
-            'UfgParser': UfgParser,
-            'UnijuiParser': UnijuiParser,
-            'UfersaParser': UFERSAParser,
-            'PucSpParser': PucSpParser,
-            'UfrrjParser': UFRRJParser,
-            'UftmParser': UftmParser,
-            'UnicesumarParser': UnicesumarParser,
-            'UnifeiParser': UnifeiParser,
-            'UfjfParser': UfjfParser,
-            'UegParser': UegParser,
-            'UfpbParser': UfpbParser,
-            'UepbParser': UepbParser,
-            'EspmParser': EspmParser,
-            'UfrpeParser': UfrpeParser,
-            'UfamParser': UFAMParser,
-            'UfuParser': UfuParser,
-            'UfpelParser': UfpelParser,
-            'IdpParser': IDPParser,
-            'EnapParser': ENAPParser,
-            'UfcgParser': UFCGParser,
-            'UfsmParser': UfsmParser,
-            'UcbParser': UcbParser,
-            'UninoveParser': UninoveParser,
-            'VufindParser': VufindParser,
-            'BDTDParser': BDTDParser,
-            'DSpaceJSPUIParser': DSpaceJSPUIParser,
-            'DSpaceAngularParser': DSpaceAngularParser,
-            'USPParser': USPParser,
-            'UcsParser': UcsParser,
-            'UEPGParser': UEPGParser,
-            'UnicapParser': UnicapParser,
-            'UFPAParser': UFPAParser,
-            'UnisaParser': UnisaParser,
-            'UniceubParser': UniceubParser,
-            'UfmtParser': UfmtParser,
-            'UniforParser': UniforParser,
-            'UnisinosParser': UnisinosParser,
-            'UfopParser': UfopParser,
-            'UFFParser': UFFParser,
-            'FeiParser': FeiParser,
-            'UfrnParser': UfrnParser,
-            'CefetMgParser': CefetMgParser,
-            'UpfParser': UpfParser,
-            'SucupiraParser': SucupiraParser,
-            'UdescParser': UdescParser,
-            'SidUeceParser': SidUeceParser,
-            'FecapParser': FecapParser,
-            'UtfprParser': UTFPRParser
-        }
+        self._lock = threading.RLock()
+        self._classes = {}     # nome -> classe já importada
+        self._instances = {}   # (nome, kwargs) -> instância reaproveitável
+        self._config_mtime = None
+        self._last_check = 0.0
 
         # Carrega o mapeamento do JSON
-        self.domain_map = self._load_config()
+        self.domain_map = {}
+        self._reload_config_if_changed(force=True)
+
+    @property
+    def available_parsers(self):
+        """Nomes de parsers conhecidos (compatibilidade com o dicionário antigo)."""
+        return PARSER_REGISTRY
 
     def _load_config(self):
         """Lê o arquivo JSON e retorna o dicionário de mapeamentos."""
@@ -131,52 +114,113 @@ class ParserFactory:
             print(f"Erro ao ler configuração de parsers: {e}")
             return {}
 
+    def _reload_config_if_changed(self, force=False):
+        """Recarrega o JSON apenas quando o mtime do arquivo muda."""
+        now = time.monotonic()
+        if not force and now - self._last_check < self.CONFIG_CHECK_INTERVAL:
+            return
+        self._last_check = now
+
+        try:
+            mtime = os.path.getmtime(self.config_file)
+        except OSError:
+            mtime = None
+
+        if force or mtime != self._config_mtime:
+            with self._lock:
+                self.domain_map = self._load_config()
+                # Compila o mapeamento (trie de sufixos + cache LRU por netloc)
+                self._router = DomainRouter(self.domain_map)
+                self._config_mtime = mtime
+
+    def _load_class(self, class_name):
+        """Importa (uma única vez) a classe registrada com esse nome."""
+        if not class_name or class_name not in PARSER_REGISTRY:
+            return None
+        cls = self._classes.get(class_name)
+        if cls is None:
+            with self._lock:
+                cls = self._classes.get(class_name)
+                if cls is None:
+                    module_name, attr = PARSER_REGISTRY[class_name]
+                    try:
+                        cls = getattr(importlib.import_module(module_name), attr)
+                    except Exception as e:
+                        print(f"Erro ao importar parser '{class_name}': {e}")
+                        return None
+                    self._classes[class_name] = cls
+        return cls
+
+    def _instance(self, class_name, **kwargs):
+        """Retorna a instância reaproveitável do parser (criada no primeiro uso)."""
+        key = (class_name, tuple(sorted(kwargs.items())))
+        parser = self._instances.get(key)
+        if parser is not None:
+            return parser
+
+        cls = self._load_class(class_name)
+        if cls is None:
+            return None
+        parser = cls(**kwargs)
+
+        # Parsers que alteram o próprio estado durante a extração não são compartilhados
+        if getattr(cls, 'stateless', True):
+            with self._lock:
+                parser = self._instances.setdefault(key, parser)
+        return parser
+
+    def get_parser_class(self, url):
+        """Resolve apenas pelo mapeamento de domínios (sem HTML). Retorna a classe ou None."""
+        return self._load_class(self._resolve_name(url))
+
+    def _resolve_name(self, url):
+        """Nome do parser mapeado para o domínio da URL no JSON (ou None)."""
+        if not url: return None
+        self._reload_config_if_changed()
+        
+        from urllib.parse import urlparse
+        return self._router.resolve(urlparse(url).netloc.lower())
+
     def get_parser(self, url, html_content=None):
-        if not url: return self._default
+        """
+        Escolhe o parser para a URL. `html_content` pode ser HTML cru ou um
+        ParsedDocument; passe o mesmo ParsedDocument ao parser.extract() para
+        não analisar o HTML duas vezes.
+        """
+        if not url: return self._instance('GenericParser')
         
         from urllib.parse import urlparse
         domain = urlparse(url).netloc.lower()
         
         # 1. Tenta encontrar o parser pelo domínio no JSON
-        parser_class_name = None
-        
-        # Busca exata
-        if domain in self.domain_map:
-            parser_class_name = self.domain_map[domain]
-        else:
-            # Busca por sufixo (ex: .ufrn.br)
-            for key_domain, p_name in self.domain_map.items():
-                if key_domain.startswith('.'):
-                    if domain.endswith(key_domain):
-                        parser_class_name = p_name
-                        break
-                elif key_domain in domain: # Fallback para substrings
-                     parser_class_name = p_name
-                     break
+        parser_class_name = self._resolve_name(url)
         
-        # Se encontrou no JSON e a classe existe, instancia
-        if parser_class_name and parser_class_name in self.available_parsers:
-            return self.available_parsers[parser_class_name]()
+        # Se encontrou no JSON e a classe existe, reaproveita a instância
+        if parser_class_name in PARSER_REGISTRY:
+            parser = self._instance(parser_class_name)
+            if parser:
+                return parser
 
         # 2. Detecção Genérica (Fallback se não estiver no JSON)
         if html_content:
-            from bs4 import BeautifulSoup
-            soup = BeautifulSoup(html_content, 'html.parser')
-            html_lower = html_content.lower()
+            # O documento é analisado uma única vez e reaproveitado pelo parser escolhido
+            doc = ParsedDocument.wrap(html_content, url)
+            soup = doc.soup
+            html_lower = doc.lower
 
             if "vufind" in html_lower or "bdtd.ibict.br" in domain:
                 if "search/results" in url.lower() or soup.select('.result'):
-                    return VufindParser()
+                    return self._instance('VufindParser')
                 else:
-                    return BDTDParser() 
+                    return self._instance('BDTDParser')
 
             # DSpace 7/Angular
             if soup.find('ds-app') or soup.find('ds-root') or "dspace-angular" in html_lower:
-                return DSpaceAngularParser(sigla="DSpace7", universidade="Não identificada")
+                return self._instance('DSpaceAngularParser', sigla="DSpace7", universidade="Não identificada")
 
             # DSpace JSPUI / XMLUI genérico
-            if (soup.find('div', id='ds-main') or 
-                len(soup.find_all('meta', attrs={'name': lambda x: x and x.startswith('DC.')})) > 3):
-                return DSpaceJSPUIParser(sigla="DSpace", universidade="Não identificada")
+            dc_metas = sum(len(v) for name, v in doc.meta.items() if name.startswith('DC.'))
+            if soup.find('div', id='ds-main') or dc_metas > 3:
+                return self._instance('DSpaceJSPUIParser', sigla="DSpace", universidade="Não identificada")
 
-        return self._default
\ No newline at end of file
+        return self._instance('GenericParser')
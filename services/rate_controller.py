@@ -0,0 +1,94 @@
+import threading
+import time
+
+
+class RateController:
+    """
+    Controle adaptativo (AIMD) do intervalo entre requisições a um mesmo host.
+
+    Cada resposta saudável e rápida aumenta a taxa de forma aditiva (o intervalo
+    encolhe aos poucos); sinais de sobrecarga reduzem a taxa de forma
+    multiplicativa:
+    - HTTP 429/503 ou bloqueio detectado (WAF/captcha): taxa pela metade e,
+      se houver Retry-After, nenhuma requisição ao host antes desse prazo;
+    - resposta lenta (> `slow_response` s) ou falha de rede: taxa * 0.75.
+
+    O intervalo fica entre `min_delay` e `max_delay`. Hosts sem histórico
+    começam em `default_delay`; os aprendidos vêm de `saved` ({raiz: intervalo},
+    coluna sources.delay) e as mudanças são devolvidas por pop_changes() para
+    serem persistidas ao final de cada lote.
+    """
+
+    BACKOFF_STATUS = (429, 503)
+    RATE_STEP = 0.05          # req/s somados a cada resposta saudável
+    BACKOFF_FACTOR = 0.5      # 429/503/bloqueio
+    SLOW_FACTOR = 0.75        # resposta lenta ou erro de rede
+
+    def __init__(self, default_delay=1.5, min_delay=0.25, max_delay=60.0,
+                 slow_response=8.0, saved=None):
+        self.min_delay = max(0.01, float(min_delay))
+        self.max_delay = max(self.min_delay, float(max_delay))
+        self.default_delay = self._clamp(float(default_delay))
+        self.slow_response = float(slow_response)
+        self._lock = threading.Lock()
+        self._delays = {root: self._clamp(float(delay)) for root, delay in (saved or {}).items()}
+        self._next_slot = {}     # raiz -> instante (monotonic) da próxima requisição
+        self._not_before = {}    # raiz -> fim do Retry-After
+        self._dirty = set()
+
+    def _clamp(self, delay):
+        return min(self.max_delay, max(self.min_delay, delay))
+
+    def delay_for(self, root):
+        with self._lock:
+            return self._delays.get(root, self.default_delay)
+
+    def pause(self, root):
+        """Espera após uma requisição ao host (execução em série, ver HostScheduler)."""
+        with self._lock:
+            delay = self._delays.get(root, self.default_delay)
+            cooldown = self._not_before.get(root, 0.0) - time.monotonic()
+            return max(delay, cooldown)
+
+    def reserve(self, root):
+        """
+        Reserva o próximo horário livre do host e retorna quantos segundos
+        aguardar antes de iniciar a requisição (execução concorrente).
+        """
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot.get(root, 0.0), self._not_before.get(root, 0.0))
+            self._next_slot[root] = start + self._delays.get(root, self.default_delay)
+            return start - now
+
+    def record(self, root, status=None, elapsed=None, blocked=False, error=False, retry_after=None):
+        """Ajusta o intervalo do host a partir do resultado de uma requisição. Retorna o novo intervalo."""
+        if not root:
+            return self.default_delay
+        with self._lock:
+            delay = self._delays.get(root, self.default_delay)
+            rate = 1.0 / delay
+
+            if blocked or status in self.BACKOFF_STATUS:
+                rate *= self.BACKOFF_FACTOR
+                if retry_after:
+                    self._not_before[root] = time.monotonic() + min(retry_after, self.max_delay)
+            elif error or (status is not None and status >= 500):
+                rate *= self.SLOW_FACTOR
+            elif elapsed is not None and elapsed > self.slow_response:
+                rate *= self.SLOW_FACTOR
+            else:
+                rate += self.RATE_STEP
+
+            new_delay = self._clamp(1.0 / rate)
+            if abs(new_delay - delay) > 1e-6:
+                self._delays[root] = new_delay
+                self._dirty.add(root)
+            return new_delay
+
+    def pop_changes(self):
+        """Retorna {raiz: intervalo} alterados desde a última chamada."""
+        with self._lock:
+            changes = {root: round(self._delays[root], 3) for root in self._dirty}
+            self._dirty.clear()
+            return changes
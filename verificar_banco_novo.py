@@ -0,0 +1,49 @@
+"""
+Verificação de abertura de um banco NOVO.
+
+Cria um banco vazio em um diretório temporário, abre o DatabaseManager
+(esquema + migrações + índices + triggers) e grava uma linha em cada tabela
+satélite para exercitar os triggers. Use depois de mexer em _init_schema ou
+_run_migrations: as migrações precisam funcionar também sem as colunas
+legadas (html_content, status) que só existem em bancos antigos.
+
+Uso: python verificar_banco_novo.py
+"""
+import os
+import sys
+import tempfile
+import config
+
+
+def main():
+    with tempfile.TemporaryDirectory() as pasta:
+        config.DB_NAME = os.path.join(pasta, "novo.db")
+        from models.db.manager import DatabaseManager
+
+        db = DatabaseManager()
+        try:
+            with db.writer() as conn:
+                cursor = conn.cursor()
+                cursor.execute("INSERT INTO pesquisas (titulo) VALUES ('teste')")
+                pesquisa_id = cursor.lastrowid
+                for table in ('ppb', 'ppr'):
+                    cursor.execute(f"INSERT INTO {table} (pesquisa_id, html_hash, html_size) VALUES (?, 'x', 10)",
+                                   (pesquisa_id,))
+                conn.commit()
+                row = cursor.execute("SELECT has_ppb, has_ppr, ppb_size, ppr_size FROM pesquisas WHERE id = ?",
+                                     (pesquisa_id,)).fetchone()
+        except Exception as e:
+            print(f"❌ Erro ao usar o banco novo: {e}")
+            return 1
+        finally:
+            db.close_all()
+
+    if row != (1, 1, 10, 10):
+        print(f"❌ Triggers de status não atualizaram 'pesquisas': {row}")
+        return 1
+    print("✅ Banco novo criado e migrado sem erros.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
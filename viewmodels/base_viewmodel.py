@@ -1,9 +1,21 @@
+import threading
 from urllib.parse import urlparse
 
 class BaseViewModel:
     def __init__(self, system_repo, view=None):
         self.sys_repo = system_repo
         self.view = view 
+        self._workers = []  # Threads que reservam jobs da fila persistente
+
+    def _start_worker(self, target, *args):
+        """Inicia uma thread de lote acompanhada por is_busy() (ver MainViewModel.request_shutdown)."""
+        thread = threading.Thread(target=target, args=args)
+        self._workers = [t for t in self._workers if t.is_alive()] + [thread]
+        thread.start()
+
+    def is_busy(self):
+        """True enquanto alguma thread de lote ainda não devolveu seus jobs."""
+        return any(t.is_alive() for t in self._workers)
 
     def _log(self, message, color="white"):
         try: 
@@ -26,6 +38,12 @@ class BaseViewModel:
         if self.sys_repo:
             return self.sys_repo.is_source_allowed(url)
         return True
+
+    def _source_retry_at(self, url):
+        """Quando uma fonte em pausa (disjuntor aberto) volta a ser testada."""
+        if self.sys_repo:
+            return self.sys_repo.get_source_retry_at(url)
+        return None
     
     def _extract_root(self, url):
         """
@@ -2,16 +2,21 @@ import threading
 import time
 import re
 import math
-from bs4 import BeautifulSoup
+import config
 from viewmodels.base_viewmodel import BaseViewModel
+from services.pagination_engine import PaginationEngine
+from parsers.parsed_document import ParsedDocument, make_soup
 from urllib.parse import urlparse, parse_qs, unquote
 
 class HistoryViewModel(BaseViewModel):
-    def __init__(self, history_repo, results_repo, system_repo, scraper, view):
+    JOB_KIND = 'plb'  # Tipo dos jobs do DeepScrap na fila persistente
+
+    def __init__(self, history_repo, results_repo, system_repo, scraper, view, job_repo):
         super().__init__(system_repo, view)
         self.history_repo = history_repo
         self.results_repo = results_repo 
         self.scraper = scraper
+        self.jobs = job_repo
         self._stop_flag = False
 
     def load_data(self):
@@ -55,7 +60,7 @@ class HistoryViewModel(BaseViewModel):
         max_page = self._extract_max_page(html)
         if max_page > 1:
             self._log(f"DeepScrap: {max_page} páginas encontradas.", "yellow")
-            threading.Thread(target=self._run_pagination, args=(url, max_page, term, year)).start()
+            self._start_worker(self._run_pagination, url, max_page, term, year)
         else:
             self._log("Apenas 1 página nesta pesquisa.", "yellow")
 
@@ -70,37 +75,32 @@ class HistoryViewModel(BaseViewModel):
         
         if ids_to_process:
             self._log(f"Iniciando DeepScrap em massa ({len(ids_to_process)} pesquisas).", "yellow")
-            threading.Thread(target=self._run_batch_pagination, args=(ids_to_process,)).start()
+            self._start_worker(self._run_batch_pagination, ids_to_process)
         else:
             self._log("Nenhuma pesquisa na página 1 encontrada.", "yellow")
 
-    def _run_pagination(self, base_url, max_page, term, year):
+    def resume_jobs(self):
+        """Retoma um DeepScrap que ficou na fila (execução anterior interrompida)."""
+        pending = self.jobs.count_open(self.JOB_KIND)
+        if pending:
+            self._log(f"Retomando DeepScrap: {pending} páginas pendentes da sessão anterior...", "yellow")
+            self._start_worker(self._run_resumed_pagination)
+
+    def _run_resumed_pagination(self):
         self._stop_flag = False
-        separator = "&" if "?" in base_url else "?"
         self.view.after_thread_safe(lambda: self.view.history_tab.set_stop_button_state(True))
 
-        for i in range(2, max_page + 1):
-            if self._stop_flag: 
-                self._log("DeepScrap interrompido pelo usuário.", "red")
-                break
-            
-            if "page=" in base_url:
-                current_url = re.sub(r'page=\d+', f'page={i}', base_url)
-            else:
-                current_url = f"{base_url}{separator}page={i}"
-            
-            if self.history_repo.check_url_exists(current_url): continue
+        self._run_pagination_engine(None)
 
-            self._log(f"Baixando pág {i}/{max_page} ({term})...", "white")
-            try:
-                html = self.scraper.fetch_html(current_url)
-                if html:
-                    self.history_repo.save(current_url, html, term, year)
-                    self._update_source_status(current_url, True)
-                time.sleep(1.0)
-            except Exception as e:
-                self._log(f"Erro pág {i}: {e}", "red")
-                self._update_source_status(current_url, False)
+        self.view.after_thread_safe(lambda: self.view.history_tab.set_stop_button_state(False))
+        self.load_data()
+        if not self._stop_flag: self._log("DeepScrap finalizado.", "green")
+
+    def _run_pagination(self, base_url, max_page, term, year):
+        self._stop_flag = False
+        self.view.after_thread_safe(lambda: self.view.history_tab.set_stop_button_state(True))
+
+        self._run_pagination_engine([(base_url, max_page, term, year)])
         
         self.view.after_thread_safe(lambda: self.view.history_tab.set_stop_button_state(False))
         self.load_data()
@@ -111,6 +111,8 @@ class HistoryViewModel(BaseViewModel):
         total = len(ids)
         self.view.after_thread_safe(lambda: self.view.history_tab.set_stop_button_state(True))
         
+        # Monta a fronteira completa antes de baixar qualquer página
+        searches = []
         for idx, hid in enumerate(ids):
             if self._stop_flag: break
             rec = self.history_repo.get_by_id(hid)
@@ -118,15 +120,43 @@ class HistoryViewModel(BaseViewModel):
             
             max_p = self._extract_max_page(rec[2])
             if max_p > 1:
-                self._log(f"[{idx+1}/{total}] Processando '{rec[3]}'...", "white")
-                self._run_pagination(rec[1], max_p, rec[3], rec[4])
+                self._log(f"[{idx+1}/{total}] Preparando '{rec[3]}' ({max_p} págs)...", "white")
+                searches.append((rec[1], max_p, rec[3], rec[4]))
+        
+        if searches and not self._stop_flag:
+            self._run_pagination_engine(searches)
         
         self.view.after_thread_safe(lambda: self.view.history_tab.set_stop_button_state(False))
+        self.load_data()
         if not self._stop_flag: self._log("Lote DeepScrap finalizado.", "green")
 
+    def _run_pagination_engine(self, searches):
+        """
+        Baixa as páginas 2..N das pesquisas com concorrência limitada (asyncio),
+        pela fila persistente. `searches=None` apenas retoma a fila.
+        """
+        engine = PaginationEngine(
+            self.scraper, self.history_repo,
+            concurrency=getattr(config, 'PAGINATION_CONCURRENCY', 3),
+            min_interval=getattr(config, 'DELAY_BETWEEN_REQUESTS', 1.0),
+            on_log=self._log,
+            on_result=self._update_source_status,
+            should_stop=lambda: self._stop_flag,
+            rate=self.scraper.rate,
+            jobs=self.jobs, job_kind=self.JOB_KIND
+        )
+        try:
+            saved = engine.run_queue() if searches is None else engine.run(searches)
+            self._log(f"DeepScrap: {saved} páginas salvas.", "white")
+        except Exception as e:
+            self._log(f"Erro no DeepScrap: {e}", "red")
+        self.scraper.save_rates()
+        if self._stop_flag:
+            self._log("DeepScrap interrompido pelo usuário.", "red")
+
     def _extract_max_page(self, html):
         try:
-            soup = BeautifulSoup(html, 'html.parser')
+            soup = make_soup(html)
             stats = soup.find(string=re.compile(r"resultados de", re.IGNORECASE))
             if stats:
                 txt = stats.find_parent().get_text(strip=True)
@@ -147,13 +177,15 @@ class HistoryViewModel(BaseViewModel):
         try:
             from services.parser_factory import ParserFactory
             factory = ParserFactory()
-            parser = factory.get_parser(rec[1], html_content=rec[2])
+            # Parse único do HTML, compartilhado entre detecção e extração
+            doc = ParsedDocument(rec[2], rec[1])
+            parser = factory.get_parser(rec[1], html_content=doc)
             
             if parser:
                 if not batch_mode: self._log(f"Parser selecionado: {parser.__class__.__name__}", "white")
                 
                 # Executa extração
-                data = parser.extract(rec[2], base_url=rec[1])
+                data = parser.extract(doc, base_url=rec[1])
                 
                 # CORREÇÃO: Garante que 'data' seja uma lista antes de salvar
                 if isinstance(data, dict):
@@ -28,14 +28,19 @@ class HomeViewModel(BaseViewModel):
     def _run_scraping_task(self, url, term, year):
         try:
             self._log(f"Conectando a: {url}", "white")
-            html = self.scraper.fetch_html(url)
+            result = self.scraper.fetch(url)
+            html = self.scraper.stored_html(result) if result.not_modified else result.html
             
             if not html:
                 self._log("HTML vazio recebido. Verifique sua conexão.", "red")
                 return
 
-            self._log("Página baixada. Salvando no histórico...", "white")
-            self.history_repo.save(url, html, term, year)
+            if result.not_modified and self.history_repo.check_url_exists(url):
+                # 304: a página já está no histórico e não mudou; nada a regravar
+                self._log("Página não mudou desde a última captura (304).", "white")
+            else:
+                self._log("Página baixada. Salvando no histórico...", "white")
+                self.history_repo.save(url, html, term, year, result.validators)
             
             self.view.after_thread_safe(lambda: self.view.home_tab.display_html(html))
             self._update_source_status(url, True)
@@ -2,6 +2,7 @@ from models.db.manager import DatabaseManager
 from models.repositories.history_repository import HistoryRepository
 from models.repositories.results_repository import ResultsRepository
 from models.repositories.system_repository import SystemRepository
+from models.repositories.job_repository import JobRepository
 from models.scraper import ScraperModel
 
 from viewmodels.home_viewmodel import HomeViewModel
@@ -15,23 +16,27 @@ class MainViewModel:
         
         # 1. Infraestrutura
         self.db_manager = DatabaseManager()
-        self.scraper = ScraperModel()
 
         # 2. Repositórios
         self.history_repo = HistoryRepository(self.db_manager)
         self.results_repo = ResultsRepository(self.db_manager)
         self.sys_repo = SystemRepository(self.db_manager)
+        self.job_repo = JobRepository(self.db_manager)
+
+        self.scraper = ScraperModel(system_repo=self.sys_repo)
 
         # 3. Sub-ViewModels
         self.home_vm = HomeViewModel(self.history_repo, self.sys_repo, self.scraper, view)
-        self.history_vm = HistoryViewModel(self.history_repo, self.results_repo, self.sys_repo, self.scraper, view)
-        self.results_vm = ResultsViewModel(self.results_repo, self.sys_repo, self.scraper, view)
+        self.history_vm = HistoryViewModel(self.history_repo, self.results_repo, self.sys_repo, self.scraper, view,
+                                           self.job_repo)
+        self.results_vm = ResultsViewModel(self.results_repo, self.sys_repo, self.scraper, view, self.job_repo)
         self.settings_vm = SettingsViewModel(self.db_manager, view) # NOVO
 
         # Callbacks
         self.view.refresh_history_callback = self.history_vm.load_data
-        self.view.refresh_results_callback = self.results_vm.load_results
+        self.view.refresh_results_callback = self.results_vm.refresh_results
         self.view.refresh_all_callback = self.initialize_data # Callback para reset total
+        self._jobs_resumed = False
 
     def initialize_data(self):
         self.history_vm.load_data()
@@ -42,6 +47,30 @@ class MainViewModel:
         if hasattr(self.view, 'filter_home_options'):
             self.view.filter_home_options(existing)
 
+        # Na abertura (apenas uma vez): retoma downloads em lote interrompidos
+        if not self._jobs_resumed:
+            self._jobs_resumed = True
+            self.job_repo.recover()
+            self.results_vm.resume_jobs()
+            self.history_vm.resume_jobs()
+
+    def request_shutdown(self):
+        """
+        Interrompe os lotes em andamento ao fechar a aplicação: as threads
+        terminam a página atual e devolvem os jobs reservados à fila, para a
+        próxima abertura retomar de onde parou.
+        """
+        self.results_vm._stop_flag = True
+        self.history_vm._stop_flag = True
+
+    def is_busy(self):
+        return self.results_vm.is_busy() or self.history_vm.is_busy()
+
+    def shutdown(self):
+        """Libera recursos persistentes (navegadores e conexões do banco) ao fechar a aplicação."""
+        self.scraper.close()
+        self.db_manager.close_all()
+
     def _load_sources(self):
         sources = self.sys_repo.get_sources()
         for root, status in sources.items():
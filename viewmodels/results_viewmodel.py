@@ -2,21 +2,53 @@ import threading
 import time
 import webbrowser
 import traceback
+import config
 from viewmodels.base_viewmodel import BaseViewModel
+from services.host_scheduler import HostScheduler
+from services.challenge_lane import ChallengeLane
+from services.extraction_engine import ExtractionEngine
 from urllib.parse import urlparse
 
 class ResultsViewModel(BaseViewModel):
-    def __init__(self, results_repo, system_repo, scraper, view):
+    EXTRACTION_WRITE_BATCH = 200  # Registros por transação na reextração
+    JOB_KIND = 'ppr'              # Tipo dos jobs de download na fila persistente
+    JOB_CLAIM_SIZE = 100          # Jobs reservados por rodada do agendador
+    JOB_IDLE_WAIT = 900           # Espera máxima (s) por jobs adiados antes de encerrar o lote
+    JOB_LANE_BACKLOG = 5          # Jobs por host na fila de desafios antes de parar de reservar outros
+
+    def __init__(self, results_repo, system_repo, scraper, view, job_repo):
         super().__init__(system_repo, view)
         self.repo = results_repo
         self.scraper = scraper
+        self.jobs = job_repo
         self._stop_flag = False
+        self._batch_running = False
+        self._batch_lock = threading.Lock()
+        self._version = 0  # Última versão do feed de mudanças aplicada na tabela
+        self._version_lock = threading.Lock()
 
     def load_results(self):
+        """Recarga completa da tabela (inicialização e botão Atualizar)."""
         self._log("Recarregando tabela de resultados...", "white")
-        data = self.repo.get_all()
-        self.view.after_thread_safe(lambda: self.view.results_tab.display_results(data))
+        with self._version_lock:
+            # Versão lida ANTES dos dados: mudanças concorrentes são reaplicadas depois
+            version = self.repo.get_current_version()
+            data = self.repo.get_all()
+            self._version = version
+            self.view.after_thread_safe(lambda: self.view.results_tab.display_results(data))
+            self.repo.prune_deleted(version)
         self._log("Tabela atualizada.", "white")
+
+    def refresh_results(self):
+        """Atualiza na tabela apenas as linhas alteradas desde a última leitura."""
+        with self._version_lock:
+            version, changed, deleted = self.repo.get_changes_since(self._version)
+            if version == self._version:
+                return
+            self._version = version
+            self.view.after_thread_safe(lambda: self.view.results_tab.apply_changes(changed, deleted))
+            if deleted:
+                self.repo.prune_deleted(version)
  
     def stop_process(self):
         self._stop_flag = True
@@ -32,9 +64,9 @@ class ResultsViewModel(BaseViewModel):
             return
         
         self._log(f"Baixando {len(pending)} pendentes (fontes ativas)...", "yellow")
-        self._toggle_ui(busy=True)
         # Modo normal: force=False
-        threading.Thread(target=self._run_batch_download, args=(pending, False)).start()
+        self.jobs.enqueue(self.JOB_KIND, [(url, {'pesquisa_id': pid, 'force': False}) for pid, url in pending])
+        self._start_batch_download()
 
     def force_scrape_specific_source(self, root_url):
         if not root_url:
@@ -54,9 +86,26 @@ class ResultsViewModel(BaseViewModel):
             return
 
         self._log(f"Forçando download de {len(target_list)} itens da fonte {root_url}...", "yellow")
+        # Modo forçado: force=True (ignora status desativado), à frente da fila
+        self.jobs.enqueue(self.JOB_KIND, [(url, {'pesquisa_id': pid, 'force': True}) for pid, url in target_list],
+                          priority=1)
+        self._start_batch_download()
+
+    def resume_jobs(self):
+        """Retoma downloads em lote que ficaram na fila (execução anterior interrompida)."""
+        pending = self.jobs.count_open(self.JOB_KIND)
+        if pending:
+            self._log(f"Retomando {pending} downloads pendentes da sessão anterior...", "yellow")
+            self._start_batch_download()
+
+    def _start_batch_download(self):
+        with self._batch_lock:
+            if self._batch_running:
+                self._log("Itens adicionados à fila do download em andamento.", "white")
+                return
+            self._batch_running = True
         self._toggle_ui(busy=True)
-        # Modo forçado: force=True (ignora status desativado)
-        threading.Thread(target=self._run_batch_download, args=(target_list, True)).start()
+        self._start_worker(self._run_batch_download)
 
     def scrape_specific_url(self, url, doc_type):
         self._log(f"Baixando {doc_type}: {url}", "yellow")
@@ -64,12 +113,20 @@ class ResultsViewModel(BaseViewModel):
 
     def _run_single_download(self, url, doc_type):
         try:
-            html = self.scraper.fetch_html(url)
+            result = self.scraper.fetch(url)
+            if result.not_modified:
+                # 304: o HTML armazenado continua válido; nada a regravar nem reextrair
+                self.repo.link_content(url, result.html_hash, doc_type)
+                self._update_source_status(url, True)
+                self._log("Conteúdo não mudou desde o último download.", "green")
+                self.refresh_results()
+                return
+            html = result.html
             if html:
-                self.repo.save_content(url, html, doc_type)
+                self.repo.save_content(url, html, doc_type, result.validators)
                 self._update_source_status(url, True)
                 self._log("Conteúdo salvo com sucesso.", "green")
-                self.load_results()
+                self.refresh_results()
             else:
                 self._update_source_status(url, False)
                 self._log("Conteúdo vazio. Fonte marcada como instável.", "red")
@@ -77,90 +134,238 @@ class ResultsViewModel(BaseViewModel):
             self._update_source_status(url, False)
             self._log(f"Erro: {e}", "red")
 
-    def _run_batch_download(self, pending_list, force=False):
+    def _run_batch_download(self):
+        """Consome a fila persistente de downloads (crawl_jobs) até esvaziá-la ou ser interrompido."""
         self._stop_flag = False
-        count = 0
-        total = len(pending_list)
-        
-        for idx, (pid, url) in enumerate(pending_list):
-            if self._stop_flag:
-                self._log("Download em lote interrompido pelo usuário.", "red")
-                break
+        total = self.jobs.count_open(self.JOB_KIND)
+        progress = {'started': 0, 'saved': 0, 'unchanged': 0}
+        lock = threading.Lock()
+
+        def baixar(job):
+            url = job['url']
+            if lane.pending(HostScheduler.root_of(url)) >= self.JOB_LANE_BACKLOG:
+                # Fila de desafios já cheia para o host: o job volta para a fila persistente
+                self.jobs.release([job['id']])
+                return False
 
             # Se NÃO for forçado, verifica se a fonte está permitida
-            if not force:
+            if not job['payload'].get('force'):
                 if not self._check_source_allowed(url): 
                     # Log silencioso ou apenas no console para não poluir demais se houver muitos bloqueados
-                    print(f"Fonte bloqueada/ignorada: {url}")
-                    continue
+                    print(f"Fonte em pausa (disjuntor aberto), adiada: {url}")
+                    self.jobs.defer(job['id'], self._source_retry_at(url) or time.time() + self.JOB_IDLE_WAIT,
+                                    "Fonte em pausa")
+                    return False
+
+            with lock:
+                progress['started'] += 1
+                idx = progress['started']
 
             try:
-                self._log(f"[{idx+1}/{total}] Baixando...", "white")
-                html = self.scraper.fetch_html(url)
-                if html:
-                    self.repo.save_content(url, html, 'repositorio')
+                self._log(f"[{idx}/{total}] Baixando...", "white")
+                # Páginas bloqueadas (WAF/captcha) não esperam o navegador visível aqui
+                result = self.scraper.fetch(url, challenge=False)
+            except Exception as e:
+                concluir(job, None, e)
+                return True
+
+            if result.needs_challenge:
+                with lock:
+                    in_lane.add(job['id'])
+                self.jobs.to_challenge(job['id'])
+                self._log(f"Bloqueio em {url}: enviado para a fila de desafios.", "yellow")
+                lane.submit(job)
+                return result.requested
+            concluir(job, result, None)
+            return True
+
+        def concluir(job, result, error):
+            """Grava o resultado de um job (fila rápida ou fila de desafios)."""
+            url = job['url']
+            with lock:
+                in_lane.discard(job['id'])
+            falhou = error is not None or not (result.html or result.not_modified)
+            if falhou and self._stop_flag:
+                # Interrompido (Parar ou fechamento): o scraper devolve as falhas do
+                # navegador/pool como resultado vazio. Não conta contra a fonte nem gasta tentativa
+                self.jobs.release([job['id']])
+                return
+            try:
+                if error is not None:
+                    raise error
+                if result.not_modified:
+                    self.repo.link_content(url, result.html_hash, 'repositorio')
+                    self._update_source_status(url, True)
+                    self.jobs.complete(job['id'])
+                    with lock:
+                        progress['unchanged'] += 1
+                elif result.html:
+                    self.repo.save_content(url, result.html, 'repositorio', result.validators)
                     self._update_source_status(url, True)
-                    count += 1
+                    self.jobs.complete(job['id'])
+                    with lock:
+                        progress['saved'] += 1
                 else:
                     self._update_source_status(url, False)
+                    self.jobs.fail(job['id'], "HTML vazio")
                     self._log(f"Falha (Vazio): {url}", "red")
-
-                time.sleep(1.0)
             except Exception as e:
                 self._update_source_status(url, False)
+                self.jobs.fail(job['id'], e)
                 self._log(f"Erro ao baixar {url}: {e}", "red")
+
+        # Fila lenta: navegador visível para páginas bloqueadas, em paralelo à fila rápida
+        in_lane = set()
+        lane = ChallengeLane(
+            self.scraper.fetch_challenge, on_done=concluir, url_of=lambda job: job['url'],
+            workers=getattr(config, 'HEADED_POOL_SIZE', 1), should_stop=lambda: self._stop_flag,
+            key_of=lambda job: HostScheduler.root_of(job['url']),
+            on_start=lambda job: self.jobs.renew([job['id']])
+        )
+
+        # Paralelo entre hosts distintos, em série dentro de cada host, com o
+        # intervalo adaptativo aprendido pelo scraper para cada host
+        scheduler = HostScheduler(
+            max_workers=getattr(config, 'MAX_CONCURRENT_DOWNLOADS', 4),
+            default_delay=getattr(config, 'DELAY_BETWEEN_REQUESTS', 1.0),
+            rate=self.scraper.rate
+        )
+        reserved = set()  # reservados que ainda não chegaram a um worker
+
+        def reservar(busy_roots):
+            """Próximos jobs para os workers ociosos do agendador ([] encerra o lote)."""
+            while not self._stop_flag:
+                # Jobs ainda na fila de desafios mantêm a reserva enquanto esperam
+                with lock:
+                    waiting = list(in_lane)
+                self.jobs.renew(waiting)
+
+                crowded = lane.crowded(self.JOB_LANE_BACKLOG)
+                claimed = self.jobs.claim(self.JOB_KIND, self.JOB_CLAIM_SIZE,
+                                          skip_roots=set(crowded) | set(busy_roots))
+                if not claimed and busy_roots:
+                    # Hosts ainda em andamento: pede de novo quando um deles esvaziar
+                    return []
+                if not claimed and crowded:
+                    # Só restam jobs de hosts com a fila de desafios cheia: aguarda ela andar
+                    time.sleep(2)
+                    continue
+                if not claimed and self._wait_for_deferred_jobs():
+                    continue
+                if not claimed:
+                    # Fila vazia: confirma sob o lock para não perder itens enfileirados agora
+                    with self._batch_lock:
+                        claimed = self.jobs.claim(self.JOB_KIND, self.JOB_CLAIM_SIZE)
+                        if not claimed:
+                            self._batch_running = False
+                            return []
+                with lock:
+                    reserved.update(job['id'] for job in claimed)
+                return claimed
+            return []
+
+        def entregar(job):
+            with lock:
+                reserved.discard(job['id'])
+            return baixar(job)
+
+        try:
+            # Cada host volta a ser reservado assim que o worker dele fica ocioso
+            scheduler.run([], url_of=lambda job: job['url'], worker=entregar,
+                          should_stop=lambda: self._stop_flag, refill=reservar)
+        finally:
+            # Reservados que não chegaram a rodar (Parar/erro) voltam para a fila;
+            # os que estão com a fila de desafios seguem com ela
+            with lock:
+                pending = list(reserved)
+            self.jobs.release(pending)
+            with self._batch_lock:
+                self._batch_running = False
+            if lane.pending():
+                self._log(f"Fila rápida concluída. Aguardando {lane.pending()} páginas na fila de desafios...", "yellow")
+            self.jobs.release([job['id'] for job in lane.join()])
+        self.scraper.save_rates()
+
+        if self._stop_flag:
+            self._log("Download em lote interrompido pelo usuário.", "red")
         
         self._toggle_ui(busy=False)
-        self._log(f"Lote concluído: {count} salvos.", "green")
-        self.load_results()
+        self._log(f"Lote concluído: {progress['saved']} salvos, {progress['unchanged']} sem alteração (304).", "green")
+        self.refresh_results()
         self._log("Processo finalizado. Aguardando novos comandos.", "white")
 
+    def _wait_for_deferred_jobs(self):
+        """
+        Só restam jobs adiados (fonte em pausa ou nova tentativa): se o próximo
+        vence em até JOB_IDLE_WAIT, aguarda por ele. Retorna False para encerrar.
+        """
+        due = self.jobs.next_due(self.JOB_KIND)
+        if due is None:
+            return False
+        wait = due - time.time()
+        if wait > self.JOB_IDLE_WAIT:
+            return False
+        if wait > 0:
+            self._log(f"Aguardando {int(wait)}s para testar fontes em pausa / repetir falhas...", "white")
+            deadline = time.monotonic() + wait
+            while not self._stop_flag and time.monotonic() < deadline:
+                time.sleep(min(0.5, deadline - time.monotonic()))
+        return not self._stop_flag
+
     def extract_single_data(self, title, author):
         ppr_data = self.repo.get_ppr_data(title, author)
         
-        if not ppr_data or not ppr_data[1]:
+        if not ppr_data or not ppr_data[2]:
             self._log("HTML do Repositório (PPR) não encontrado. Faça o download primeiro.", "red")
             return
         
-        url, html = ppr_data
-        records = [(title, author, url, html)]
+        pesquisa_id, url, html = ppr_data
+        records = [(pesquisa_id, url, html)]
         
         self._log(f"Extraindo dados individuais (URL: {url})...", "yellow")
         threading.Thread(target=self._run_univ_extraction, args=(records,)).start()
 
-    def _run_univ_extraction(self, records):
+    def _run_univ_extraction(self, records, total=None):
+        """
+        `records`: (pesquisa_id, url, html). Pode ser uma lista ou um iterador
+        em fluxo (nesse caso informe `total`).
+        """
         self._stop_flag = False
-        try:
-            from services.parser_factory import ParserFactory
-            factory = ParserFactory()
-        except Exception as e:
-            self._log(f"Erro ao inicializar fábrica de parsers: {e}", "red")
-            self._toggle_ui(busy=False)
-            return
+        engine = ExtractionEngine(workers=getattr(config, 'EXTRACTION_WORKERS', 0))
 
         count_success = 0
-        total = len(records)
-        
-        for idx, (title, author, url, html) in enumerate(records):
-            if self._stop_flag: break
+        processed = 0
+        if total is None:
+            total = len(records)
+        pending_updates = []
 
-            try:
-                parser = factory.get_parser(url, html_content=html)
-                if parser:
-                    data = parser.extract(html, url)
-                    if data and (data.get('sigla') or data.get('programa')):
-                        self.repo.update_univ_data(title, author, 
-                                                data.get('sigla'), 
-                                                data.get('universidade'), 
-                                                data.get('programa'))
-                        count_success += 1
+        try:
+            # Processos paralelos fazem o parsing; esta thread é a única escritora
+            for pesquisa_id, data, error in engine.process(records, should_stop=lambda: self._stop_flag, total=total):
+                processed += 1
+                if error:
+                    print(f"Erro no registro {processed}: {error}")
+                elif data and (data.get('sigla') or data.get('programa')):
+                    pending_updates.append((pesquisa_id, data.get('sigla'),
+                                            data.get('universidade'), data.get('programa')))
+                    count_success += 1
+                    if total == 1:
                         self._log(f"Sucesso: {data.get('sigla')} - {data.get('programa')}", "green")
-            except Exception as e:
-                print(f"Erro no registro {idx}: {e}")
+
+                if len(pending_updates) >= self.EXTRACTION_WRITE_BATCH:
+                    self.repo.update_univ_data_batch(pending_updates)
+                    pending_updates = []
+
+                if processed % self.EXTRACTION_WRITE_BATCH == 0:
+                    self._log(f"Extração: {processed}/{total} analisados, {count_success} identificados...", "white")
+        except Exception as e:
+            self._log(f"Erro no motor de extração: {e}", "red")
+        finally:
+            self.repo.update_univ_data_batch(pending_updates)
 
         self._toggle_ui(busy=False)
         self._log(f"Extração finalizada. {count_success} registros atualizados.", "green")
-        self.load_results()
+        self.refresh_results()
         self._log("Processo finalizado. Aguardando novos comandos.", "white")
         
     def get_disabled_sources_list(self):
@@ -171,19 +376,20 @@ class ResultsViewModel(BaseViewModel):
     def batch_extract_univ_data(self):
         self._log("Buscando registros não identificados ('-' ou 'DSpace')...", "yellow")
         try:
-            # ALTERAÇÃO AQUI: Chama o novo método filtro
-            records = self.repo.get_ppr_for_reprocessing()
+            # Conta sem carregar HTML; os registros são lidos em fluxo durante a extração
+            total = self.repo.count_ppr_for_reprocessing()
         except Exception as e:
             self._log(f"Erro ao ler banco de dados: {e}", "red")
             return
 
-        if not records:
+        if not total:
             self._log("Nenhum registro com sigla '-' ou 'DSpace' encontrado para processar.", "green")
             return
         
-        self._log(f"Iniciando reanálise de {len(records)} repositórios...", "yellow")
+        self._log(f"Iniciando reanálise de {total} repositórios...", "yellow")
         self._toggle_ui(busy=True)
-        threading.Thread(target=self._run_univ_extraction, args=(records,)).start()
+        records = self.repo.iter_ppr_for_reprocessing()
+        threading.Thread(target=self._run_univ_extraction, args=(records, total)).start()
         
     def delete_stored_html(self, title, author, target_type):
         """Remove o HTML armazenado (PPB ou PPR) para permitir novo download."""
@@ -192,7 +398,7 @@ class ResultsViewModel(BaseViewModel):
         if self.repo.clear_html_content(title, author, target_type):
             self._log(f"HTML de {label} apagado para: {title[:30]}...", "yellow")
             # Recarrega a tabela para atualizar as cores (status)
-            self.load_results()
+            self.refresh_results()
         else:
             self._log(f"Erro ao apagar HTML de {label}.", "red")
 
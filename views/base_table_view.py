@@ -92,4 +92,217 @@ class BaseTableFrame(ctk.CTkFrame):
         selected = self.tree.selection()
         if not selected:
             return None
-        return self.tree.item(selected[0])['values']
\ No newline at end of file
+        return self.tree.item(selected[0])['values']
+
+
+class ListDataSource:
+    """
+    Fonte de dados em janela para a VirtualTableFrame sobre uma lista em memória.
+    `row_fn(item)` -> (chave, valores, tags) só é chamado para as linhas da janela
+    visível (e na ordenação), então o custo de renderização não depende do total.
+    """
+
+    def __init__(self, items=None, row_fn=None):
+        self.items = items if items is not None else []
+        self.row_fn = row_fn or (lambda item: (item[0], item, ()))
+        self.sort_order = None  # (coluna, reverse, numérica) da última ordenação
+
+    def __len__(self):
+        return len(self.items)
+
+    def window(self, start, count):
+        return [self.row_fn(item) for item in self.items[start:start + count]]
+
+    def sort(self, col_index, reverse=False):
+        keyed = [(self.row_fn(item)[1][col_index], item) for item in self.items]
+        try:
+            # Tenta ordenar como número
+            keyed.sort(key=lambda t: float(t[0]), reverse=reverse)
+            numeric = True
+        except (TypeError, ValueError):
+            # Fallback para string
+            keyed.sort(key=lambda t: str(t[0] or '').lower(), reverse=reverse)
+            numeric = False
+        self.items[:] = [item for _, item in keyed]
+        self.sort_order = (col_index, reverse, numeric)
+
+    def insert(self, item, default_index=None):
+        """
+        Insere `item` na posição da ordenação por coluna ativa (busca binária).
+        Sem ordenação, usa `default_index` (ou o fim da lista).
+        """
+        if self.sort_order is None:
+            self.items.insert(len(self.items) if default_index is None else default_index, item)
+            return
+        col_index, reverse, numeric = self.sort_order
+
+        def key(row):
+            value = self.row_fn(row)[1][col_index]
+            return float(value) if numeric else str(value or '').lower()
+
+        try:
+            target = key(item)
+            lo, hi = 0, len(self.items)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                current = key(self.items[mid])
+                if (current >= target) if reverse else (current <= target):
+                    lo = mid + 1
+                else:
+                    hi = mid
+        except (TypeError, ValueError):
+            lo = len(self.items)
+        self.items.insert(lo, item)
+
+
+class VirtualTableFrame(BaseTableFrame):
+    """
+    Tabela virtualizada: a Treeview contém apenas as linhas que cabem na tela.
+    Um conjunto fixo de itens é reaproveitado a cada rolagem (só os valores
+    mudam) e a barra de rolagem percorre a fonte de dados, não o widget.
+    Memória e tempo de renderização ficam limitados ao tamanho da janela.
+
+    Subclasses definem a fonte com set_data_source() e podem sobrescrever
+    on_row_selected(chave) para reagir a seleções feitas pelo usuário.
+    """
+
+    ROW_HEIGHT = 30
+    WHEEL_STEP = 3
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.source = ListDataSource()
+        self._columns = []
+        self._offset = 0
+        self._visible = 25
+        self._pool = []          # itens fixos da Treeview (reaproveitados)
+        self._pool_keys = {}     # item da Treeview -> chave da linha exibida
+        self._selected_key = None
+
+    def setup_virtual_treeview(self, container, columns_config):
+        self.setup_treeview(container, columns_config)
+        self._columns = [c[0] for c in columns_config]
+
+        # A Treeview não rola sozinha: a barra controla o deslocamento na fonte
+        self.tree.configure(yscrollcommand="")
+        self.scrollbar.configure(command=self._on_scrollbar)
+
+        self.tree.bind("<Configure>", self._on_resize, add="+")
+        self.tree.bind("<MouseWheel>", self._on_wheel, add="+")
+        self.tree.bind("<Button-4>", lambda e: self._scroll_and_break(-self.WHEEL_STEP), add="+")
+        self.tree.bind("<Button-5>", lambda e: self._scroll_and_break(self.WHEEL_STEP), add="+")
+        self.tree.bind("<Up>", lambda e: self._move_selection(-1))
+        self.tree.bind("<Down>", lambda e: self._move_selection(1))
+        self.tree.bind("<Prior>", lambda e: self._scroll_and_break(-self._visible))
+        self.tree.bind("<Next>", lambda e: self._scroll_and_break(self._visible))
+        self.tree.bind("<<TreeviewSelect>>", self._on_virtual_select, add="+")
+
+    # --- Fonte de dados ---
+    def set_data_source(self, source, keep_position=False):
+        self.source = source
+        if not keep_position:
+            self._offset = 0
+        self.refresh_view()
+
+    def refresh_view(self):
+        """Renderiza a janela atual da fonte nos itens reaproveitados."""
+        total = len(self.source)
+        self._offset = max(0, min(self._offset, total - self._visible))
+        rows = self.source.window(self._offset, self._visible)
+
+        while len(self._pool) < self._visible:
+            self._pool.append(self.tree.insert("", "end", values=()))
+
+        self._pool_keys = {}
+        selected_item = None
+        for index, item_id in enumerate(self._pool):
+            if index < len(rows):
+                key, values, tags = rows[index]
+                self.tree.item(item_id, values=values, tags=tags)
+                self.tree.move(item_id, "", index)
+                self._pool_keys[item_id] = key
+                if key == self._selected_key:
+                    selected_item = item_id
+            else:
+                self.tree.detach(item_id)
+
+        current = self.tree.selection()
+        if selected_item:
+            if current != (selected_item,):
+                self.tree.selection_set(selected_item)
+        elif current:
+            self.tree.selection_remove(*current)
+
+        if total:
+            self.scrollbar.set(self._offset / total, min(1.0, (self._offset + self._visible) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def selected_key(self):
+        """Chave da linha selecionada (ou None)."""
+        selected = self.tree.selection()
+        return self._pool_keys.get(selected[0]) if selected else None
+
+    def on_row_selected(self, key):
+        """Gancho para subclasses: chamado quando o usuário seleciona outra linha."""
+        pass
+
+    # --- Rolagem ---
+    def scroll_rows(self, delta):
+        self._offset += delta
+        self.refresh_view()
+
+    def _scroll_and_break(self, delta):
+        self.scroll_rows(delta)
+        return "break"
+
+    def _on_scrollbar(self, *args):
+        total = len(self.source)
+        if args and args[0] == "moveto":
+            self._offset = int(float(args[1]) * total)
+            self.refresh_view()
+        elif args and args[0] == "scroll":
+            step = int(float(args[1]))
+            self.scroll_rows(step * self._visible if len(args) > 2 and args[2] == "pages" else step)
+
+    def _on_wheel(self, event):
+        return self._scroll_and_break(-self.WHEEL_STEP if event.delta > 0 else self.WHEEL_STEP)
+
+    def _on_resize(self, event):
+        # Uma linha a menos por causa do cabeçalho
+        visible = max(1, event.height // self.ROW_HEIGHT - 1)
+        if visible != self._visible:
+            self._visible = visible
+            self.refresh_view()
+
+    def _move_selection(self, delta):
+        selected = self.tree.selection()
+        rows = [item for item in self._pool if item in self._pool_keys]
+        if not rows:
+            return "break"
+        if not selected:
+            self.tree.selection_set(rows[0])
+            return "break"
+
+        position = rows.index(selected[0]) + delta
+        if position < 0 or position >= len(rows):
+            self.scroll_rows(delta)
+            rows = [item for item in self._pool if item in self._pool_keys]
+            position = max(0, min(position, len(rows) - 1))
+        self.tree.selection_set(rows[position])
+        self.tree.see(rows[position])
+        return "break"
+
+    def _on_virtual_select(self, event=None):
+        key = self.selected_key()
+        if key is None or key == self._selected_key:
+            return
+        self._selected_key = key
+        self.on_row_selected(key)
+
+    def _sort_column(self, col, reverse):
+        """Ordena a fonte inteira (não só as linhas visíveis)."""
+        self.source.sort(self._columns.index(col), reverse)
+        self._offset = 0
+        self.refresh_view()
+        self.tree.heading(col, command=lambda: self._sort_column(col, not reverse))
@@ -1,3 +1,4 @@
+import time
 import customtkinter as ctk
 import config
 from viewmodels.main_viewmodel import MainViewModel
@@ -12,8 +13,11 @@ from views.tabs.sources_tab import SourcesTab
 from views.tabs.settings_tab import SettingsTab
 
 class MainView(ctk.CTk):
+    CLOSE_TIMEOUT = 60  # Espera máxima (s) pelos lotes ao fechar a janela
+
     def __init__(self):
         super().__init__()
+        self._closing = False
         self._configure_window()
         self.grid_columnconfigure(1, weight=1)
         self.grid_rowconfigure(0, weight=1)
@@ -23,8 +27,30 @@ class MainView(ctk.CTk):
         self._setup_sidebar()
         self._setup_tabs()
         
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
         self.after(100, lambda: self.viewmodel.initialize_data())
 
+    def _on_close(self):
+        if self._closing:
+            return
+        self._closing = True
+        # Os lotes devolvem os jobs reservados antes de navegadores e banco
+        # serem fechados. A espera é feita no loop do Tk (e não com join):
+        # as threads ainda publicam mensagens na tela enquanto terminam.
+        self.viewmodel.request_shutdown()
+        if self.viewmodel.is_busy():
+            self.update_status("Encerrando: aguardando os downloads em andamento...", "yellow")
+        self._finish_close(time.monotonic() + self.CLOSE_TIMEOUT)
+
+    def _finish_close(self, deadline):
+        if self.viewmodel.is_busy() and time.monotonic() < deadline:
+            self.after(200, lambda: self._finish_close(deadline))
+            return
+        try:
+            self.viewmodel.shutdown()
+        finally:
+            self.destroy()
+
     def _configure_window(self):
         self.title(config.APP_TITLE)
         self.geometry(config.WINDOW_SIZE)
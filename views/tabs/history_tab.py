@@ -2,10 +2,10 @@ import customtkinter as ctk
 import webbrowser
 import tkinter as tk
 from tkinter import ttk
-from views.base_table_view import BaseTableFrame
+from views.base_table_view import VirtualTableFrame, ListDataSource
 import config
 
-class HistoryTab(BaseTableFrame):
+class HistoryTab(VirtualTableFrame):
     def __init__(self, parent, on_select_callback, on_delete_callback, 
                  on_pagination_callback, on_extract_callback, on_browser_callback,
                  on_deep_scrape_callback, on_stop_callback, on_extract_all_callback): # Adicionado parametro
@@ -69,14 +69,13 @@ class HistoryTab(BaseTableFrame):
             ("url", "URL", 400, "w")
         ]
         
-        self.setup_treeview(self.container, cols_config)
+        self.setup_virtual_treeview(self.container, cols_config)
         self.tree.bind("<Double-1>", self._on_double_click)
         self.tree.bind("<Button-3>", self._show_context_menu)
 
     def update_table(self, data):
-        self.tree.delete(*self.tree.get_children())
-        for item in data:
-            self.tree.insert("", "end", values=item)
+        # Linha = (id, termo, ano, página, data, url); a chave é o id da PLB
+        self.set_data_source(ListDataSource(list(data)), keep_position=True)
 
     def _on_double_click(self, event):
         item = self.get_selected_values()
@@ -1,10 +1,21 @@
 import customtkinter as ctk
 import webbrowser
-from tkinter import ttk
+import threading
 import tkinter as tk
+from views.base_table_view import VirtualTableFrame, ListDataSource
+from services.filter_engine import FilterEngine, matches
 import config
 
-class ResultsTab(ctk.CTkFrame):
+class ResultsTab(VirtualTableFrame):
+    FILTER_DEBOUNCE_MS = 250  # Pausa na digitação antes de filtrar
+
+    # Campos filtráveis (normalizados e indexados pelo FilterEngine)
+    FILTER_FIELDS = {
+        'title': lambda item: item.get('title'),
+        'author': lambda item: item.get('author'),
+        'univ': lambda item: str(item.get('univ_sigla', '') or '') + str(item.get('univ_nome', '') or ''),
+    }
+
     def __init__(self, parent, viewmodel, on_scrape_callback, on_repo_scrape_callback):
         super().__init__(parent)
         self.viewmodel = viewmodel
@@ -12,17 +23,149 @@ class ResultsTab(ctk.CTkFrame):
         self.on_repo_scrape_callback = on_repo_scrape_callback
         
         self.all_data = [] 
-        self.item_map = {} 
-        self.link_map = {} 
+        self.data_by_id = {}  # pesquisa_id -> linha (dict de get_all)
+        self.filtered = []    # linhas que passam nos filtros (fonte da tabela virtual)
+
+        self._engine = None          # índice de filtro (construído em segundo plano)
+        self._engine_gen = 0
+        self._pending_index_ops = [] # mudanças recebidas enquanto o índice é construído
+        self._filter_gen = 0         # descarta resultados de consultas antigas
+        self._query_gen = None       # geração da consulta rodando em segundo plano
+        self._filter_job = None
 
         self._setup_ui()
+        self.source = ListDataSource(self.filtered, self._row_source)
         self._setup_context_menu()
 
     def display_results(self, results):
         self.all_data = results
-        self._apply_filters()
+        self.data_by_id = {item.get('id'): item for item in results}
+        self._build_engine(list(results))
+        self._run_filters()
         self._update_disabled_combo()
 
+    def _build_engine(self, items):
+        """Normaliza e indexa os campos filtráveis fora da thread do Tk."""
+        self._engine = None
+        self._engine_gen += 1
+        self._pending_index_ops = []
+        gen = self._engine_gen
+
+        def work():
+            engine = FilterEngine(self.FILTER_FIELDS, key_fn=lambda item: item.get('id')).build(items)
+            self.after(0, lambda: self._install_engine(gen, engine))
+
+        threading.Thread(target=work, daemon=True).start()
+
+    def _install_engine(self, gen, engine):
+        if gen != self._engine_gen:
+            return
+        for changed, deleted_ids in self._pending_index_ops:
+            self._index_changes(engine, changed, deleted_ids)
+        self._pending_index_ops = []
+        self._engine = engine
+
+    @staticmethod
+    def _index_changes(engine, changed, deleted_ids):
+        for pid in deleted_ids:
+            engine.remove(pid)
+        for item in changed:
+            engine.update(item)
+
+    def apply_changes(self, changed, deleted_ids):
+        """
+        Aplica o feed de mudanças sem recalcular a tabela inteira: atualiza,
+        insere ou remove apenas as linhas afetadas, respeitando os filtros
+        ativos, e redesenha só a janela visível.
+        """
+        filters = self._current_filters()
+        # Uma consulta em andamento leu o índice antes destas mudanças: é
+        # descartada aqui e refeita no fim (com o texto atual dos filtros)
+        rerun = self._query_gen is not None and self._query_gen == self._filter_gen
+        self._query_gen = None
+        self._filter_gen += 1
+        sorted_by_column = self.source.sort_order is not None
+        visible = {id(item) for item in self.filtered}
+        new_items = []
+        merged = []
+        placed = []  # (item, novo?) a inserir na posição da ordenação atual
+        removed = set()  # id() das linhas apagadas (saem de all_data)
+        dropped = set()  # id() das linhas que saem de filtered (algumas voltam em placed)
+
+        for pid in deleted_ids:
+            item = self.data_by_id.pop(pid, None)
+            if item is not None:
+                removed.add(id(item))
+                if id(item) in visible:
+                    dropped.add(id(item))
+                    visible.discard(id(item))
+
+        for item in changed:
+            pid = item.get('id')
+            old = self.data_by_id.get(pid)
+            if old is not None:
+                old.clear()
+                old.update(item)  # mantém a mesma referência em all_data/filtered
+                item = old
+            else:
+                self.data_by_id[pid] = item
+                new_items.append(item)
+            merged.append(item)
+
+            if not self._matches(item, filters):
+                if id(item) in visible:
+                    dropped.add(id(item))
+                    visible.discard(id(item))
+            elif id(item) not in visible:
+                placed.append((item, old is None))
+                visible.add(id(item))
+            elif sorted_by_column:
+                # Valores alterados podem mudar a posição na coluna ordenada
+                dropped.add(id(item))
+                placed.append((item, False))
+
+        # Remoções numa passada só (in-place: filtered é a lista da fonte da tabela)
+        if removed:
+            self.all_data[:] = [item for item in self.all_data if id(item) not in removed]
+        if dropped:
+            self.filtered[:] = [item for item in self.filtered if id(item) not in dropped]
+        if new_items:
+            self.all_data[:0] = reversed(new_items)
+        self._place_rows(placed)
+
+        if self._engine is not None:
+            self._index_changes(self._engine, merged, deleted_ids)
+        else:
+            self._pending_index_ops.append((merged, list(deleted_ids)))
+
+        self.refresh_view()
+        self.label_count.configure(text=f"Total: {len(self.filtered)}")
+        if rerun:
+            self._run_filters()
+
+    def _place_rows(self, placed):
+        """
+        Insere linhas na tabela filtrada respeitando a ordem atual: a da coluna
+        ordenada pelo usuário ou, sem ela, a de all_data (novos registros no
+        topo, os demais na posição que ocupam na carga).
+        """
+        rank = None
+        for item, is_new in placed:
+            default_index = 0
+            if not is_new and self.source.sort_order is None:
+                if rank is None:
+                    rank = {id(row): index for index, row in enumerate(self.all_data)}
+                target = rank[id(item)]
+                lo, hi = 0, len(self.filtered)
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    if rank.get(id(self.filtered[mid]), -1) < target:
+                        lo = mid + 1
+                    else:
+                        hi = mid
+                default_index = lo
+            self.source.insert(item, default_index)
+
     def _on_force_download_click(self):
         selected = self.cmb_disabled_sources.get()
         if selected and selected != "Nenhuma desativada":
@@ -41,122 +184,148 @@ class ResultsTab(ctk.CTkFrame):
         self.btn_refresh.configure(state=state_others)
         self.btn_force_download.configure(state=state_others)
 
-    def _apply_filters(self, event=None):
-        f_title = self.ent_filter_title.get().lower().strip()
-        f_author = self.ent_filter_author.get().lower().strip()
-        f_univ = self.ent_filter_univ.get().lower().strip()
-        f_status = self.cmb_filter_status.get()
-
-        for item in self.tree.get_children(): self.tree.delete(item)
-        self.link_map.clear()
-        self.item_map.clear()
-
-        count = 0
-        for idx, item in enumerate(self.all_data):
-            title = str(item.get('title', '') or '').lower()
-            author = str(item.get('author', '') or '').lower()
-            univ = (str(item.get('univ_sigla', '') or '') + str(item.get('univ_nome', '') or '')).lower()
-
-            if not ((f_title in title) and (f_author in author) and (f_univ in univ)):
-                continue
-
+    def _current_filters(self):
+        terms = {
+            'title': self.ent_filter_title.get(),
+            'author': self.ent_filter_author.get(),
+            'univ': self.ent_filter_univ.get(),
+        }
+        return terms, self.cmb_filter_status.get()
+
+    @staticmethod
+    def _status_predicate(f_status):
+        def predicate(item):
             has_ppb = item.get('has_ppb', 0) == 1
             has_ppr = item.get('has_ppr', 0) == 1
 
-            if f_status == "Completo (PPB+PPR)" and not (has_ppb and has_ppr): continue
-            if f_status == "Apenas PPB" and not (has_ppb and not has_ppr): continue
-            if f_status == "Apenas PPR" and not (not has_ppb and has_ppr): continue
-            if f_status == "Sem HTML" and not (not has_ppb and not has_ppr): continue
-
-            tags = []
-            if has_ppb and has_ppr: tags.append('row_complete')
-            elif has_ppb: tags.append('row_ppb')
-            elif has_ppr: tags.append('row_ppr')
-            else: tags.append('row_empty')
-
-            values = (
-                item.get('title'), item.get('author'), 
-                item.get('univ_sigla', '-'), item.get('univ_nome', 'Pendente...'),
-                item.get('programa', '-')
-            )
-            
-            tree_id = self.tree.insert("", "end", values=values, tags=tags)
-            self.link_map[tree_id] = {'search': item.get('ppb_link'), 'repo': item.get('ppr_link')}
-            self.item_map[tree_id] = idx
-            count += 1
-            
-        self.label_count.configure(text=f"Total: {count}")
-
-    def _sort_column(self, col, reverse):
-        l = [(self.tree.set(k, col), k) for k in self.tree.get_children('')]
-        try: l.sort(key=lambda t: t[0].lower(), reverse=reverse)
-        except: l.sort(reverse=reverse)
-        for index, (val, k) in enumerate(l): self.tree.move(k, '', index)
-        self.tree.heading(col, command=lambda: self._sort_column(col, not reverse))
+            if f_status == "Completo (PPB+PPR)" and not (has_ppb and has_ppr): return False
+            if f_status == "Apenas PPB" and not (has_ppb and not has_ppr): return False
+            if f_status == "Apenas PPR" and not (not has_ppb and has_ppr): return False
+            if f_status == "Sem HTML" and not (not has_ppb and not has_ppr): return False
+            return True
+        return None if f_status in (None, "", "Todos") else predicate
+
+    def _matches(self, item, filters):
+        terms, f_status = filters
+        return matches(self.FILTER_FIELDS, item, terms, self._status_predicate(f_status))
+
+    def _row_view(self, item):
+        """Valores e tag de cor de uma linha."""
+        has_ppb = item.get('has_ppb', 0) == 1
+        has_ppr = item.get('has_ppr', 0) == 1
+
+        tags = []
+        if has_ppb and has_ppr: tags.append('row_complete')
+        elif has_ppb: tags.append('row_ppb')
+        elif has_ppr: tags.append('row_ppr')
+        else: tags.append('row_empty')
+
+        values = (
+            item.get('title'), item.get('author'), 
+            item.get('univ_sigla', '-'), item.get('univ_nome', 'Pendente...'),
+            item.get('programa', '-')
+        )
+        return values, tags
+
+    def _apply_filters(self, event=None):
+        """Agenda a filtragem com debounce: roda só depois de uma pausa na digitação."""
+        if self._filter_job is not None:
+            self.after_cancel(self._filter_job)
+        self._filter_job = self.after(self.FILTER_DEBOUNCE_MS, self._run_filters)
+
+    def _run_filters(self):
+        self._filter_job = None
+        self._filter_gen += 1
+        gen = self._filter_gen
+        terms, f_status = self._current_filters()
+        predicate = self._status_predicate(f_status)
+
+        if not any(t.strip() for t in terms.values()) and predicate is None:
+            self._show_filtered(gen, list(self.all_data))
+            return
+
+        engine = self._engine
+        if engine is None:
+            # Índice ainda em construção: varredura linear
+            self._show_filtered(gen, [item for item in self.all_data if self._matches(item, (terms, f_status))])
+            return
+
+        def work():
+            result = engine.query(terms, predicate)
+            self.after(0, lambda: self._show_filtered(gen, result))
+
+        self._query_gen = gen
+        threading.Thread(target=work, daemon=True).start()
+
+    def _show_filtered(self, gen, result):
+        if gen != self._filter_gen:
+            return  # Resultado de uma digitação anterior
+        self._query_gen = None
+        self.filtered = result
+        source = ListDataSource(self.filtered, self._row_source)
+        if self.source.sort_order is not None:
+            # Mantém a ordenação por coluna escolhida pelo usuário
+            col_index, reverse, _ = self.source.sort_order
+            source.sort(col_index, reverse)
+        self.set_data_source(source)
+        self.label_count.configure(text=f"Total: {len(self.filtered)}")
+
+    def _row_source(self, item):
+        values, tags = self._row_view(item)
+        return item.get('id'), values, tags
+
+    def _selected_item(self):
+        return self.data_by_id.get(self.selected_key())
 
     def _on_double_click(self, event):
         region = self.tree.identify("region", event.x, event.y)
         if region == "cell":
-            sel = self.tree.selection()
-            if sel:
-                links = self.link_map.get(sel[0])
-                if links and links.get('repo'): webbrowser.open(links['repo'])
-
-    def _on_row_select(self, event):
-        sel = self.tree.selection()
-        if sel:
-            idx = self.item_map.get(sel[0])
-            if idx is not None:
-                item = self.all_data[idx]
-                self.viewmodel.handle_result_selection(item.get('title'), item.get('author'))
+            item = self._selected_item()
+            if item and item.get('ppr_link'): webbrowser.open(item['ppr_link'])
+
+    def on_row_selected(self, key):
+        item = self.data_by_id.get(key)
+        if item is not None:
+            self.viewmodel.handle_result_selection(item.get('title'), item.get('author'))
 
     # --- Ações de Contexto ---
     def _scrape_selected_row(self):
-        sel = self.tree.selection()
-        if sel:
-            links = self.link_map.get(sel[0])
-            if links and links['search']: self.on_scrape_callback(links['search'])
+        item = self._selected_item()
+        if item and item.get('ppb_link'): self.on_scrape_callback(item['ppb_link'])
     
     def _scrape_repo_row(self):
-        sel = self.tree.selection()
-        if sel:
-            links = self.link_map.get(sel[0])
-            if links and links['repo']: self.on_repo_scrape_callback(links['repo'])
+        item = self._selected_item()
+        if item and item.get('ppr_link'): self.on_repo_scrape_callback(item['ppr_link'])
 
     def _extract_univ_from_selection(self):
-        selected = self.tree.selection()
-        if not selected: return
-        values = self.tree.item(selected[0])['values']
-        self.viewmodel.results_vm.extract_single_data(values[0], values[1])
+        item = self._selected_item()
+        if not item: return
+        self.viewmodel.results_vm.extract_single_data(item.get('title'), item.get('author'))
 
     def _view_ppb_internal(self):
-        selected = self.tree.selection()
-        if not selected: return
-        values = self.tree.item(selected[0])['values']
-        self.viewmodel.handle_result_selection(values[0], values[1])
+        item = self._selected_item()
+        if not item: return
+        self.viewmodel.handle_result_selection(item.get('title'), item.get('author'))
         try: self.viewmodel.view.tabview.set("Conteúdo PPB")
         except ValueError: pass
 
     def _view_ppb_browser(self):
-        selected = self.tree.selection()
-        if not selected: return
-        values = self.tree.item(selected[0])['values']
-        self.viewmodel.handle_result_selection(values[0], values[1])
+        item = self._selected_item()
+        if not item: return
+        self.viewmodel.handle_result_selection(item.get('title'), item.get('author'))
         self.viewmodel.open_ppb_browser_from_db()
 
     def _view_ppr_internal(self):
-        selected = self.tree.selection()
-        if not selected: return
-        values = self.tree.item(selected[0])['values']
-        self.viewmodel.handle_result_selection(values[0], values[1])
+        item = self._selected_item()
+        if not item: return
+        self.viewmodel.handle_result_selection(item.get('title'), item.get('author'))
         try: self.viewmodel.view.tabview.set("Conteúdo PPR")
         except ValueError: pass
 
     def _view_ppr_browser(self):
-        selected = self.tree.selection()
-        if not selected: return
-        values = self.tree.item(selected[0])['values']
-        self.viewmodel.handle_result_selection(values[0], values[1])
+        item = self._selected_item()
+        if not item: return
+        self.viewmodel.handle_result_selection(item.get('title'), item.get('author'))
         self.viewmodel.open_ppr_in_browser()
 
     def _show_context_menu(self, event):
@@ -263,37 +432,17 @@ class ResultsTab(ctk.CTkFrame):
         self.container.grid_columnconfigure(0, weight=1)
         self.container.grid_rowconfigure(0, weight=1)
 
-        style = ttk.Style()
-        style.theme_use("default")
-        
-        style.configure("Treeview", 
-                        background=config.COLORS["table_bg"], 
-                        foreground=config.COLORS["text"], 
-                        fieldbackground=config.COLORS["table_bg"], 
-                        rowheight=30, borderwidth=0, font=config.FONTS["small"])
-        
-        style.map('Treeview', background=[('selected', config.COLORS["table_selected"])])
-        
-        style.configure("Treeview.Heading", 
-                        background=config.COLORS["table_header"], 
-                        foreground=config.COLORS["text"], 
-                        relief="flat", padding=(5, 5), font=config.FONTS["normal"])
-        style.map("Treeview.Heading", background=[('active', '#343638')])
-
-        columns = ("title", "author", "sigla", "universidade", "programa")
-        self.tree = ttk.Treeview(self.container, columns=columns, show="headings", selectmode="browse")
-
-        self.tree.heading("title", text="Nome da Pesquisa", command=lambda: self._sort_column("title", False))
-        self.tree.heading("author", text="Autor", command=lambda: self._sort_column("author", False))
-        self.tree.heading("sigla", text="Sigla", command=lambda: self._sort_column("sigla", False))
-        self.tree.heading("universidade", text="Universidade", command=lambda: self._sort_column("universidade", False))
-        self.tree.heading("programa", text="Programa", command=lambda: self._sort_column("programa", False))
-
-        self.tree.column("title", width=300, minwidth=150, anchor="w")
-        self.tree.column("author", width=150, minwidth=100, anchor="w")
-        self.tree.column("sigla", width=60, anchor="center")
-        self.tree.column("universidade", width=200, anchor="w")
-        self.tree.column("programa", width=200, anchor="w")
+        # Tabela virtualizada: só as linhas visíveis existem na Treeview
+        cols_config = [
+            ("title", "Nome da Pesquisa", 300, "w"),
+            ("author", "Autor", 150, "w"),
+            ("sigla", "Sigla", 60, "center"),
+            ("universidade", "Universidade", 200, "w"),
+            ("programa", "Programa", 200, "w"),
+        ]
+        self.setup_virtual_treeview(self.container, cols_config)
+        self.tree.column("title", minwidth=150)
+        self.tree.column("author", minwidth=100)
 
         # Configuração das Cores das Linhas (Tags)
         self.tree.tag_configure('row_complete', background=config.ROW_COLORS['complete'])
@@ -301,14 +450,8 @@ class ResultsTab(ctk.CTkFrame):
         self.tree.tag_configure('row_ppr', background=config.ROW_COLORS['ppr_only'])
         self.tree.tag_configure('row_empty', background=config.ROW_COLORS['empty'])
 
-        self.scrollbar = ctk.CTkScrollbar(self.container, command=self.tree.yview)
-        self.tree.configure(yscrollcommand=self.scrollbar.set)
-        self.tree.grid(row=0, column=0, sticky="nsew")
-        self.scrollbar.grid(row=0, column=1, sticky="ns")
-
         self.tree.bind("<Double-1>", self._on_double_click)
         self.tree.bind("<Button-3>", self._show_context_menu)
-        self.tree.bind("<<TreeviewSelect>>", self._on_row_select)
         
         # Garante carregamento inicial
         self.after(1000, self._update_disabled_combo)
@@ -355,15 +498,11 @@ class ResultsTab(ctk.CTkFrame):
     # --- Novos Callbacks ---
 
     def _delete_ppb_html(self):
-        selected = self.tree.selection()
-        if not selected: return
-        values = self.tree.item(selected[0])['values']
-        # values[0] = title, values[1] = author
-        self.viewmodel.results_vm.delete_stored_html(values[0], values[1], 'ppb')
+        item = self._selected_item()
+        if not item: return
+        self.viewmodel.results_vm.delete_stored_html(item.get('title'), item.get('author'), 'ppb')
 
     def _delete_ppr_html(self):
-        selected = self.tree.selection()
-        if not selected: return
-        values = self.tree.item(selected[0])['values']
-        # values[0] = title, values[1] = author
-        self.viewmodel.results_vm.delete_stored_html(values[0], values[1], 'ppr')
\ No newline at end of file
+        item = self._selected_item()
+        if not item: return
+        self.viewmodel.results_vm.delete_stored_html(item.get('title'), item.get('author'), 'ppr')
\ No newline at end of file